@@ -23,6 +23,7 @@ if _project_root not in sys.path:
 from app.authentication import get_authenticator
 from app.utils import load_db 
 from app.backup_manager import BackupManager
+from scripts import podcasts_db
 
 # Initialize session state for startup status if not exists
 if 'startup_complete' not in st.session_state:
@@ -87,6 +88,17 @@ if not st.session_state.startup_complete:
     progress_bar.progress(50)
     backup_manager = BackupManager()
 
+    # Bring a restored or older database up to the current schema before anything reads it
+    db_path = os.path.join(_project_root, "data", "podcasts.db")
+    if os.path.exists(db_path):
+        status_text.text("Updating database schema...")
+        progress_bar.progress(55)
+        try:
+            podcasts_db.migrate_database(db_path)
+        except Exception as e:
+            st.error(f"Error updating database schema: {str(e)}")
+            st.stop()
+
     # Load database
     status_text.text("Loading database...")
     progress_bar.progress(60)
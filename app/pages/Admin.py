@@ -23,6 +23,7 @@ import re
 import tempfile
 import hashlib
 import contextlib
+import logging
 import streamlit_authenticator as stauth
 import sqlite3 # Added for get_db_row_count
 
@@ -30,19 +31,16 @@ import sqlite3 # Added for get_db_row_count
 if os.path.exists("/app/data"):
     # Cloud environment
     data_dir = "/app/data" # Define data_dir for cloud
-    backups_dir = os.path.join(data_dir, "backups")
     permanent_upload_dir = os.path.join(data_dir, "uploaded")
 else:
     # Local environment
     data_dir = "data" # Define data_dir for local
-    backups_dir = os.path.join(data_dir, "backups")
     permanent_upload_dir = os.path.join(data_dir, "uploaded")
 
 database_file_path = os.path.join(data_dir, "podcasts.db")
 
 # Create directories if they don't exist
 os.makedirs(data_dir, exist_ok=True) # Ensure base data directory exists too
-os.makedirs(backups_dir, exist_ok=True)
 os.makedirs(permanent_upload_dir, exist_ok=True)
 
 # GCS bucket configuration
@@ -222,75 +220,6 @@ def delete_from_bucket(filenames):
         st.error(f"Unexpected error during batch GCS delete: {str(e)}")
         return {"success": 0, "error": len(filenames)}
 
-def batch_download_from_bucket(gcs_filenames, local_temp_dir):
-    """Download multiple files from GCS to a local temporary directory in parallel."""
-    if not gcs_filenames:
-        st.info("No GCS filenames provided for batch download.")
-        return {}, [] # No files to download, no successes, no failures
-
-    env = os.environ.copy()
-    env["CLOUDSDK_PYTHON"] = "python3.11"
-    
-    gcs_full_paths = [f"{BUCKET_URL}/{filename}" for filename in gcs_filenames]
-    
-    # Command: gsutil -m cp gs://bucket/file1 gs://bucket/file2 ... /local/temp/dir/
-    cmd = ["gsutil", "-m", "cp"] + gcs_full_paths + [local_temp_dir]
-    
-    downloaded_files_map = {}
-    failed_files = []
-
-    try:
-        # st.write(f"Executing GCS Batch Download Command: {' '.join(cmd)}") # For debugging
-        # Using subprocess.run which waits for completion.
-        # Real-time progress from gsutil -m is complex to capture and display in Streamlit
-        # without streaming, so we'll show a general message.
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False, # We will check stderr for failures, as -m can have partial success
-            env=env
-        )
-
-        # After gsutil -m cp, successfully copied files will be in local_temp_dir.
-        # We need to confirm which ones actually made it.
-        for original_filename in gcs_filenames:
-            local_path = os.path.join(local_temp_dir, original_filename)
-            if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
-                downloaded_files_map[original_filename] = local_path
-            else:
-                # File wasn't found locally or is empty, assume it failed or was skipped by gsutil.
-                failed_files.append(original_filename)
-        
-        # Check stderr for common gsutil -m error patterns if some files are missing
-        if result.stderr:
-            # gsutil -m cp is tricky: it can succeed for some files and fail for others,
-            # and the overall exit code might still be 0 if at least one file succeeded,
-            # or non-zero if any file failed.
-            # A simple check is to see if stderr contains "Some files failed" or "Error".
-            if "Some files failed" in result.stderr or "Error:" in result.stderr.lower() or result.returncode != 0:
-                 # This indicates gsutil itself reported issues. Our file existence check above
-                 # should catch most individual failures. This is a general warning.
-                 st.warning(f"gsutil reported some issues during batch download.Stderr: {result.stderr[:500]}...") # Log snippet of stderr
-            # If no specific error message and all files are present, we can assume success.
-            # If some files are missing but gsutil didn't explicitly report "Some files failed", they might have been skipped for other reasons.
-
-        if not downloaded_files_map and gcs_filenames: # No files downloaded, but some were expected
-             st.error("Batch download command ran, but no files were successfully downloaded to the temporary directory.")
-             failed_files = list(gcs_filenames) # Mark all as failed if none were found
-
-        return downloaded_files_map, failed_files
-
-    except subprocess.CalledProcessError as e: # Should not be hit if check=False, but good practice
-        st.error(f"Critical error executing gsutil batch download (CalledProcessError): {e.stderr}")
-        return {}, list(gcs_filenames) # All failed
-    except FileNotFoundError: # gsutil not found
-        st.error("gsutil command not found. Please ensure Google Cloud SDK is installed and in PATH.")
-        return {}, list(gcs_filenames)
-    except Exception as e:
-        st.error(f"Unexpected error during GCS batch download: {str(e)}")
-        return {}, list(gcs_filenames) # All failed
-
 def download_from_bucket(filename):
     """Download a file from the GCS bucket to a temporary location."""
     try:
@@ -313,6 +242,76 @@ def download_from_bucket(filename):
         st.error(f"Unexpected error: {str(e)}")
         return None
 
+JOB_STATUS_REFRESH_SECONDS = 2
+
+@st.fragment(run_every=JOB_STATUS_REFRESH_SECONDS)
+def import_job_progress(job_id):
+    """Progress of an import job run by the background worker; refreshes on its own, without rerunning the page."""
+    with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+        job = import_jobs.get_job(conn, job_id)
+        counts = import_jobs.status_counts(conn, job_id)
+        next_files = import_jobs.job_files(conn, job_id, statuses=import_jobs.REMAINING_STATUSES)[:1]
+    if job is None or job['status'] not in ('queued', 'running'):
+        st.rerun() # The whole page, which shows the final summary
+
+    total = sum(counts.values())
+    finished = sum(counts.get(status, 0) for status in import_jobs.FINISHED_STATUSES)
+    label = f"Import job #{job_id}: {finished} of {total} file(s) done"
+    if next_files:
+        label += f" (next: {next_files[0]['filename']})"
+    st.progress(finished / total if total else 0.0, text=label)
+    st.caption(" · ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+    event = job['progress']
+    if job['status'] == 'running' and event is not None:
+        # Latest event reported by the worker (scripts/import_progress.py)
+        where = f"{event.filename}, sheet {event.sheet_name}" if event.sheet_name else event.filename
+        st.caption(f"{where}: {event.kind.replace('_', ' ')}, {event.rows:,} rows ({event.rows_per_sec:,.0f} rows/s)")
+
+    if import_worker.worker_running(database_file_path):
+        if job['status'] == 'queued':
+            st.info("Waiting for the import worker to finish the jobs queued before this one...")
+        elif st.button("Cancel Import", key=f"cancel_import_job_{job_id}",
+                       help="Stop after rolling back the file being imported; files already imported are kept."):
+            try:
+                with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+                    import_jobs.finish_job(conn, job_id, status="abandoned")
+            except sqlite3.OperationalError as e:
+                st.error(f"Could not cancel import job #{job_id}: {e}")
+            else:
+                st.rerun()
+        return
+    # Interrupted (container restart, crash): committed files are kept, the rest can be resumed
+    st.warning(f"The import worker is not running, so import job #{job_id} (started {job['created_at'][:19]}) is stopped. "
+               "Resuming it imports only the files it has not finished.")
+    col_resume, col_abandon = st.columns(2)
+    with col_resume:
+        if st.button("Resume Import", key=f"resume_import_job_{job_id}"):
+            import_worker.start_worker(database_file_path)
+            st.rerun(scope="fragment")
+    with col_abandon:
+        if st.button("Abandon Import Job", key=f"abandon_import_job_{job_id}"):
+            try:
+                with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+                    import_jobs.finish_job(conn, job_id, status="abandoned")
+            except sqlite3.OperationalError as e:
+                st.error(f"Could not abandon import job #{job_id}: {e}")
+            else:
+                st.rerun()
+
+def new_batch_total_stats():
+    return {
+        'filename': 'Multiple Files (Batch Import)',
+        'sheets': {'processed': 0, 'total': 0},
+        'rows': {'scanned': 0, 'merged': 0, 'errors': 0},
+        'actual': {'inserted': 0, 'replaced': 0, 'ignored': 0},
+        'dry_run': {'inserted': 0, 'replaced': 0, 'ignored': 0},
+        'files': {'unchanged_skipped': 0},
+        'dry_run_diffs': [],
+        'file_timings': [],
+        'timings': new_stage_timings(),
+        'unprocessed_sheets_details': []
+    }
+
 # Helper function to accumulate import statistics
 def accumulate_stats(total_stats, new_stats):
     """Accumulate statistics from multiple import operations."""
@@ -328,8 +327,13 @@ def accumulate_stats(total_stats, new_stats):
                         'reason': item.get('reason', 'No reason provided')
                     }
                     total_stats['unprocessed_sheets_details'].append(detail)
-        elif category == 'filename': # Don't sum up filenames
+        elif category in ('filename', 'file_timings'): # Don't sum up filenames; timings are appended per batch
             pass 
+        elif category == 'dry_run_diffs': # Row-level dry-run diffs are collected per file, not summed
+            if new_stats.get('dry_run_diff') is not None:
+                total_stats['dry_run_diffs'].append(new_stats['dry_run_diff'])
+        elif category == 'timings': # Stage timers add up seconds and rows and keep the highest peak RSS
+            merge_stage_timings(total_stats['timings'], new_stats.get('timings', {}))
         else: # For 'sheets', 'rows', 'actual'
             for stat in total_stats[category]:
                 if stat in new_stats.get(category, {}):
@@ -357,6 +361,10 @@ def display_import_summary(stats, override_db, reset_db, dry_run, is_final_summa
     st.markdown("**📑 Sheet Details:**")
     st.markdown(f"  - Processed: {sheets.get('processed', 0)} of {sheets.get('total', 0)} sheets")
     
+    unchanged_skipped = stats.get('files', {}).get('unchanged_skipped', 0)
+    if unchanged_skipped:
+        st.markdown(f"  - Skipped {unchanged_skipped} unchanged file(s) already imported")
+    
     # Row Processing
     rows = stats.get('rows', {})
     st.markdown("**📊 Data Processing:**")
@@ -373,12 +381,13 @@ def display_import_summary(stats, override_db, reset_db, dry_run, is_final_summa
         st.markdown(f"  - Records Replaced: {actual.get('replaced', 0):,}")
         if actual.get('ignored', 0) > 0:
             st.markdown(f"  - Records Ignored: {actual.get('ignored', 0):,}")
-    elif dry_run and (is_final_summary or any(actual.values())):
+    preview = stats.get('dry_run', {})
+    if dry_run and (is_final_summary or any(preview.values())):
         st.markdown("**Preview of Database Changes (Dry Run):**")
-        st.markdown(f"  - Records to be Inserted: {actual.get('inserted', 0):,}")
-        st.markdown(f"  - Records to be Replaced: {actual.get('replaced', 0):,}")
-        if actual.get('ignored', 0) > 0:
-            st.markdown(f"  - Records to be Ignored: {actual.get('ignored', 0):,}")
+        st.markdown(f"  - Records to be Inserted: {preview.get('inserted', 0):,}")
+        st.markdown(f"  - Records to be Replaced: {preview.get('replaced', 0):,}")
+        if preview.get('ignored', 0) > 0:
+            st.markdown(f"  - Records to be Ignored: {preview.get('ignored', 0):,}")
     st.markdown("---    ") # Visual separator at the end of each summary block
 
     # Display details of unprocessed sheets if any
@@ -403,6 +412,51 @@ def display_import_summary(stats, override_db, reset_db, dry_run, is_final_summa
                  st.markdown(f"  - **Sheet:** `{detail['sheet_name']}` - **Reason:** {detail['reason']}")
         st.markdown("---    ")
 
+DRY_RUN_DIFF_PAGE_SIZE = 100
+
+def display_dry_run_diff(diff_df):
+    """Page through the row-level diff produced by a dry-run import."""
+    st.markdown("### 🔍 Dry Run Diff")
+    if diff_df is None or diff_df.empty:
+        st.info("The dry run found no rows to write.")
+        return
+
+    action_counts = diff_df['action'].value_counts()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("New", f"{action_counts.get('insert', 0):,}")
+    col2.metric("Replaced", f"{action_counts.get('replace', 0):,}")
+    col3.metric("Ignored", f"{action_counts.get('ignore', 0):,}")
+
+    filter_col1, filter_col2 = st.columns(2)
+    with filter_col1:
+        action_filter = st.multiselect(
+            "Actions", ['insert', 'replace', 'ignore'], default=['insert', 'replace'], key="dry_run_diff_actions"
+        )
+    with filter_col2:
+        url_filter = st.text_input("URL contains", key="dry_run_diff_url_filter")
+    filtered = diff_df[diff_df['action'].isin(action_filter)]
+    if url_filter:
+        filtered = filtered[filtered['url'].str.contains(url_filter, case=False, regex=False, na=False)]
+
+    total_pages = max(1, -(-len(filtered) // DRY_RUN_DIFF_PAGE_SIZE))
+    page = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1, step=1, key="dry_run_diff_page")
+    start = (page - 1) * DRY_RUN_DIFF_PAGE_SIZE
+    st.caption(f"Showing rows {min(start + 1, len(filtered)):,}-{min(start + DRY_RUN_DIFF_PAGE_SIZE, len(filtered)):,} of {len(filtered):,}")
+    st.dataframe(filtered.iloc[start:start + DRY_RUN_DIFF_PAGE_SIZE], use_container_width=True, hide_index=True)
+
+    dl_col, clear_col = st.columns(2)
+    with dl_col:
+        st.download_button(
+            "Download diff as CSV",
+            data=filtered.to_csv(index=False).encode('utf-8'),
+            file_name=f"dry_run_diff_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv"
+        )
+    with clear_col:
+        if st.button("Clear dry run diff"):
+            st.session_state.dry_run_diff_result = None
+            st.rerun()
+
 def list_gcs_backups():
     """List all backups in Google Cloud Storage with accurate size and proper sorting."""
     try:
@@ -490,7 +544,13 @@ _project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 from app.authentication import get_authenticator
-from scripts.import_data import import_data
+from scripts import import_history, import_jobs, import_worker, podcasts_db
+from scripts.batch_import import DEFAULT_WORKERS, order_import_files
+from scripts.import_data import merge_stage_timings, new_stage_timings
+from scripts.import_logging import configure_logging
+
+# Imports run quietly here (warnings only, in the server log); results are shown in the page instead
+configure_logging(logging.WARNING)
 from app.backup_manager import BackupManager
 from datetime import datetime, timezone
 import pytz
@@ -791,25 +851,12 @@ with tab2:
     if 'file_management_df' not in st.session_state:
         st.session_state.file_management_df = None 
 
-    # Initialize session state for batch import if not exists
-    if 'multi_batch_import_active' not in st.session_state:
-        st.session_state.multi_batch_import_active = False
-    if 'gcs_files_for_batch_import' not in st.session_state:
-        st.session_state.gcs_files_for_batch_import = []
-    if 'batch_import_temp_dir' not in st.session_state:
-        st.session_state.batch_import_temp_dir = None
-    if 'batch_downloaded_files_map' not in st.session_state:
-        st.session_state.batch_downloaded_files_map = {}
-    if 'batch_failed_to_download_files' not in st.session_state:
-        st.session_state.batch_failed_to_download_files = []
-    if 'batch_import_current_idx' not in st.session_state:
-        st.session_state.batch_import_current_idx = 0
-    if 'batch_import_total_stats' not in st.session_state:
-        st.session_state.batch_import_total_stats = {} # Will be properly initialized when an import starts
-    if 'batch_import_options' not in st.session_state:
-        st.session_state.batch_import_options = {}
-    if 'batch_import_initial_setup_done' not in st.session_state:
-        st.session_state.batch_import_initial_setup_done = False
+    # Initialize session state for batch import if not exists. The import job this session shows; its
+    # files, progress and options live in the job tables (scripts/import_jobs.py).
+    if 'batch_import_job_id' not in st.session_state:
+        st.session_state.batch_import_job_id = None
+    if 'dry_run_diff_result' not in st.session_state:
+        st.session_state.dry_run_diff_result = None
 
     REFRESH_INTERVAL = timedelta(minutes=5)
 
@@ -1086,21 +1133,32 @@ with tab2:
             
             reset_db_checkbox = st.checkbox(
                 "Clear all existing data before import",
-                help="⚠️ WARNING: This will delete ALL existing data in the database before importing. Use with extreme caution!"
+                help="⚠️ WARNING: This will replace ALL existing data in the database with the selected files. Use with extreme caution!"
             )
             
             if reset_db_checkbox:
                 st.warning("""
                 ⚠️ **Danger Zone**: You have selected to clear all existing data.
-                - This will permanently delete ALL data currently in the database
-                - Only the first file in your selection will trigger this reset
-                - Make sure you have a backup before proceeding
+                - The database is rebuilt from the selected files alone, and ALL data currently in it is replaced
+                - The current data stays visible until the rebuilt database is complete, then it is swapped in at once
+                - A rebuild cannot be undone from "Undo Imports"; make sure you have a Cloud Storage backup before proceeding
                 """)
             
             perform_dry_run_checkbox = st.checkbox(
                 "Preview changes without saving",
                 help="If checked, the import will be simulated without making any changes to the database. Useful for testing."
             )
+
+            force_reimport_checkbox = st.checkbox(
+                "Re-import files that are unchanged since their last import",
+                help="By default, a file whose exact content was already imported (under the current parsing rules) is skipped."
+            )
+
+            parallel_workers_input = st.number_input(
+                "Parallel workers",
+                min_value=1, max_value=max(os.cpu_count() or 1, DEFAULT_WORKERS), value=DEFAULT_WORKERS, step=1,
+                help="Number of files parsed at the same time. Files are still written one at a time, monthly files first (chronologically), then report files."
+            )
             
             col3, col4 = st.columns(2)
             
@@ -1110,7 +1168,9 @@ with tab2:
                     st.session_state.import_options = {
                         'override_db': override_db_checkbox,
                         'reset_db': reset_db_checkbox,
-                        'perform_dry_run': perform_dry_run_checkbox
+                        'perform_dry_run': perform_dry_run_checkbox,
+                        'workers': int(parallel_workers_input),
+                        'force': force_reimport_checkbox
                     }
                     st.session_state.import_button_pressed = True
                     st.session_state.delete_button_pressed = False # Ensure only one action runs
@@ -1127,214 +1187,148 @@ with tab2:
 
     # --- Processing Blocks (Full Width) ---
     # This section will now handle the new batch import logic
-    BATCH_SIZE = 25
+    with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+        unfinished_jobs = import_jobs.unfinished_jobs(conn)
+    if st.session_state.batch_import_job_id is None and unfinished_jobs:
+        # Imports run in the background worker, so a new session picks up the job that is running (or stopped)
+        st.session_state.batch_import_job_id = unfinished_jobs[0]['job_id']
+
+    if st.session_state.get('import_button_pressed') and st.session_state.batch_import_job_id is not None:
+        # Rebuilds and undos are not safe while the worker writes, so imports are started one at a time here
+        st.warning("An import job is still in progress. Start the next import once it has finished.")
+        st.session_state.import_button_pressed = False
 
-    if st.session_state.get('import_button_pressed') and not st.session_state.multi_batch_import_active:
-        # ---- START OF A NEW MULTI-BATCH IMPORT ----
+    if st.session_state.get('import_button_pressed') and st.session_state.batch_import_job_id is None:
+        # ---- QUEUE A NEW IMPORT JOB ----
         selected_gcs_files = st.session_state.files_for_action
         import_options = st.session_state.import_options
+        perform_dry_run = import_options.get('perform_dry_run', False)
 
         if not selected_gcs_files:
             st.warning("No files were selected for import.")
             st.session_state.import_button_pressed = False # Reset button state
         else:
             st.info(f"Initializing import for {len(selected_gcs_files)} file(s)...")
-            # Create a persistent temporary directory for this entire multi-batch operation
+            # The worker downloads the files into this directory
             try:
-                st.session_state.batch_import_temp_dir = tempfile.mkdtemp(prefix="orionxlog_batch_import_")
-                st.write(f"DEBUG: Created persistent temp dir: {st.session_state.batch_import_temp_dir}") # DEBUG
+                work_dir = tempfile.mkdtemp(prefix="orionxlog_batch_import_")
             except Exception as e:
                 st.error(f"Failed to create temporary directory for batch import: {e}")
                 st.session_state.import_button_pressed = False
-                # No rerun, allow user to see error.
-                # Make sure to clean up any partial state if needed later.
                 st.stop() # Stop execution to prevent further issues
 
-            st.session_state.multi_batch_import_active = True
-            st.session_state.gcs_files_for_batch_import = selected_gcs_files
-            st.session_state.batch_import_options = import_options
-            st.session_state.batch_import_current_idx = 0
-            st.session_state.batch_import_total_stats = {
-                'filename': 'Multiple Files (Batch Import)',
-                'sheets': {'processed': 0, 'total': 0},
-                'rows': {'scanned': 0, 'merged': 0, 'errors': 0},
-                'actual': {'inserted': 0, 'replaced': 0, 'ignored': 0},
-                'unprocessed_sheets_details': []
+            if import_options.get('reset_db', False) and not perform_dry_run:
+                # The worker rebuilds the database beside the live one and swaps it in when the job completes
+                st.info("The database will be rebuilt from the selected files; current data stays available until then.")
+
+            job_options = {
+                'dry_run': perform_dry_run,
+                'workers': import_options.get('workers', DEFAULT_WORKERS),
+                'force': import_options.get('force', False),
+                'override_db': import_options.get('override_db', False),
+                'reset_db': import_options.get('reset_db', False),
+                'bucket_url': BUCKET_URL,
             }
-            st.session_state.batch_downloaded_files_map = {}
-            st.session_state.batch_failed_to_download_files = []
-            st.session_state.batch_import_initial_setup_done = False # Will be set after download & initial DB ops
+            with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+                # Monthly files chronologically, then report files, so later batches never undo newer data
+                job_id = import_jobs.create_job(conn, order_import_files(selected_gcs_files), job_options, work_dir=work_dir)
+            import_worker.start_worker(database_file_path)
 
+            st.session_state.batch_import_job_id = job_id
+            st.session_state.dry_run_diff_result = None
             st.session_state.import_button_pressed = False # Reset the trigger
-            st.rerun() # Rerun to enter the active batch processing logic below
-
-    if st.session_state.multi_batch_import_active:
-        # ---- ACTIVE MULTI-BATCH IMPORT PROCESSING ----
-        gcs_files_to_process_overall = st.session_state.gcs_files_for_batch_import
-        temp_dir_for_this_run = st.session_state.batch_import_temp_dir
-        current_idx = st.session_state.batch_import_current_idx
-        options = st.session_state.batch_import_options
-        total_stats = st.session_state.batch_import_total_stats
-        
-        override_db = options.get('override_db', False)
-        reset_db = options.get('reset_db', False)
-        perform_dry_run = options.get('perform_dry_run', False)
-
-        status_text_area = st.empty()
-        progress_bar_area = st.empty()
-
-        if not temp_dir_for_this_run or not os.path.exists(temp_dir_for_this_run):
-            st.error("Critical error: Batch import temporary directory is missing. Aborting.")
-            # Reset state to allow starting over
-            st.session_state.multi_batch_import_active = False
-            st.session_state.batch_import_initial_setup_done = False
-            if temp_dir_for_this_run and os.path.exists(temp_dir_for_this_run): # Defensive cleanup
-                try: shutil.rmtree(temp_dir_for_this_run) 
-                except: pass
-            st.session_state.batch_import_temp_dir = None
-            st.rerun()
 
-        try:
-            if not st.session_state.batch_import_initial_setup_done:
-                status_text_area.info("Performing initial setup: DB operations and batch file download...")
-                # 1. One-time DB backup and reset (if configured)
-                if not perform_dry_run and os.path.exists(database_file_path):
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    initial_backup_path = os.path.join(backups_dir, f"podcasts_pre_batch_import_{timestamp}.db")
-                    shutil.copy2(database_file_path, initial_backup_path)
-                    st.success(f"Created pre-batch import backup of current database: {initial_backup_path}")
-                
-                if reset_db and not perform_dry_run:
-                    if os.path.exists(database_file_path):
-                        os.remove(database_file_path)
-                        st.info("Database has been reset before batch import starts.")
-                    else:
-                        st.info("Database file not found, so no reset needed.")
-
-                # 2. Download all GCS files to the persistent temporary directory
-                with st.spinner(f"Downloading {len(gcs_files_to_process_overall)} file(s) from GCS..."):
-                    downloaded_map, failed_list = batch_download_from_bucket(gcs_files_to_process_overall, temp_dir_for_this_run)
-                    st.session_state.batch_downloaded_files_map = downloaded_map
-                    st.session_state.batch_failed_to_download_files = failed_list
-
-                if st.session_state.batch_failed_to_download_files:
-                    st.warning(f"{len(st.session_state.batch_failed_to_download_files)} file(s) could not be downloaded and will be skipped:")
-                    for failed_file in st.session_state.batch_failed_to_download_files:
-                        st.write(f"- {failed_file}")
-                
-                st.session_state.batch_import_initial_setup_done = True
-                # We will process the first batch in this same run, so don't rerun yet unless no files downloaded
-                if not st.session_state.batch_downloaded_files_map:
-                    status_text_area.warning("No files were successfully downloaded. Nothing to import.")
-                    # Clean up and end batch mode
-                    if os.path.exists(temp_dir_for_this_run): shutil.rmtree(temp_dir_for_this_run)
-                    st.session_state.batch_import_temp_dir = None
-                    st.session_state.multi_batch_import_active = False
-                    st.session_state.batch_import_initial_setup_done = False 
-                    st.rerun()
-                    st.stop() # Should not be reached due to rerun
-            
-            # Determine files for the current actual processing batch
-            successfully_downloaded_gcs_filenames = list(st.session_state.batch_downloaded_files_map.keys())
-            files_for_this_processing_batch = successfully_downloaded_gcs_filenames[current_idx : current_idx + BATCH_SIZE]
-
-            if not files_for_this_processing_batch and current_idx >= len(successfully_downloaded_gcs_filenames) and len(successfully_downloaded_gcs_filenames) > 0:
-                # All files have been processed in previous batches
-                pass # Will proceed to finalization logic
-            elif not files_for_this_processing_batch and current_idx == 0 and not successfully_downloaded_gcs_filenames:
-                # This case handled by the initial download check, but as a safeguard
-                status_text_area.info("No files available to process.")
+    if st.session_state.batch_import_job_id is not None:
+        # ---- IMPORT JOB PROGRESS AND SUMMARY ----
+        # The worker checkpoints every file in the job; the page only reads the job tables
+        job_id = st.session_state.batch_import_job_id
+        with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+            job = import_jobs.get_job(conn, job_id)
+            job_file_entries = import_jobs.job_files(conn, job_id) if job else []
+
+        if job is None:
+            st.session_state.batch_import_job_id = None
+        elif job['status'] in ('queued', 'running'):
+            import_job_progress(job_id)
+        else:
+            # ---- FINALIZATION OF THE IMPORT JOB ----
+            options = job['options']
+            perform_dry_run = options.get('dry_run', False)
+            if job['status'] == 'abandoned':
+                st.warning(f"Import job #{job_id} was abandoned. Files imported before that are kept.")
             else:
-                status_text_area.info(f"Processing batch: files {current_idx + 1} to {min(current_idx + BATCH_SIZE, len(successfully_downloaded_gcs_filenames))} of {len(successfully_downloaded_gcs_filenames)} downloaded files.")
-                for i, gcs_filename in enumerate(files_for_this_processing_batch):
-                    local_filepath = st.session_state.batch_downloaded_files_map[gcs_filename]
-                    loop_progress_idx = current_idx + i
-                    status_text_area.text(f"Importing: {gcs_filename} ({loop_progress_idx + 1}/{len(successfully_downloaded_gcs_filenames)} of downloaded files)..." )
-                    progress_bar_area.progress((loop_progress_idx + 1) / len(successfully_downloaded_gcs_filenames))
-
+                st.success(f"Import job #{job_id}: all files processed!")
+
+            # Rebuilt from the job, so files imported before a restart are included
+            total_stats = new_batch_total_stats()
+            for entry in job_file_entries:
+                if entry['stats']:
+                    accumulate_stats(total_stats, entry['stats'])
+                if entry['timing']:
+                    total_stats['file_timings'].append(entry['timing'])
+
+            display_import_summary(total_stats, options.get('override_db', False), options.get('reset_db', False), perform_dry_run, is_final_summary=True)
+
+            for entry in job_file_entries:
+                if entry['status'] in ('failed', 'download_failed'):
+                    st.error(f"Error processing {entry['filename']}: {entry['error'] or 'unreadable file'}")
+
+            if total_stats.get('file_timings'):
+                with st.expander("⏱️ Where the time went", expanded=False):
+                    st.markdown("**By stage (all files):**")
+                    stage_df = pd.DataFrame.from_dict(total_stats['timings'], orient='index').rename_axis('stage').reset_index()
+                    st.dataframe(stage_df, use_container_width=True, hide_index=True)
+                    st.markdown("**Per file (seconds per stage):**")
+                    st.dataframe(pd.DataFrame(total_stats['file_timings']), use_container_width=True, hide_index=True)
+
+            if perform_dry_run:
+                # Kept outside the job so the diff can be paged through after the job is closed
+                st.session_state.dry_run_diff_result = import_worker.load_dry_run_diff(job)
+
+            if not perform_dry_run and any(entry['status'] == 'imported' for entry in job_file_entries):
+                st.info("Creating final backup of updated data...")
+                if backup_manager.run_backup():
+                    st.success("Final backup completed successfully")
+                    st.session_state.backup_list = list_gcs_backups()
+                else:
+                    st.warning("Final backup failed, but data import (if any) was successful.")
+
+            # Downloads are removed by the worker; what is left is the dry-run diff that was just loaded
+            if job['work_dir'] and os.path.exists(job['work_dir']):
+                shutil.rmtree(job['work_dir'], ignore_errors=True)
+
+            st.session_state.batch_import_job_id = None
+            st.info("Batch import process complete.")
+
+    if st.session_state.dry_run_diff_result is not None and st.session_state.batch_import_job_id is None:
+        display_dry_run_diff(st.session_state.dry_run_diff_result)
+
+    if st.session_state.batch_import_job_id is None:
+        # ---- UNDO IMPORTS ----
+        # Each import keeps the changeset needed to undo it, instead of a copy of the whole database
+        with st.expander("↩️ Undo Imports", expanded=False):
+            with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+                recent_imports = import_history.list_imports(conn, limit=50)
+            if not recent_imports:
+                st.info("No imports recorded yet.")
+            else:
+                st.dataframe(pd.DataFrame(recent_imports).drop(columns=['file_sha256']), use_container_width=True, hide_index=True)
+                undoable = [entry['import_id'] for entry in recent_imports if entry['status'] == 'imported']
+                imports_to_undo = st.multiselect(
+                    "Imports to undo", undoable,
+                    format_func=lambda import_id: next(f"#{entry['import_id']} {entry['filename']}" for entry in recent_imports
+                                                       if entry['import_id'] == import_id),
+                    help="Undone newest first. Rows an import inserted are deleted and rows it replaced get their previous values back."
+                )
+                if st.button("Undo Selected Imports", disabled=not imports_to_undo):
                     try:
-                        if os.path.exists(local_filepath) and os.path.getsize(local_filepath) > 0:
-                            stats = import_data(
-                                filepath=local_filepath,
-                                override=override_db,
-                                dry_run=perform_dry_run,
-                                reset_db=False, # Handled once at the start
-                                skip_backup=True, # Handled once at start and once at end
-                                original_filename=gcs_filename
-                            )
-                            if stats:
-                                accumulate_stats(total_stats, stats) 
-                                # Individual file summary can be verbose; consider removing or making it optional for batch mode
-                                # with st.expander(f"Details for {gcs_filename}", expanded=False):
-                                #    display_import_summary(stats, override_db, reset_db, perform_dry_run, is_final_summary=False, current_filename_for_display=gcs_filename)
-                            else:
-                                st.error(f"Failed to get import statistics for {gcs_filename}.")
-                        else:
-                            st.error(f"File {gcs_filename} (local: {local_filepath}) not found or is empty during processing batch.")
-                    except Exception as e:
-                        st.error(f"Error processing {gcs_filename} from {local_filepath}: {e}")
-                
-                st.session_state.batch_import_current_idx += len(files_for_this_processing_batch)
-
-            # Check if all files have been processed
-            if st.session_state.batch_import_current_idx >= len(successfully_downloaded_gcs_filenames):
-                # ---- FINALIZATION OF MULTI-BATCH IMPORT ----
-                status_text_area.success("All batches processed!")
-                progress_bar_area.empty()
-                
-                display_import_summary(total_stats, override_db, reset_db, perform_dry_run, is_final_summary=True)
-                
-                if not perform_dry_run and len(successfully_downloaded_gcs_filenames) > 0:
-                    status_text_area.info("Creating final backup of updated data...")
-                    if backup_manager.run_backup():
-                        st.success("Final backup completed successfully")
-                        st.session_state.backup_list = list_gcs_backups()
+                        with contextlib.closing(podcasts_db.connect(database_file_path)) as conn:
+                            undone = import_history.undo_imports(conn, imports_to_undo)
+                    except (ValueError, sqlite3.OperationalError) as e:
+                        st.error(f"Undo stopped: {e}")
                     else:
-                        st.warning("Final backup failed, but data import (if any) was successful.")
-                
-                # Clean up persistent temporary directory
-                if temp_dir_for_this_run and os.path.exists(temp_dir_for_this_run):
-                    try:
-                        shutil.rmtree(temp_dir_for_this_run)
-                        st.write(f"DEBUG: Removed persistent temp dir: {temp_dir_for_this_run}") # DEBUG
-                    except Exception as e:
-                        st.warning(f"Could not remove batch import temporary directory {temp_dir_for_this_run}: {e}")
-                
-                # Reset batch import state
-                st.session_state.multi_batch_import_active = False
-                st.session_state.gcs_files_for_batch_import = []
-                st.session_state.batch_import_temp_dir = None
-                st.session_state.batch_downloaded_files_map = {}
-                st.session_state.batch_failed_to_download_files = []
-                st.session_state.batch_import_current_idx = 0
-                st.session_state.batch_import_total_stats = {}
-                st.session_state.batch_import_options = {}
-                st.session_state.batch_import_initial_setup_done = False
-                st.info("Batch import process complete.")
-                # No rerun here, allow user to see final messages.
-            else:
-                # More batches to process
-                status_text_area.info(f"Batch complete. Preparing for next batch...")
-                time.sleep(1) # Brief pause for user to see message
-                st.rerun() # Trigger next batch processing cycle
-
-        except Exception as e:
-            st.error(f"An critical error occurred during the batch import process: {e}")
-            st.warning("Batch import process aborted due to an unexpected error. Please check logs.")
-            # Attempt to clean up and reset state
-            if st.session_state.batch_import_temp_dir and os.path.exists(st.session_state.batch_import_temp_dir):
-                try: shutil.rmtree(st.session_state.batch_import_temp_dir) 
-                except: pass
-            st.session_state.multi_batch_import_active = False
-            st.session_state.gcs_files_for_batch_import = []
-            st.session_state.batch_import_temp_dir = None
-            st.session_state.batch_downloaded_files_map = {}
-            st.session_state.batch_failed_to_download_files = []
-            st.session_state.batch_import_current_idx = 0
-            st.session_state.batch_import_total_stats = {}
-            st.session_state.batch_import_options = {}
-            st.session_state.batch_import_initial_setup_done = False
-            st.rerun()
+                        for import_id, counts in undone.items():
+                            st.success(f"Undid import #{import_id}: {counts['deleted']} row(s) deleted, {counts['restored']} restored")
 
     if st.session_state.get('delete_button_pressed'):
         files_to_delete = st.session_state.files_for_action
@@ -1546,7 +1540,7 @@ with tab3:
                     if db_path_examine and os.path.exists(db_path_examine):
                         conn = sqlite3.connect(db_path_examine)
                         cur = conn.cursor()
-                        cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
+                        cur.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view');")
                         tables = [row[0] for row in cur.fetchall()]
                         st.write("### Database Contents")
                         st.write(f"Tables in backup: {tables}")
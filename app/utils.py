@@ -23,7 +23,7 @@ def load_db():
             return pd.DataFrame() 
             
         conn = sqlite3.connect(db_path)
-        table_check_query = "SELECT name FROM sqlite_master WHERE type='table' AND name='podcasts';"
+        table_check_query = "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name='podcasts';"
         cursor = conn.cursor()
         cursor.execute(table_check_query)
         if cursor.fetchone() is None:
@@ -0,0 +1,172 @@
+"""
+Equivalence and speed check for scripts/filename_grammar.py.
+
+Runs the filename grammar and a frozen copy of the regex-per-pattern parser it replaced over a
+corpus of URL parts and reports every input on which they disagree (exit status 1 if any):
+
+    python benchmarks/check_filename_grammar.py
+    python benchmarks/check_filename_grammar.py --db data/podcasts.db --rows 200000
+
+The corpus is the generated benchmark URLs (every filename pattern and merge variant), handcrafted
+edge cases and, with --db, the URLs already imported into a database. Timings compare the
+reference parser with the grammar uncached (cold) and cached (a second pass, as when the same URLs
+come back in the next sheet or file).
+"""
+import logging
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import date
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import unquote
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from benchmarks.generate_workbooks import build_catalog, url_cell_value, variant_filename
+from scripts.filename_grammar import FilenameGrammar, load_rules
+from scripts.import_logging import configure_logging
+
+EDGE_CASES = [
+    "", "/", "//", ".mp3", ".MP3", "a.mp3.mp3", "x.mp3y", "x.Mp3",
+    "123@HPCpodcast", "123@HPCpodcast_", "123@HPCpodcast__Title", "123@HPCpodcastTitle", "123@HPCpodcas_Title",
+    "123@HPCpodcas", "123@OXD_Title", "123@Mktg_Podcast_Title", "1234@HPCNB_Title", "12@HPCNB_Title",
+    "A123-", "A123-Title", "A1234-Title", "a123-Title", "A12-Title",
+    "OXD123_", "OXD123_Title", "HPC123_Title", "HPCNB123_Title", "OXD1234_Title", "oxd123_Title", "A123_Title",
+    "HPCpodcast_123", "HPCpodcast_123_", "HPCpodcast_123_Title", "HPCpodcast_1234", "HPCpodcast_12",
+    "HPCpodcas_123_Title", "HPCpodcas_Title", "HPCpodcast_", "HPCpodcast", "HPCpodcastX_Title",
+    "Mktg_Podcast_Title", "Mktg_Podcast_123", "Mktg_Title", "OXD_", "OXD_123", "OXD__Title", "OXD_123_",
+    "20230115HPCNB_123_Title", "20230115", "2023011", "20231399HPCNB_123_Title", "20230229Title", "00000000Title",
+    "2023011512345_Title", "20230115_Title", "20230115A123-Title",
+    "https://orionx.net/wp-content/uploads/2023/05/HPCNB_123_Title.mp3",
+    "/wp-content/uploads/2023/13/HPCNB_123_Title.mp3", "/wp-content/uploads/2023/00/Title.mp3",
+    "/uploads/2023/2023/05/Title.mp3", "/uploads/2023/xx/2024/06/Title.mp3", "/uploads/2023/5/Title.mp3",
+    "/uploads/2023/05", "/uploads/2023", "2023/05/", "/2023/05/20220101Title.mp3", "/2023/05/20229999Title.mp3",
+    "/uploads/2023/05/HPCNB%5F123%5FTitle.mp3", "/uploads/2023/05/A123%2DTitle.mp3", "/uploads/a%2Fb/Title.mp3",
+    "HPCNB_123_Title%2Fmore.mp3", "%E2%80%93Title.mp3", "Title%20With%20Spaces.MP3", "%zz.mp3",
+    "١٢٣@HPCpodcast_Title", "١٢٣_Title", "/uploads/٢٠٢٣/05/Title.mp3",
+    "HPCNB_123_Title\n", "HPCNB_123\n", "123@HPCNB\n_Title", "OXD_été", "  HPCNB_123_Title", "HPCNB_123_Title  ",
+]
+
+
+def legacy_match_filename_pattern(filename_url_part: str) -> Tuple[str, Tuple[Optional[str], Optional[str], str, Optional[date]]]:
+    """The parser before the filename grammar (scripts/import_data.py), kept as the reference (minus its debug logging)."""
+    if not filename_url_part:
+        return "none", (None, None, "", None)
+    processed_for_date = filename_url_part
+    if '/' in filename_url_part:
+        processed_filename = filename_url_part.split('/')[-1]
+    else:
+        processed_filename = filename_url_part
+    processed_filename = unquote(processed_filename).replace('.mp3', '').replace('.MP3', '')
+    created_at = None
+    if match := re.match(r'^(\d{8})', processed_filename):
+        try:
+            date_str = match.group(1)
+            created_at = date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]))
+            processed_filename = processed_filename[8:]
+        except ValueError:
+            pass
+    if not created_at and '/' in processed_for_date:
+        url_parts = processed_for_date.split('/')
+        for part in url_parts:
+            if re.match(r'^\d{4}$', part):
+                year = int(part)
+                month_idx = url_parts.index(part) + 1
+                if month_idx < len(url_parts):
+                    month_part = url_parts[month_idx]
+                    if re.match(r'^\d{2}$', month_part):
+                        try:
+                            month = int(month_part)
+                            created_at = date(year, month, 1)
+                            break
+                        except ValueError:
+                            continue
+    if match := re.match(r'^(\d{3})@(HPCpodcast|HPCNB|Mktg_Podcast|HPCpodcas)', processed_filename):
+        code_val = match.group(1)
+        feature_val = match.group(2)
+        if feature_val == "HPCpodcas":
+            feature_val = "HPCpodcast"
+        title_val = processed_filename[match.end():]
+        if title_val.startswith('_'):
+            title_val = title_val[1:]
+        return "1", (code_val, feature_val, title_val, created_at)
+    if match := re.match(r'^(A\d{3})-', processed_filename):
+        return "2", (match.group(1), None, processed_filename[match.end():], created_at)
+    if match := re.match(r'^([A-Z]+)(\d{3})_', processed_filename):
+        return "3", (match.group(2), match.group(1), processed_filename[match.end():], created_at)
+    if match_main_feature := re.match(r'^(HPCpodcast|HPCNB|Mktg_Podcast|OXD|HPCpodcas)_', processed_filename):
+        feature_val = match_main_feature.group(1)
+        if feature_val == "HPCpodcas":
+            feature_val = "HPCpodcast"
+        temp_title = processed_filename[match_main_feature.end():]
+        if match_code_and_title := re.match(r'^(\d{3})_(.*)', temp_title):
+            return "4a", (match_code_and_title.group(1), feature_val, match_code_and_title.group(2), created_at)
+        elif match_code_only := re.match(r'^(\d{3})$', temp_title):
+            return "4b", (match_code_only.group(1), feature_val, "", created_at)
+        else:
+            return "4c", (None, feature_val, temp_title, created_at)
+    return "none", (None, None, processed_filename, created_at)
+
+
+def generated_urls(count: int, seed: int) -> List[str]:
+    """URL cells as generate_workbooks writes them, with the hyperlink target used where there is one."""
+    rng = random.Random(seed)
+    catalog = build_catalog(max(count // 3, 1), rng)
+    urls = []
+    for _ in range(count):
+        filename, year, month = variant_filename(catalog[rng.randrange(len(catalog))], rng)
+        value, target = url_cell_value(filename, year, month, rng, hyperlink_rate=0.5)
+        urls.append(target or value)
+    return urls
+
+
+def database_urls(db_path: str) -> List[str]:
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT url FROM podcasts WHERE url IS NOT NULL")]
+
+
+def _timed(parse: Callable[[str], object], corpus: List[str]) -> float:
+    started = time.perf_counter()
+    for url in corpus:
+        parse(url)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Check the filename grammar against the previous parser and time both.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Generated URLs in the corpus")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="Also include the URLs imported into this database")
+    args = parser.parse_args()
+
+    corpus = EDGE_CASES + generated_urls(args.rows, args.seed)
+    if args.db:
+        corpus += database_urls(args.db)
+    distinct = list(dict.fromkeys(corpus))
+    # Unparseable date prefixes are expected in the edge cases
+    configure_logging(logging.ERROR)
+    # Big enough for the whole corpus, so the warm pass measures cache hits rather than LRU evictions
+    grammar = FilenameGrammar({**load_rules(), 'cache_size': max(load_rules()['cache_size'], len(distinct))})
+
+    mismatches = [(url, legacy_match_filename_pattern(url), grammar.match(url)) for url in distinct
+                  if legacy_match_filename_pattern(url) != grammar.match(url)]
+    for url, expected, actual in mismatches[:20]:
+        print(f"MISMATCH {url!r}\n  reference: {expected}\n  grammar:   {actual}")
+    print(f"{len(distinct):,} distinct inputs ({len(corpus):,} total): {len(mismatches):,} mismatches")
+
+    reference_seconds = _timed(legacy_match_filename_pattern, corpus)
+    grammar.parse.cache_clear()
+    cold_seconds = _timed(grammar.parse, corpus)
+    warm_seconds = _timed(grammar.parse, corpus)
+    for label, seconds in (("reference", reference_seconds), ("grammar (cold cache)", cold_seconds),
+                           ("grammar (warm cache)", warm_seconds)):
+        print(f"{label:>22}: {seconds:8.3f}s  {len(corpus) / seconds:>12,.0f} URLs/s  "
+              f"{reference_seconds / seconds:5.1f}x")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,194 @@
+"""
+Synthetic podcast download workbooks for import benchmarks.
+
+Generates files shaped like the real exports:
+
+- Monthly files (`YYYYMMDD_podcast_downloads.xlsx`): one sheet with Downloads / Hits / 206 Hits /
+  Bandwidth / Average size columns.
+- Report files (`report*.xlsx`): one sheet per year with URL / Full / Partial / Total BW / Avg BW columns.
+
+Rows are drawn from a catalog of episodes named after all four filename patterns that
+`extract_code_feature_title` recognizes (plus unmatched names). A share of the rows are duplicate
+variants of an episode that the import merges into one key: date-prefixed names, URL-encoded
+spaces, `.MP3`, `id_`/`sp_` title prefixes and other upload months. Most URL cells are
+hyperlinks showing the bare filename; the rest hold the URL or a relative `/wp-content/uploads`
+path as the cell value. Non-podcast rows and a trailing "Total" row are mixed in, as in the
+exports. Output is deterministic for a given seed.
+
+Workbooks are written in openpyxl's write-only mode, so a 1M-row sheet is streamed to disk
+instead of held in memory.
+"""
+import os
+import random
+from argparse import ArgumentParser
+from typing import List, NamedTuple, Sequence, Tuple
+from urllib.parse import quote
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+MONTHLY_HEADERS = ["Downloads", "Hits", "206 Hits", "Bandwidth", "Average size"]
+REPORT_HEADERS = ["URL", "Full", "Partial", "Total BW", "Avg BW"]
+DEFAULT_REPORT_YEARS = ("2019", "2020", "2021", "2022", "2023")
+BASE_URL = "https://orionx.net"
+UPLOADS_PATH = "/wp-content/uploads"
+
+# (pattern, filename template); {code} is three digits, {title} an underscore-separated title
+FILENAME_PATTERNS = (
+    ("1", "{code}@HPCpodcast_{title}"),
+    ("1", "{code}@HPCNB_{title}"),
+    ("2", "A{code}-{title}"),
+    ("3", "OXD{code}_{title}"),
+    ("3", "HPC{code}_{title}"),
+    ("4a", "HPCNB_{code}_{title}"),
+    ("4a", "Mktg_Podcast_{code}_{title}"),
+    ("4b", "HPCpodcast_{code}"),
+    ("4c", "OXD_{title}"),
+    ("none", "{title}"),
+)
+TITLE_WORDS = ("Exascale", "Quantum", "AI", "Chips", "Cloud", "Storage", "Networks", "HPC", "Energy",
+               "Interview", "Roundup", "Trends", "Benchmarks", "Memory", "Software", "Security")
+NOISE_PATHS = ("/wp-content/themes/orionx/style.css", "/feed/podcast", "/wp-content/plugins/player.js", "")
+
+
+class Episode(NamedTuple):
+    pattern: str
+    stem: str
+    year: int
+    month: int
+
+
+def build_catalog(size: int, rng: random.Random) -> List[Episode]:
+    episodes = []
+    for index in range(size):
+        pattern, template = FILENAME_PATTERNS[index % len(FILENAME_PATTERNS)]
+        words = rng.sample(TITLE_WORDS, 3)
+        # The index number puts each episode in its own resolution block, so generated episodes never merge
+        title = f"{words[0]}_{index}_{words[1]}_{words[2]}"
+        stem = template.format(code=f"{index % 1000:03d}", title=title)
+        episodes.append(Episode(pattern, stem, rng.randint(2019, 2024), rng.randint(1, 12)))
+    rng.shuffle(episodes)
+    return episodes
+
+
+def variant_filename(episode: Episode, rng: random.Random) -> Tuple[str, int, int]:
+    """A filename (and upload year/month) for the episode, sometimes a variant the import merges."""
+    stem, year, month, extension = episode.stem, episode.year, episode.month, ".mp3"
+    roll = rng.random()
+    if roll < 0.1:
+        stem = f"{year}{month:02d}{rng.randint(1, 28):02d}{stem}"
+    elif roll < 0.2 and episode.pattern != "4b":
+        head, _, tail = stem.rpartition("_")  # A space inside the title, URL-encoded as %20
+        stem = f"{head} {tail}"
+    elif roll < 0.25:
+        extension = ".MP3"
+    elif roll < 0.3 and episode.pattern == "none":
+        stem = rng.choice(("id_", "sp_", "iv_")) + stem
+    elif roll < 0.35:
+        year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+    return stem + extension, year, month
+
+
+def url_cell_value(filename: str, year: int, month: int, rng: random.Random, hyperlink_rate: float):
+    """(cell value, hyperlink target or None) for a Downloads/URL cell."""
+    path = f"{UPLOADS_PATH}/{year}/{month:02d}/{quote(filename)}"
+    if rng.random() < hyperlink_rate:
+        return filename, BASE_URL + path
+    return (BASE_URL + path if rng.random() < 0.5 else path), None
+
+
+def bandwidth_value(megabytes: float, rng: random.Random):
+    """Bandwidth as the exports write it: 'NN.NN MB', 'N.NN GB' or a plain number."""
+    roll = rng.random()
+    if roll < 0.6:
+        return f"{megabytes:.2f} MB"
+    if roll < 0.8 and megabytes >= 1024:
+        return f"{megabytes / 1024:.2f} GB"
+    return round(megabytes, 2)
+
+
+def write_sheet(ws, headers: Sequence[str], rows: int, catalog: List[Episode], rng: random.Random,
+                duplicate_rate: float, hyperlink_rate: float, noise_rate: float) -> None:
+    ws.append(list(headers))
+    fresh = 0
+    for _ in range(rows):
+        if rng.random() < noise_rate:
+            ws.append([rng.choice(NOISE_PATHS), rng.randint(0, 500), rng.randint(0, 100), "0.50 MB", 0.5])
+            continue
+        # Duplicates revisit an episode already used in this sheet, fresh rows take the next one
+        if fresh and (rng.random() < duplicate_rate or fresh >= len(catalog)):
+            episode = catalog[rng.randrange(fresh)]
+        else:
+            episode = catalog[fresh]
+            fresh += 1
+        filename, year, month = variant_filename(episode, rng)
+        value, target = url_cell_value(filename, year, month, rng, hyperlink_rate)
+        cell = WriteOnlyCell(ws, value=value)
+        if target:
+            cell.hyperlink = target
+        full, partial = rng.randint(0, 400), rng.randint(0, 150)
+        size_mb = rng.uniform(5, 80)
+        total_mb = size_mb * (full + partial * 0.3)
+        ws.append([cell, full, partial, bandwidth_value(total_mb, rng), f"{size_mb:.2f} MB"])
+    ws.append(["Total", None, None, None, None])
+
+
+def generate_monthly(path: str, rows: int, seed: int = 1, duplicate_rate: float = 0.3,
+                     hyperlink_rate: float = 0.85, noise_rate: float = 0.02) -> str:
+    """Write a monthly workbook with `rows` data rows to `path` (which must be a monthly filename)."""
+    rng = random.Random(seed)
+    catalog = build_catalog(max(int(rows * (1 - duplicate_rate)), 1), rng)
+    wb = Workbook(write_only=True)
+    write_sheet(wb.create_sheet("Sheet1"), MONTHLY_HEADERS, rows, catalog, rng, duplicate_rate, hyperlink_rate, noise_rate)
+    wb.save(path)
+    return path
+
+
+def generate_report(path: str, rows: int, seed: int = 1, years: Sequence[str] = DEFAULT_REPORT_YEARS,
+                    duplicate_rate: float = 0.3, hyperlink_rate: float = 0.85, noise_rate: float = 0.02) -> str:
+    """Write a report workbook with `rows` data rows spread over one sheet per year."""
+    rng = random.Random(seed)
+    per_sheet = [rows // len(years) + (1 if index < rows % len(years) else 0) for index in range(len(years))]
+    catalog = build_catalog(max(int(max(per_sheet) * (1 - duplicate_rate)), 1), rng)
+    wb = Workbook(write_only=True)
+    for year, sheet_rows in zip(years, per_sheet):
+        write_sheet(wb.create_sheet(year), REPORT_HEADERS, sheet_rows, catalog, rng, duplicate_rate, hyperlink_rate, noise_rate)
+    wb.save(path)
+    return path
+
+
+def workbook_path(kind: str, rows: int, seed: int, directory: str) -> str:
+    """Where a generated workbook lives; the directory name encodes the parameters so files can be reused."""
+    folder = os.path.join(directory, f"{kind}_{rows}_seed{seed}")
+    filename = "20240101_podcast_downloads.xlsx" if kind == "monthly" else "report_benchmark.xlsx"
+    return os.path.join(folder, filename)
+
+
+def ensure_workbook(kind: str, rows: int, seed: int = 1, directory: str = os.path.join("benchmarks", "workbooks"),
+                    regenerate: bool = False) -> str:
+    """Path to a generated workbook, generating it first unless it already exists."""
+    path = workbook_path(kind, rows, seed, directory)
+    if regenerate or not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), ".partial.xlsx")
+        generator = generate_monthly if kind == "monthly" else generate_report
+        generator(tmp_path, rows, seed=seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Generate synthetic podcast download workbooks.")
+    parser.add_argument("kind", choices=("monthly", "report"))
+    parser.add_argument("rows", type=int, help="Number of data rows (spread over the year sheets for reports)")
+    parser.add_argument("--output", help="Output path (default: benchmarks/workbooks/<kind>_<rows>_seed<seed>/...)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3, help="Share of rows that repeat an episode, often as a variant")
+    parser.add_argument("--hyperlink-rate", type=float, default=0.85, help="Share of URL cells written as hyperlinks")
+    args = parser.parse_args()
+
+    path = args.output or workbook_path(args.kind, args.rows, args.seed, os.path.join("benchmarks", "workbooks"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    generator = generate_monthly if args.kind == "monthly" else generate_report
+    generator(path, args.rows, seed=args.seed, duplicate_rate=args.duplicate_rate, hyperlink_rate=args.hyperlink_rate)
+    print(f"Wrote {args.rows:,} {args.kind} rows to {path}")
@@ -0,0 +1,153 @@
+"""
+End-to-end import benchmark.
+
+Times `import_data` on generated monthly and report workbooks (benchmarks/generate_workbooks.py)
+at several sizes and writes the results as JSON, so runs on different commits can be compared:
+
+    python benchmarks/run_import_benchmark.py                       # 1k, 10k, 100k and 1M rows
+    python benchmarks/run_import_benchmark.py --sizes 1000 10000 --compare benchmarks/results/<older>.json
+
+Every import runs in a fresh process against an empty database, without the sheet cache, so the
+timings and peak RSS belong to that import alone. Generated workbooks are kept under
+benchmarks/workbooks/ and reused by later runs with the same size and seed. `--progress` prints
+each import's progress events (rows read and written, with their throughput) as it runs.
+"""
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from benchmarks.generate_workbooks import ensure_workbook
+from scripts.import_data import DEFAULT_READER_ENGINE, READER_ENGINES, get_peak_rss_mb, get_rules_version, import_data
+from scripts.import_progress import print_progress
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_KINDS = ("monthly", "report")
+WORKBOOK_DIR = os.path.join(_project_root, "benchmarks", "workbooks")
+RESULTS_DIR = os.path.join(_project_root, "benchmarks", "results")
+# Slowdowns beyond this factor are flagged by --compare
+REGRESSION_THRESHOLD = 1.10
+
+
+def _timed_import(path: str, engine: str, progress: bool = False) -> dict:
+    """Benchmark worker: import `path` into a throwaway database and report timings."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        started = time.perf_counter()
+        stats = import_data(path, engine=engine, db_path=os.path.join(tmp_dir, "podcasts.db"),
+                            use_cache=False, force=True, progress=print_progress if progress else None)
+        seconds = time.perf_counter() - started
+    return {
+        'seconds': round(seconds, 3),
+        'rows_scanned': stats['rows']['scanned'],
+        'rows_written': stats['actual']['inserted'] + stats['actual']['replaced'],
+        'sheets_processed': stats['sheets']['processed'],
+        'peak_rss_mb': get_peak_rss_mb(),
+        'timings': stats['timings'],
+    }
+
+
+def run_case(kind: str, rows: int, engine: str, seed: int, repeat: int, progress: bool = False) -> dict:
+    """Generate (or reuse) one workbook and import it `repeat` times; the fastest run is reported."""
+    generate_started = time.perf_counter()
+    path = ensure_workbook(kind, rows, seed=seed, directory=WORKBOOK_DIR)
+    generate_seconds = time.perf_counter() - generate_started
+
+    runs = []
+    for _ in range(repeat):
+        # A new process per run, so the peak RSS is this import's own
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            runs.append(executor.submit(_timed_import, path, engine, progress).result())
+    best = min(runs, key=lambda run: run['seconds'])
+    return {
+        'kind': kind,
+        'rows': rows,
+        'engine': engine,
+        'file_bytes': os.path.getsize(path),
+        'generate_seconds': round(generate_seconds, 3),
+        'runs_seconds': [run['seconds'] for run in runs],
+        **best,
+        'rows_per_sec': round(best['rows_scanned'] / best['seconds'], 1) if best['seconds'] else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_project_root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current: List[dict], baseline: List[dict]) -> List[str]:
+    """One line per case present in both result sets, flagging slowdowns beyond REGRESSION_THRESHOLD."""
+    previous = {(case['kind'], case['rows'], case['engine']): case for case in baseline}
+    lines = []
+    for case in current:
+        before = previous.get((case['kind'], case['rows'], case['engine']))
+        if not before or not before['seconds']:
+            continue
+        ratio = case['seconds'] / before['seconds']
+        flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        lines.append(f"{case['kind']:>8} {case['rows']:>10,} rows: {before['seconds']:9.3f}s -> {case['seconds']:9.3f}s"
+                     f" ({ratio:.2f}x){flag}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Time import_data end to end on generated workbooks and write JSON results.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Row counts to benchmark")
+    parser.add_argument("--kinds", nargs="+", choices=DEFAULT_KINDS, default=list(DEFAULT_KINDS))
+    parser.add_argument("--engine", choices=READER_ENGINES, default=DEFAULT_READER_ENGINE)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="Imports per case; the fastest is reported")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/import_<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--progress", action="store_true", help="Print progress events of each import to stderr")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        for kind in args.kinds:
+            case = run_case(kind, rows, args.engine, args.seed, args.repeat, args.progress)
+            results.append(case)
+            print(f"{kind:>8} {rows:>10,} rows: {case['seconds']:9.3f}s  {case['rows_per_sec']:>12,.0f} rows/s"
+                  f"  peak {case['peak_rss_mb']:.1f} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    report: Dict[str, object] = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'rules_version': get_rules_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} result(s) to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        print(f"\nCompared with {args.compare}:")
+        for line in compare_results(results, baseline) or ["No matching cases."]:
+            print(line)
@@ -0,0 +1,192 @@
+"""
+Schema migration benchmark.
+
+Builds databases as they were before schema versioning (a `podcasts` table, PRAGMA user_version
+0) at several sizes, migrates each to the current schema (scripts/podcasts_db.py, MIGRATIONS) and
+writes the results as JSON, so runs on different commits can be compared:
+
+    python benchmarks/run_migration_benchmark.py                    # 100k and 1M rows
+    python benchmarks/run_migration_benchmark.py --sizes 100000 --compare benchmarks/results/<older>.json
+
+Rows are episodes of the workbook generator's catalog (benchmarks/generate_workbooks.py) with the
+metadata the filename rules give them, one row per episode and month over as many months as the
+size needs, each month from its own monthly file. Each migration is timed in its own transaction,
+then VACUUM separately, along with the file size before and after, a connect() on the migrated
+database (the cost every later open pays) and a group-by-title query on both layouts.
+"""
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from datetime import datetime
+from typing import Dict, List
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from benchmarks.generate_workbooks import BASE_URL, UPLOADS_PATH, build_catalog
+from benchmarks.run_import_benchmark import RESULTS_DIR, REGRESSION_THRESHOLD, _git_commit
+from scripts import podcasts_db
+from scripts.import_data import url_metadata
+
+DEFAULT_SIZES = (100_000, 1_000_000)
+DEFAULT_EPISODES = 5_000
+INSERT_BATCH_ROWS = 50_000
+GROUP_BY_TITLE_SQL = "SELECT title, SUM(eq_full) FROM podcasts GROUP BY title"
+
+
+def build_legacy_database(path: str, rows: int, episodes: int, seed: int) -> None:
+    """A pre-versioning database at `path` with `rows` rows in its `podcasts` table."""
+    rng = random.Random(seed)
+    catalog = {}
+    for episode in build_catalog(episodes, rng):
+        url = f"{BASE_URL}{UPLOADS_PATH}/{episode.year}/{episode.month:02d}/{episode.stem}.mp3"
+        if url not in catalog:
+            code, feature, title, created_at = url_metadata(url)[:4]
+            catalog[url] = (url, title, code, feature, created_at)
+    catalog = list(catalog.values())
+    months = math.ceil(rows / len(catalog))
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute(podcasts_db.LEGACY_PODCASTS_DDL)
+        conn.execute("BEGIN")
+        batch = []
+        for index in range(rows):
+            url, title, code, feature, created_at = catalog[index % len(catalog)]
+            period = months - 1 - index // len(catalog)
+            year, month = 2024 - period // 12, 12 - period % 12
+            full, partial = rng.randint(0, 500), rng.randint(0, 200)
+            total_bw = round(rng.uniform(1, 5000), 2)
+            batch.append((url, title, code, feature, full, partial, total_bw / max(full + partial, 1), total_bw,
+                          math.floor(full + 0.5 * partial), created_at, f"{year}-{month:02d}-01", year, month, 0,
+                          f"{year}-{month:02d}-02T09:00:00", f"{year}{month:02d}01_podcast_downloads.xlsx", period + 1))
+            if len(batch) == INSERT_BATCH_ROWS:
+                conn.executemany(f"INSERT INTO podcasts VALUES ({', '.join('?' for _ in batch[0])})", batch)
+                batch = []
+        if batch:
+            conn.executemany(f"INSERT INTO podcasts VALUES ({', '.join('?' for _ in batch[0])})", batch)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def _timed_query(path: str, sql: str) -> float:
+    conn = sqlite3.connect(path)
+    try:
+        started = time.perf_counter()
+        conn.execute(sql).fetchall()
+        return time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+def run_case(rows: int, episodes: int, seed: int) -> dict:
+    """Build one pre-versioning database in a temporary directory and migrate it."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "podcasts.db")
+        started = time.perf_counter()
+        build_legacy_database(path, rows, episodes, seed)
+        build_seconds = time.perf_counter() - started
+        bytes_before = os.path.getsize(path)
+        query_before = _timed_query(path, GROUP_BY_TITLE_SQL)
+
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            migrations = podcasts_db.migrate(conn, vacuum=False)
+            started = time.perf_counter()
+            conn.execute("VACUUM")
+            vacuum_seconds = time.perf_counter() - started
+            version = podcasts_db.schema_version(conn)
+        finally:
+            conn.close()
+        bytes_after = os.path.getsize(path)
+
+        started = time.perf_counter()
+        podcasts_db.connect(path).close()
+        connect_seconds = time.perf_counter() - started
+        query_after = _timed_query(path, GROUP_BY_TITLE_SQL)
+
+    migrate_seconds = sum(migration['seconds'] for migration in migrations)
+    return {
+        'rows': rows,
+        'episodes': episodes,
+        'schema_version': version,
+        'build_seconds': round(build_seconds, 3),
+        'migrations': [dict(migration, seconds=round(migration['seconds'], 3)) for migration in migrations],
+        'vacuum_seconds': round(vacuum_seconds, 3),
+        'seconds': round(migrate_seconds + vacuum_seconds, 3),
+        'rows_per_sec': round(rows / migrate_seconds) if migrate_seconds else None,
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'up_to_date_connect_seconds': round(connect_seconds, 4),
+        'group_by_title_seconds': {'before': round(query_before, 3), 'after': round(query_after, 3)},
+    }
+
+
+def compare_results(current: List[dict], baseline: List[dict]) -> List[str]:
+    """One line per size present in both result sets, flagging slowdowns beyond REGRESSION_THRESHOLD."""
+    previous = {case['rows']: case for case in baseline}
+    lines = []
+    for case in current:
+        before = previous.get(case['rows'])
+        if not before or not before['seconds']:
+            continue
+        ratio = case['seconds'] / before['seconds']
+        flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        lines.append(f"{case['rows']:>10,} rows: {before['seconds']:9.3f}s -> {case['seconds']:9.3f}s ({ratio:.2f}x){flag}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Time the schema migrations on generated pre-versioning databases and write JSON results.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Row counts to benchmark")
+    parser.add_argument("--episodes", type=int, default=DEFAULT_EPISODES, help="Distinct episodes (URLs) in each database")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/migration_<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        case = run_case(rows, args.episodes, args.seed)
+        results.append(case)
+        steps = ", ".join(f"v{migration['version']} {migration['seconds']:.2f}s" for migration in case['migrations'])
+        print(f"{rows:>10,} rows: {case['seconds']:8.2f}s ({steps}, vacuum {case['vacuum_seconds']:.2f}s)  "
+              f"{case['bytes_before'] / 1e6:,.1f} MB -> {case['bytes_after'] / 1e6:,.1f} MB  "
+              f"group by title {case['group_by_title_seconds']['before']:.3f}s -> {case['group_by_title_seconds']['after']:.3f}s  "
+              f"connect {case['up_to_date_connect_seconds'] * 1000:.1f} ms")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"migration_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    report: Dict[str, object] = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'schema_version': podcasts_db.SCHEMA_VERSION,
+            'sqlite': sqlite3.sqlite_version,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} result(s) to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        print(f"\nCompared with {args.compare}:")
+        for line in compare_results(results, baseline) or ["No matching cases."]:
+            print(line)
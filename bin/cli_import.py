@@ -1,15 +1,21 @@
 import sys
 import argparse
-from scripts.import_data import import_data
+from scripts.import_data import import_data, READER_ENGINES, DEFAULT_READER_ENGINE
+from scripts.import_logging import add_verbosity_arguments, configure_logging, level_from_args
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("filepath", help="Path to the data file (Excel)")
     parser.add_argument("--override-db", action="store_true", help="Override the existing database")
     parser.add_argument("--dry-run", action="store_true", help="Run without making any changes")
+    parser.add_argument("--engine", choices=READER_ENGINES, default=DEFAULT_READER_ENGINE, help="Excel reader engine")
+    parser.add_argument("--force", action="store_true", help="Import even if the file is unchanged since its last import")
+    parser.add_argument("--sheet-workers", type=int, default=1, help="Parse report sheets in this many processes")
+    add_verbosity_arguments(parser)
     args = parser.parse_args()
+    configure_logging(level_from_args(args))
 
-    import_data(args.filepath, override=args.override_db, dry_run=args.dry_run)
+    import_data(args.filepath, override=args.override_db, dry_run=args.dry_run, engine=args.engine, sheet_workers=args.sheet_workers, force=args.force)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,308 @@
+"""
+Parallel multi-file import.
+
+Worker processes parse and aggregate workbooks concurrently (import_data.parse_workbook); the
+calling process is the only SQLite writer and applies the parsed files in precedence order:
+monthly files chronologically, then report files. Because each file is written exactly as a
+sequential `import_data` run would write it, the resulting database is the same as importing
+the files one by one in that order.
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from scripts import import_jobs, podcasts_db
+from scripts.import_data import (
+    DEFAULT_READER_ENGINE, READER_ENGINES, TIMING_STAGES, detect_file_type, file_sha256, get_peak_rss_mb, new_import_stats,
+    parse_workbook, print_import_summary, unchanged_file_stats, write_parsed_workbook
+)
+from scripts.import_progress import CancelToken, ProgressCallback, WorkerRelay, print_progress, worker_hooks
+from scripts.import_logging import (
+    add_verbosity_arguments, capture_logs, configure_logging, current_level, get_logger, level_from_args
+)
+
+logger = get_logger("batch_import")
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+TIMING_COLUMNS = (['filename', 'file_type', 'status', 'parse_seconds', 'wait_seconds', 'write_seconds']
+                  + [f'{stage}_seconds' for stage in TIMING_STAGES]
+                  + ['rows_scanned', 'rows_written', 'sheets_processed', 'sheet_cache_hits', 'worker_peak_rss_mb', 'error'])
+
+
+def order_import_files(items: Sequence, key=None) -> List:
+    """
+    Sort files into write precedence order: monthly files chronologically (their YYYYMMDD prefix),
+    then report files, then anything unrecognised. Order within reports is kept as given.
+    `key` maps an item to its filename (default: the item itself).
+    """
+    def precedence(indexed):
+        index, item = indexed
+        name = key(item) if key else item
+        file_type = detect_file_type(os.path.basename(name))
+        if file_type == "monthly":
+            return (0, os.path.basename(name), index)
+        if file_type == "report":
+            return (1, "", index)
+        return (2, "", index)
+    return [item for _, item in sorted(enumerate(items), key=precedence)]
+
+
+def _parse_file(filepath: str, original_filename: Optional[str], engine: str, sheet_workers: int = 1,
+                sha256: Optional[str] = None, use_cache: bool = True, log_level: int = logging.WARNING,
+                progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None) -> dict:
+    """Parse one file. Output is captured so files are logged whole, in write order."""
+    started = time.perf_counter()
+    with capture_logs(log_level) as output:
+        parsed = parse_workbook(filepath, original_filename=original_filename, engine=engine,
+                                sheet_workers=sheet_workers, sha256=sha256, use_cache=use_cache,
+                                progress=progress, cancel=cancel)
+    parsed['parse_seconds'] = time.perf_counter() - started
+    parsed['output'] = output.getvalue()
+    return parsed
+
+
+def _parse_file_in_worker(filepath: str, original_filename: Optional[str], engine: str, sheet_workers: int,
+                          sha256: Optional[str], use_cache: bool, log_level: int, relay_args=(None, None)) -> dict:
+    """Worker entry point: _parse_file() reporting through the writer's WorkerRelay."""
+    progress, cancel = worker_hooks(*relay_args)
+    return _parse_file(filepath, original_filename, engine, sheet_workers, sha256, use_cache, log_level, progress, cancel)
+
+
+def _failed_parse(filepath: str, original_filename: Optional[str], engine: str, error: Exception) -> dict:
+    filename_only = os.path.basename(original_filename or filepath)
+    stats = new_import_stats(filename_only, detect_file_type(filename_only), engine)
+    stats['sheets']['skipped']['unreadable'] = 1
+    stats['unprocessed_sheet_info'].append({
+        'sheet_name': 'N/A (worker error)',
+        'reason': f'Error parsing file in worker: {error}'
+    })
+    return {'filepath': filepath, 'readable': False, 'stats': stats, 'sheets': [],
+            'parse_seconds': 0.0, 'output': '', 'error': str(error)}
+
+
+def import_files_parallel(filepaths: Sequence[str], workers: int = DEFAULT_WORKERS, dry_run: bool = False,
+                          reset_db: bool = False, original_filenames: Optional[Sequence[str]] = None,
+                          engine: str = DEFAULT_READER_ENGINE, db_path: str = podcasts_db.DEFAULT_DB_PATH,
+                          sheet_workers: int = 1, force: bool = False, use_cache: bool = True,
+                          job_id: Optional[int] = None, progress: Optional[ProgressCallback] = None,
+                          cancel: Optional[CancelToken] = None) -> Dict[str, object]:
+    """
+    Import several workbooks, parsing them in `workers` processes and writing them from this one.
+
+    Files are written in order_import_files() order regardless of the order given. `workers <= 1`
+    parses in-process; `sheet_workers` is passed on to parse_workbook() for multi-sheet reports.
+    Files whose content was already imported under the current rules are skipped without being
+    parsed unless `force` is set; `use_cache` enables the on-disk sheet cache. Workers log at the
+    level configured for this process (scripts/import_logging.py) and their output is printed per
+    file, in write order. Returns {'files': [per-file stats in write order], 'timings': DataFrame}
+    where the timings table has one row per file (TIMING_COLUMNS).
+
+    `reset_db` (outside dry runs) rebuilds the database from the files alone: they are written into
+    a shadow database that replaces `db_path` once every file is in (podcasts_db.publish_shadow_build),
+    so readers see the old data until then. If the import fails or is cancelled, the live database
+    is left as it was.
+
+    With `job_id`, each file is checkpointed in that import job (scripts/import_jobs.py) under its
+    original filename (or path): written files in the same transaction as their rows, unchanged and
+    failed files right after. The job lives in `db_path`, so it cannot be combined with `reset_db`
+    (import_worker.run_job rebuilds the database for jobs that ask for it).
+
+    `progress` receives the events of every parsed file, including those parsed in workers, and
+    `cancel` is checked between files and inside them (scripts/import_progress.py). A cancelled
+    import raises ImportCancelled; the files written before it stay written, the file in
+    progress is rolled back.
+    """
+    if job_id is not None and reset_db:
+        raise ValueError("reset_db cannot be combined with job_id: the job is stored in the database being reset")
+    if original_filenames is None:
+        original_filenames = [None] * len(filepaths)
+    jobs = order_import_files(list(zip(filepaths, original_filenames)), key=lambda job: job[1] or job[0])
+
+    target_db = db_path
+    if reset_db and not dry_run:
+        logger.info("🗑️ Rebuilding database %s from scratch due to --reset-db flag.", db_path)
+        target_db = podcasts_db.start_shadow_build(db_path)
+
+    results = []
+    timings = []
+    executor = None
+    relay = None
+    published = False
+    conn = podcasts_db.connect(target_db)
+    try:
+        # Hash every file up front so unchanged ones never reach a worker
+        hashes = [file_sha256(path) if os.path.isfile(path) else None for path, _ in jobs]
+        unchanged = {}
+        if not force:
+            for index, ((path, name), sha256) in enumerate(zip(jobs, hashes)):
+                if sha256:
+                    skipped = unchanged_file_stats(conn, path, sha256, name, engine)
+                    if skipped:
+                        unchanged[index] = skipped
+
+        log_level = current_level()
+        to_parse = len(jobs) - len(unchanged)
+        if workers > 1 and to_parse > 1:
+            # spawn: forking a threaded parent (Streamlit) can deadlock the children
+            executor = ProcessPoolExecutor(max_workers=min(workers, to_parse),
+                                           mp_context=multiprocessing.get_context("spawn"))
+            if progress is not None or cancel is not None:
+                relay = WorkerRelay(progress, cancel)
+        futures = [
+            executor.submit(_parse_file_in_worker, path, name, engine, sheet_workers, sha256, use_cache, log_level,
+                            relay.worker_args() if relay else (None, None))
+            if executor and index not in unchanged else None
+            for index, ((path, name), sha256) in enumerate(zip(jobs, hashes))
+        ]
+        for index, ((path, name), sha256, future) in enumerate(zip(jobs, hashes, futures)):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            if index in unchanged:
+                results.append(unchanged[index])
+                timings.append(dict({column: 0 for column in TIMING_COLUMNS}, filename=unchanged[index]['filename'],
+                                    file_type=unchanged[index]['file_type'], status='unchanged', error=None))
+                if job_id is not None:
+                    import_jobs.checkpoint_file(conn, job_id, name or path, 'unchanged', unchanged[index])
+                    import_jobs.record_timing(conn, job_id, name or path, timings[-1])
+                continue
+            wait_started = time.perf_counter()
+            try:
+                if future is None:
+                    parsed = _parse_file(path, name, engine, sheet_workers, sha256, use_cache, log_level, progress, cancel)
+                else:
+                    parsed = relay.result(future) if relay else future.result()
+            except Exception as e:
+                parsed = _failed_parse(path, name, engine, e)
+            wait_seconds = time.perf_counter() - wait_started if future else 0.0
+            if parsed['output']:
+                sys.stdout.write(parsed['output'])
+
+            stats = parsed['stats']
+            write_started = time.perf_counter()
+            checkpoint = None
+            finished_status = 'previewed' if dry_run else 'imported'
+            if job_id is not None:
+                def checkpoint(conn, stats, job_file=name or path):
+                    import_jobs.checkpoint_file(conn, job_id, job_file, finished_status, stats)
+            if parsed['readable']:
+                write_parsed_workbook(conn, parsed, dry_run=dry_run, checkpoint=checkpoint, progress=progress, cancel=cancel,
+                                      job_id=job_id)
+                print_import_summary(stats, path, dry_run)
+            write_seconds = time.perf_counter() - write_started
+
+            written = stats['dry_run'] if dry_run else stats['actual']
+            timings.append({
+                'filename': stats['filename'],
+                'file_type': stats['file_type'],
+                'status': 'failed' if parsed.get('error') or not parsed['readable'] else finished_status,
+                'parse_seconds': round(parsed['parse_seconds'], 3),
+                'wait_seconds': round(wait_seconds, 3),
+                'write_seconds': round(write_seconds, 3),
+                **{f'{stage}_seconds': round(stats['timings'][stage]['seconds'], 3) for stage in TIMING_STAGES},
+                'rows_scanned': stats['rows']['scanned'],
+                'rows_written': written['inserted'] + written['replaced'],
+                'sheets_processed': stats['sheets']['processed'],
+                'sheet_cache_hits': stats['workbook']['sheet_cache_hits'],
+                'worker_peak_rss_mb': stats['workbook']['peak_rss_mb'],
+                'error': parsed.get('error'),
+            })
+            results.append(stats)
+            if job_id is not None:
+                if timings[-1]['status'] == 'failed':
+                    import_jobs.checkpoint_file(conn, job_id, name or path, 'failed', stats, error=parsed.get('error'))
+                import_jobs.record_timing(conn, job_id, name or path, timings[-1], stats)
+        if target_db != db_path:
+            conn.close()
+            podcasts_db.publish_shadow_build(db_path)
+            published = True
+    finally:
+        conn.close()
+        if target_db != db_path and not published:
+            podcasts_db.discard_shadow_build(db_path)
+        if relay:
+            # Passes a cancellation on to the workers, so the shutdown does not wait for whole files
+            relay.pump()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        if relay:
+            relay.close()
+
+    return {'files': results, 'timings': pd.DataFrame(timings, columns=TIMING_COLUMNS),
+            'peak_rss_mb': get_peak_rss_mb()}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Import several podcast Excel files, parsing them in parallel.")
+    parser.add_argument("filepaths", nargs="*", help="Paths to Excel files (written monthly-first, reports last)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Parser processes (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--sheet-workers", type=int, default=1, help="Processes per multi-sheet report workbook (xml engine only)")
+    parser.add_argument("--dry-run", action="store_true", help="Preview actions only; no changes will be made to the database.")
+    parser.add_argument("--reset-db", action="store_true", help="Rebuild the database from these files alone; the current one stays readable until the new one replaces it. Use with caution.")
+    parser.add_argument("--engine", choices=READER_ENGINES, default=DEFAULT_READER_ENGINE, help="Excel reader engine")
+    parser.add_argument("--force", action="store_true", help="Import files even if the same content was already imported under the current parsing rules.")
+    parser.add_argument("--no-cache", action="store_true", help="Read every sheet from the workbooks instead of the data/cache/ sheet cache.")
+    parser.add_argument("--progress", action="store_true", help="Print progress events (sheets, rows read, rows written) with their throughput to stderr.")
+    parser.add_argument("--job", action="store_true", help="Record progress as an import job, so an interrupted run can be resumed with --resume-job.")
+    parser.add_argument("--resume-job", type=int, metavar="JOB_ID", help="Import the files an interrupted job has not finished, with the options it was started with.")
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    # Batch runs only print warnings and the timing table unless asked for more (-v, -vv)
+    configure_logging(level_from_args(args, default=logging.WARNING))
+
+    started = time.perf_counter()
+    progress = print_progress if args.progress else None
+    if args.job or args.resume_job is not None:
+        # Jobs run under the import worker's lock, so a background worker never runs the same job
+        from scripts import import_worker
+        conn = podcasts_db.connect()
+        if args.resume_job is not None:
+            if args.filepaths or args.reset_db:
+                parser.error("--resume-job takes the files and options of the job; do not pass files or --reset-db")
+            job = import_jobs.get_job(conn, args.resume_job)
+            if job is None or job['status'] not in ('queued', 'running'):
+                parser.error(f"No unfinished import job {args.resume_job}")
+            job_id = job['job_id']
+            args.workers = job['options'].get('workers', args.workers)
+            print(f"Resuming import job {job_id}: {len(import_jobs.job_files(conn, job_id, statuses=import_jobs.REMAINING_STATUSES))} file(s) left")
+        else:
+            if not args.filepaths:
+                parser.error("no files given")
+            # Absolute paths, so the job can be resumed from another directory
+            filepaths = [os.path.abspath(path) for path in args.filepaths]
+            options = {'workers': args.workers, 'sheet_workers': args.sheet_workers, 'dry_run': args.dry_run,
+                       'engine': args.engine, 'force': args.force, 'use_cache': not args.no_cache,
+                       'reset_db': args.reset_db}
+            job_id = import_jobs.create_job(conn, order_import_files(filepaths), options,
+                                            local_paths={path: path for path in filepaths})
+            print(f"Started import job {job_id} (resume with --resume-job {job_id})")
+        conn.close()
+        lock_file = import_worker.acquire_lock(podcasts_db.DEFAULT_DB_PATH)
+        if lock_file is None:
+            print(f"An import worker is running; it will import job {job_id}.")
+            sys.exit(0)
+        with lock_file:
+            result = import_worker.run_job(podcasts_db.DEFAULT_DB_PATH, job_id, progress=progress)
+    else:
+        if not args.filepaths:
+            parser.error("no files given")
+        result = import_files_parallel(args.filepaths, workers=args.workers, dry_run=args.dry_run,
+                                       reset_db=args.reset_db, engine=args.engine,
+                                       sheet_workers=args.sheet_workers, force=args.force,
+                                       use_cache=not args.no_cache, progress=progress)
+    print("\nPer-file timings:")
+    print(result['timings'].to_string(index=False))
+    unchanged = sum(stats['files']['unchanged_skipped'] for stats in result['files'])
+    print(f"\nProcessed {len(result['files'])} file(s) ({unchanged} unchanged, skipped) with {args.workers} worker(s) in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,151 @@
+"""
+Filename grammar for podcast download URLs.
+
+Turns a URL or filename into (code, feature, title, created_at) the way the import has always
+done it (see docs/DATA_INGESTION.md, "From Filenames"):
+
+    1   DDD@FEATURE[_]TITLE        123@HPCpodcast_Title
+    2   ADDD-TITLE                 A123-Title
+    3   LETTERSDDD_TITLE           OXD123_Title
+    4a  FEATURE_DDD_TITLE          HPCNB_123_Title
+    4b  FEATURE_DDD                HPCpodcast_123
+    4c  FEATURE_TITLE              OXD_Title
+    none                           the whole filename is the title
+
+The four patterns are compiled into one anchored regex whose alternatives are tried in the order
+above, so a filename is classified in a single match instead of one regex per pattern. Feature
+names and aliases come from config/filename_rules.yaml (DEFAULT_RULES when the file is missing).
+The same URLs repeat across rows, months and files, so results are memoized per process in an LRU
+cache keyed by the raw URL part.
+"""
+import functools
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import yaml
+
+from scripts.import_logging import get_logger
+
+logger = get_logger("filename_grammar")
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "filename_rules.yaml")
+DEFAULT_RULES = {
+    "code_at_features": ["HPCpodcast", "HPCNB", "Mktg_Podcast"],
+    "prefix_features": ["HPCpodcast", "HPCNB", "Mktg_Podcast", "OXD"],
+    "feature_aliases": {"HPCpodcas": "HPCpodcast"},
+    "cache_size": 65536,
+}
+
+ParsedFilename = Tuple[Optional[str], Optional[str], str, Optional[date]]
+
+_DATE_PREFIX = re.compile(r'^(\d{8})')
+_YEAR_PART = re.compile(r'^\d{4}$')
+_MONTH_PART = re.compile(r'^\d{2}$')
+_CODE_AND_TITLE = re.compile(r'^(\d{3})_(.*)')
+_CODE_ONLY = re.compile(r'^(\d{3})$')
+
+
+def load_rules(path: str = RULES_PATH) -> Dict[str, object]:
+    """DEFAULT_RULES overlaid with the keys set in the rules file, if it exists."""
+    rules = dict(DEFAULT_RULES)
+    if os.path.exists(path):
+        with open(path) as f:
+            loaded = yaml.safe_load(f) or {}
+        unknown = set(loaded) - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown keys in {path}: {sorted(unknown)}")
+        rules.update(loaded)
+    return rules
+
+
+def _alternation(names: List[str]) -> str:
+    # Longest first, so a name that is a prefix of another (HPCpodcas/HPCpodcast) never shadows it
+    return "|".join(re.escape(name) for name in sorted(dict.fromkeys(names), key=len, reverse=True))
+
+
+class FilenameGrammar:
+    """The compiled filename rules; `parse` is the memoized entry point."""
+
+    def __init__(self, rules: Dict[str, object]):
+        self.rules = rules
+        self.aliases = dict(rules["feature_aliases"])
+        code_at = _alternation(list(rules["code_at_features"]) + [a for a, f in self.aliases.items() if f in rules["code_at_features"]])
+        prefix = _alternation(list(rules["prefix_features"]) + [a for a, f in self.aliases.items() if f in rules["prefix_features"]])
+        self.pattern = re.compile(
+            rf'^(?:(?P<p1_code>\d{{3}})@(?P<p1_feature>{code_at})'
+            rf'|(?P<p2_code>A\d{{3}})-'
+            rf'|(?P<p3_feature>[A-Z]+)(?P<p3_code>\d{{3}})_'
+            rf'|(?P<p4_feature>{prefix})_)'
+        )
+        self.parse = functools.lru_cache(maxsize=int(rules["cache_size"]))(self.match)
+
+    def match(self, filename_url_part: str) -> Tuple[str, ParsedFilename]:
+        """(pattern name, (code, feature, title, created_at)) for a filename or URL part, uncached."""
+        if not filename_url_part:
+            return "none", (None, None, "", None)
+
+        # Code/feature/title come from the filename only, the upload month from the full input
+        processed_filename = filename_url_part.split('/')[-1] if '/' in filename_url_part else filename_url_part
+        processed_filename = unquote(processed_filename).replace('.mp3', '').replace('.MP3', '')
+        logger.debug("Processing filename: %s", processed_filename)
+
+        created_at = None
+        if match := _DATE_PREFIX.match(processed_filename):
+            date_str = match.group(1)
+            try:
+                created_at = date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]))
+                processed_filename = processed_filename[8:]
+            except ValueError:
+                logger.warning("Warning: Could not parse date from filename prefix: %s", date_str)
+        if not created_at and '/' in filename_url_part:
+            created_at = self._created_at_from_path(filename_url_part.split('/'))
+
+        match = self.pattern.match(processed_filename)
+        if match is None:
+            logger.debug("No pattern match - Using full filename as title: %s", processed_filename)
+            return "none", (None, None, processed_filename, created_at)
+
+        rest = processed_filename[match.end():]
+        if match.group('p1_code') is not None:
+            feature = self.aliases.get(match.group('p1_feature'), match.group('p1_feature'))
+            title = rest[1:] if rest.startswith('_') else rest
+            logger.debug("Pattern 1 match - Code: %s, Feature: %s, Title: %s", match.group('p1_code'), feature, title)
+            return "1", (match.group('p1_code'), feature, title, created_at)
+        if match.group('p2_code') is not None:
+            logger.debug("Pattern 2 match - Code: %s, Title: %s", match.group('p2_code'), rest)
+            return "2", (match.group('p2_code'), None, rest, created_at)
+        if match.group('p3_code') is not None:
+            logger.debug("Pattern 3 match - Code: %s, Feature: %s, Title: %s", match.group('p3_code'), match.group('p3_feature'), rest)
+            return "3", (match.group('p3_code'), match.group('p3_feature'), rest, created_at)
+
+        feature = self.aliases.get(match.group('p4_feature'), match.group('p4_feature'))
+        if code_and_title := _CODE_AND_TITLE.match(rest):
+            logger.debug("Pattern 4a match - Code: %s, Feature: %s, Title: %s", code_and_title.group(1), feature, code_and_title.group(2))
+            return "4a", (code_and_title.group(1), feature, code_and_title.group(2), created_at)
+        if code_only := _CODE_ONLY.match(rest):
+            logger.debug("Pattern 4b match - Code: %s, Feature: %s, Title: ''", code_only.group(1), feature)
+            return "4b", (code_only.group(1), feature, "", created_at)
+        logger.debug("Pattern 4c match - Feature: %s, Title: %s", feature, rest)
+        return "4c", (None, feature, rest, created_at)
+
+    @staticmethod
+    def _created_at_from_path(url_parts: List[str]) -> Optional[date]:
+        """First day of the month of the first .../YYYY/MM/... pair in the path."""
+        for part in url_parts:
+            if _YEAR_PART.match(part):
+                month_idx = url_parts.index(part) + 1
+                if month_idx < len(url_parts) and _MONTH_PART.match(url_parts[month_idx]):
+                    try:
+                        return date(int(part), int(url_parts[month_idx]), 1)
+                    except ValueError:
+                        continue
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def get_grammar() -> FilenameGrammar:
+    """The grammar for config/filename_rules.yaml, compiled once per process."""
+    return FilenameGrammar(load_rules())
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import sqlite3
 import os
 import re
@@ -6,12 +7,37 @@ import math
 from datetime import datetime, date
 import calendar
 from argparse import ArgumentParser
-from urllib.parse import unquote
 from openpyxl import load_workbook
-import traceback
 import sys
-import shutil
-from typing import Optional, Tuple, Dict, Any, List
+import time
+import resource
+import multiprocessing
+import hashlib
+import inspect
+import functools
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, Dict, Any, Callable, Iterator, List
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+from scripts.xlsx_stream import XlsxStreamReader
+from scripts import podcasts_db
+from scripts import sheet_cache
+from scripts import filename_grammar
+from scripts import import_history
+from scripts import raw_rows
+from scripts import reconciliation
+from scripts import title_resolution
+from scripts.import_progress import (
+    PROGRESS_ROWS, CancelToken, ImportCancelled, ProgressCallback, WorkerRelay, emit, print_progress, worker_hooks
+)
+from scripts.import_logging import add_verbosity_arguments, capture_logs, configure_logging, current_level, get_logger, level_from_args
+
+logger = get_logger("import_data")
 
 # --- Column Mappings ---
 COLUMN_MAPS = {
@@ -34,7 +60,11 @@ COLUMN_MAPS = {
 # --- Expected DB Columns (after mapping, before adding calculated ones) ---
 EXPECTED_MAPPED_COLS = {"url", "full", "partial", "total_bw", "avg_bw"}
 
-def normalize_title_for_grouping_key(original_title, word_limit=2):
+def normalize_title_for_grouping_key(original_title):
+    """
+    The title's lower-case alphanumeric words, separated by single spaces. Titles that still
+    differ are matched to the episode they name by scripts/title_resolution.py.
+    """
     if not original_title:
         return "_EMPTY_TITLE_"
     
@@ -50,104 +80,35 @@ def normalize_title_for_grouping_key(original_title, word_limit=2):
     # Replace all non-alphanumeric characters with a single space, then strip leading/trailing spaces
     normalized = re.sub(r'[^a-z0-9]+', ' ', normalized).strip()
     
-    # Split into words and take up to 'word_limit' words
-    words = normalized.split() 
-    significant_word_join = "".join(words[:word_limit]) 
-    
-    return significant_word_join if significant_word_join else "_PROCESSED_EMPTY_TITLE_"
+    return normalized if normalized else "_PROCESSED_EMPTY_TITLE_"
 
 def extract_code_feature_title(filename_url_part: str) -> Tuple[Optional[str], Optional[str], str, Optional[date]]:
     """
     Extract code, feature, title, and creation date from a filename or URL part.
     Returns a tuple of (code, feature, title, created_at).
     """
-    if not filename_url_part:
-        return None, None, "", None
-    
-    # Use the full input for date extraction
-    processed_for_date = filename_url_part
-    # Use only the filename for code/feature/title extraction
-    if '/' in filename_url_part:
-        processed_filename = filename_url_part.split('/')[-1]
-    else:
-        processed_filename = filename_url_part
-    processed_filename = unquote(processed_filename).replace('.mp3', '').replace('.MP3', '')
-    print(f"Processing filename: {processed_filename}")  # Debug print
-    
-    # Extract creation date from full input (YYYYMMDD format in filename or year/month in path)
-    created_at = None
-    if match := re.match(r'^(\d{8})', processed_filename):
-        try:
-            date_str = match.group(1)
-            created_at = date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]))
-            # Remove the date part from the filename for further processing
-            processed_filename = processed_filename[8:]
-        except ValueError:
-            print(f"Warning: Could not parse date from filename prefix: {date_str}")
-    # If no date in filename, try to extract from URL path
-    if not created_at and '/' in processed_for_date:
-        url_parts = processed_for_date.split('/')
-        for part in url_parts:
-            if re.match(r'^\d{4}$', part):  # Year
-                year = int(part)
-                # Look for month in next part
-                month_idx = url_parts.index(part) + 1
-                if month_idx < len(url_parts):
-                    month_part = url_parts[month_idx]
-                    if re.match(r'^\d{2}$', month_part):  # Month
-                        try:
-                            month = int(month_part)
-                            created_at = date(year, month, 1)  # Use first day of month
-                            break
-                        except ValueError:
-                            continue
-    # Pattern 1: DDD@FEATURE_OptionalSeparator_TITLE
-    if match := re.match(r'^(\d{3})@(HPCpodcast|HPCNB|Mktg_Podcast|HPCpodcas)', processed_filename):
-        code_val = match.group(1)
-        feature_val = match.group(2)
-        # Map HPCpodcas to HPCpodcast
-        if feature_val == "HPCpodcas":
-            feature_val = "HPCpodcast"
-        title_val = processed_filename[match.end():]
-        if title_val.startswith('_'):
-            title_val = title_val[1:]
-        print(f"Pattern 1 match - Code: {code_val}, Feature: {feature_val}, Title: {title_val}")
-        return code_val, feature_val, title_val, created_at
-    # Pattern 2: ADDD-TITLE
-    if match := re.match(r'^(A\d{3})-', processed_filename):
-        code_val = match.group(1)
-        title_val = processed_filename[match.end():]
-        print(f"Pattern 2 match - Code: {code_val}, Title: {title_val}")
-        return code_val, None, title_val, created_at
-    # Pattern 3: FEATURE_CODE_TITLE (e.g. HPC001_TITLE or OXD001_TITLE)
-    if match := re.match(r'^([A-Z]+)(\d{3})_', processed_filename):
-        feature_part = match.group(1)
-        code_part = match.group(2)
-        title_part = processed_filename[match.end():]
-        print(f"Pattern 3 match - Code: {code_part}, Feature: {feature_part}, Title: {title_part}")
-        return code_part, feature_part, title_part, created_at
-    # Pattern 4: FEATURE_TITLE or FEATURE_CODE_TITLE
-    if match_main_feature := re.match(r'^(HPCpodcast|HPCNB|Mktg_Podcast|OXD|HPCpodcas)_', processed_filename):
-        feature_val = match_main_feature.group(1)
-        # Map HPCpodcas to HPCpodcast
-        if feature_val == "HPCpodcas":
-            feature_val = "HPCpodcast"
-        temp_title = processed_filename[match_main_feature.end():]
-        if match_code_and_title := re.match(r'^(\d{3})_(.*)', temp_title):
-            code_val = match_code_and_title.group(1)
-            final_title = match_code_and_title.group(2)
-            print(f"Pattern 4a match - Code: {code_val}, Feature: {feature_val}, Title: {final_title}")
-            return code_val, feature_val, final_title, created_at
-        elif match_code_only := re.match(r'^(\d{3})$', temp_title):
-            code_val = match_code_only.group(1)
-            print(f"Pattern 4b match - Code: {code_val}, Feature: {feature_val}, Title: ''")
-            return code_val, feature_val, "", created_at
-        else:
-            print(f"Pattern 4c match - Feature: {feature_val}, Title: {temp_title}")
-            return None, feature_val, temp_title, created_at
-    # Fallback: no specific pattern matched
-    print(f"No pattern match - Using full filename as title: {processed_filename}")
-    return None, None, processed_filename, created_at
+    return match_filename_pattern(filename_url_part)[1]
+
+def match_filename_pattern(filename_url_part: str) -> Tuple[str, Tuple[Optional[str], Optional[str], str, Optional[date]]]:
+    """
+    extract_code_feature_title() plus the name of the filename pattern that matched
+    ('1', '2', '3', '4a', '4b', '4c' or 'none'), which imports count per sheet.
+    Parsed by the filename grammar (scripts/filename_grammar.py), memoized per process.
+    """
+    return filename_grammar.get_grammar().parse(filename_url_part)
+
+def grouping_key(code: Optional[str], feature: Optional[str], normalized_title: str) -> Tuple[str, str, str]:
+    """The (code, feature, normalized title) part of the aggregation key rows are merged on."""
+    return (str(code) if code else "_NO_CODE_", str(feature) if feature else "_NO_FEATURE_", normalized_title)
+
+def url_metadata(url: str) -> tuple:
+    """
+    A URL's metadata under the current rules, as stored in raw_urls (podcasts_db.RAW_URL_FIELDS):
+    code, feature, title, created_at (ISO date) and its grouping key. Raises if it cannot be parsed.
+    """
+    code, feature, title, created_at = extract_code_feature_title(url)
+    return ((code, feature, title, created_at.isoformat() if created_at else None)
+            + grouping_key(code, feature, normalize_title_for_grouping_key(title)))
 
 def extract_created_at_from_url(url):
     match = re.search(r"/(\d{4})/(\d{2})/", url)
@@ -159,7 +120,7 @@ def extract_created_at_from_url(url):
     return None
 
 def parse_excel_filename_date(filename_only):
-    print(f"[DEBUG] parse_excel_filename_date called with: {filename_only}")
+    logger.debug("parse_excel_filename_date called with: %s", filename_only)
     match = re.match(r"(\d{4})(\d{2})(\d{2})_.*\.xlsx?", filename_only, re.IGNORECASE)
     if match:
         year, month, day_val = int(match.group(1)), int(match.group(2)), int(match.group(3))
@@ -168,12 +129,12 @@ def parse_excel_filename_date(filename_only):
             day_val = 1
         try:
             dt = date(year, month, day_val)
-            print(f"[DEBUG] Parsed date: {dt}, year: {year}, month: {month}")
+            logger.debug("Parsed date: %s, year: %s, month: %s", dt, year, month)
             return dt, year, month
         except ValueError:
-            print(f"Warning: Could not parse date from filename {filename_only} with parts {year}-{month}-{day_val}")
+            logger.warning("Warning: Could not parse date from filename %s with parts %s-%s-%s", filename_only, year, month, day_val)
             return None, None, None
-    print(f"[DEBUG] No match for date in filename: {filename_only}")
+    logger.debug("No match for date in filename: %s", filename_only)
     return None, None, None
 
 def format_bw(value_mb):
@@ -307,142 +268,627 @@ def get_actual_hyperlink_url(worksheet, cell):
         return cell.hyperlink.target
     return cell.value
 
-def read_excel_with_hyperlinks(filepath: str, sheet_name: str) -> pd.DataFrame:
+def get_peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak = peak / 1024
+    return round(peak / 1024, 1)
+
+# --- Stage timings ---
+# stats['timings'] holds one entry per stage: total seconds, rows handled, rows/sec and the peak RSS
+# (MB) seen when the stage finished. Parse stages count rows scanned, write stages rows written.
+TIMING_STAGES = ("workbook_open", "sheet_read", "metadata", "aggregation", "db_write", "commit")
+
+def new_stage_timings() -> Dict[str, Dict[str, float]]:
+    return {stage: {'seconds': 0.0, 'rows': 0, 'rows_per_sec': 0.0, 'peak_rss_mb': 0.0} for stage in TIMING_STAGES}
+
+def record_stage(timings: dict, stage: str, seconds: float, rows: int = 0, peak_rss_mb: Optional[float] = None) -> None:
+    """Add `seconds` and `rows` to a stage timer and refresh its rows/sec and peak RSS."""
+    timer = timings[stage]
+    timer['seconds'] = round(timer['seconds'] + seconds, 4)
+    timer['rows'] += rows
+    timer['rows_per_sec'] = round(timer['rows'] / timer['seconds'], 1) if timer['seconds'] > 0 else 0.0
+    timer['peak_rss_mb'] = max(timer['peak_rss_mb'], get_peak_rss_mb() if peak_rss_mb is None else peak_rss_mb)
+
+def merge_stage_timings(total: dict, timings: dict) -> None:
+    """Fold one stats['timings'] into another (sheets into a file, files into a batch)."""
+    for stage, timer in timings.items():
+        if stage not in total:
+            total[stage] = {'seconds': 0.0, 'rows': 0, 'rows_per_sec': 0.0, 'peak_rss_mb': 0.0}
+        record_stage(total, stage, timer['seconds'], timer['rows'], timer['peak_rss_mb'])
+
+# --- Reader engines ---
+# Both engines expose `sheetnames`, `sheet_headers(sheet_name)`, `iter_rows(sheet_name)` yielding
+# (row index, resolved URL, raw cell values) and `close()`.
+READER_ENGINES = ("xml", "openpyxl")
+DEFAULT_READER_ENGINE = "xml"
+URL_COLUMN_HEADERS = ["URL", "Downloads"]
+# Sheets are read and aggregated in chunks of this many rows (iter_sheet_frames)
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Row-level dry-run diff: podcasts_db action names mapped to the stats['dry_run'] counters
+DRY_RUN_ACTION_LABELS = {'insert': 'inserted', 'replace': 'replaced', 'ignore': 'ignored'}
+DRY_RUN_DIFF_COLUMNS = (
+    ['source_file', 'sheet_name', 'action', 'url', 'consumed_year', 'consumed_month', 'title_before', 'title_after']
+    + [f"{metric}_{suffix}" for metric in podcasts_db.DIFF_METRICS for suffix in ('before', 'after')]
+    + ['source_file_before']
+    + [f"{metric}_delta" for metric in podcasts_db.DIFF_METRICS]
+)
+
+class OpenpyxlWorkbookReader:
+    """Fallback engine: full openpyxl load (read-only mode does not expose hyperlinks)."""
+
+    def __init__(self, filepath: str, workbook=None):
+        self.filepath = filepath
+        self.workbook = workbook if workbook is not None else load_workbook(filepath, data_only=False)  # data_only=False to preserve hyperlinks
+        self.sheetnames = self.workbook.sheetnames
+
+    def close(self):
+        self.workbook.close()
+
+    def sheet_headers(self, sheet_name: str) -> List[str]:
+        headers = []
+        for cell in self.workbook[sheet_name][1]:
+            header_value = cell.value
+            if header_value is None:
+                header_value = ""
+            headers.append(str(header_value).strip())
+        return headers
+
+    def iter_rows(self, sheet_name: str):
+        ws = self.workbook[sheet_name]
+        headers = self.sheet_headers(sheet_name)
+        url_col_idx = next((idx for idx, header in enumerate(headers) if header in URL_COLUMN_HEADERS), None)
+        for row_idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
+            url = None
+            if url_col_idx is not None:
+                url_cell = row[url_col_idx]
+                # Try to get URL from hyperlink first, then fall back to the cell value
+                if url_cell.hyperlink:
+                    url = url_cell.hyperlink.target
+                elif url_cell.value and isinstance(url_cell.value, str):
+                    url = str(url_cell.value).strip()
+            yield row_idx, url, [cell.value for cell in row]
+
+def open_workbook_reader(filepath: str, engine: str = DEFAULT_READER_ENGINE):
+    """Open `filepath` once with the requested reader engine ('xml' or 'openpyxl')."""
+    if engine == "xml":
+        return XlsxStreamReader(filepath)
+    if engine == "openpyxl":
+        return OpenpyxlWorkbookReader(filepath)
+    raise ValueError(f"Unknown reader engine '{engine}'. Expected one of: {', '.join(READER_ENGINES)}")
+
+def read_sheet(reader, sheet_name: str, sha256: Optional[str] = None) -> pd.DataFrame:
     """
-    Reads an Excel sheet, extracting hyperlink URLs or cell values for 'URL' or 'Downloads' columns, and filters for relevant podcast rows.
-    Accepts both full URLs and relative paths containing '/wp-content/uploads'.
+    Reads one sheet through a reader engine, keeping rows whose hyperlink URL or cell value for the
+    'URL' or 'Downloads' column points at '/wp-content/uploads' (full URLs and relative paths).
+
+    Passing the workbook's `sha256` enables the on-disk sheet cache (scripts/sheet_cache.py): the
+    row records are loaded from Parquet when this content was read before, and stored otherwise.
+    Imports read sheets in chunks through iter_sheet_frames() instead.
     """
-    try:
-        print(f"\nProcessing sheet: {sheet_name}")
-        wb = load_workbook(filepath, data_only=False)  # data_only=False to preserve hyperlinks
-        if sheet_name not in wb.sheetnames:
-            print(f"Error: Sheet '{sheet_name}' not found in {filepath}")
-            return pd.DataFrame()
-        ws = wb[sheet_name]
-    except FileNotFoundError:
-        print(f"Error: File not found at {filepath}")
+    logger.info("\nProcessing sheet: %s", sheet_name)
+    if sheet_name not in reader.sheetnames:
+        logger.error("Error: Sheet '%s' not found in %s", sheet_name, reader.filepath)
         return pd.DataFrame()
-    except Exception as e:
-        print(f"Error loading workbook {filepath}: {e}")
-        traceback.print_exc()
+
+    data = None
+    if sha256:
+        data = sheet_cache.load_records(sha256, sheet_name, get_reader_version())
+        if data is not None:
+            logger.info("Loaded %d rows for sheet '%s' from the sheet cache", len(data), sheet_name)
+    from_cache = data is not None
+    if data is None:
+        data = read_sheet_records(reader, sheet_name)
+        if data and sha256:
+            sheet_cache.store_records(data, sha256, sheet_name, get_reader_version())
+    if not data:
         return pd.DataFrame()
+    return records_frame(data, from_cache)
 
-    # Get headers from first row
-    headers = []
-    for cell in ws[1]:
-        header_value = cell.value
-        if header_value is None:
-            header_value = ""
-        headers.append(str(header_value).strip())
-    
-    print(f"Found headers: {headers}")
+def iter_sheet_frames(reader, sheet_name: str, sha256: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                      on_rows: Optional[Callable[[int], None]] = None) -> Iterator[pd.DataFrame]:
+    """
+    read_sheet() in chunks: yields DataFrames of up to `chunk_rows` rows, so a sheet is never held
+    in memory whole. Cached sheets are decoded batch by batch; otherwise each chunk is added to the
+    sheet cache as it is read and the cache file is written once the sheet is complete (a sheet
+    that is not read to the end is not cached). `on_rows(rows read so far)` is called every
+    PROGRESS_ROWS rows, or per batch for cached sheets.
+    """
+    logger.info("\nProcessing sheet: %s", sheet_name)
+    if sheet_name not in reader.sheetnames:
+        logger.error("Error: Sheet '%s' not found in %s", sheet_name, reader.filepath)
+        return
+
+    cached = sheet_cache.load_record_batches(sha256, sheet_name, get_reader_version(), chunk_rows) if sha256 else None
+    if cached is not None:
+        row_count, batches = cached
+        logger.info("Loaded %d rows for sheet '%s' from the sheet cache", row_count, sheet_name)
+        rows_read = 0
+        for records in batches:
+            if records:
+                rows_read += len(records)
+                if on_rows is not None:
+                    on_rows(rows_read)
+                yield records_frame(records, from_cache=True)
+        return
+
+    writer = sheet_cache.RecordsWriter(sha256, sheet_name, get_reader_version()) if sha256 else None
+    for records in iter_sheet_records(reader, sheet_name, chunk_rows, on_rows):
+        if writer is not None:
+            writer.add(records)
+        yield records_frame(records, from_cache=False)
+    if writer is not None:
+        writer.close()
+
+def records_frame(records: List[Dict[str, Any]], from_cache: bool) -> pd.DataFrame:
+    """DataFrame of row records with stripped headers and the URL column as strings."""
+    df = pd.DataFrame(records)
+    df.columns = df.columns.str.strip()
+    df.attrs['from_cache'] = from_cache
+
+    # Ensure URL column is string type and not truncated
+    if "URL" in df.columns:
+        df["URL"] = df["URL"].astype(str)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("URL column sample (first 5 rows):\n%s", df['URL'].head().to_string())
+    elif "Downloads" in df.columns:
+        df["Downloads"] = df["Downloads"].astype(str)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Downloads column sample (first 5 rows):\n%s", df['Downloads'].head().to_string())
+    return df
+
+def read_sheet_records(reader, sheet_name: str) -> List[Dict[str, Any]]:
+    """The row records (header -> value) behind read_sheet(), read from the workbook itself."""
+    return [record for records in iter_sheet_records(reader, sheet_name) for record in records]
+
+def iter_sheet_records(reader, sheet_name: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                       on_rows: Optional[Callable[[int], None]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Row records (header -> value) of a sheet, in lists of up to `chunk_rows` records.
+    `on_rows(rows kept so far)` is called every PROGRESS_ROWS kept rows.
+    """
+
+    headers = reader.sheet_headers(sheet_name)
+    logger.info("Found headers: %s", headers)
     data = []
-    
+
     # Find URL column index
     url_col_idx = None
     for idx, header in enumerate(headers):
-        if header in ["URL", "Downloads"]:
+        if header in URL_COLUMN_HEADERS:
             url_col_idx = idx
-            print(f"Found URL column at index {idx}: {header}")
+            logger.info("Found URL column at index %d: %s", idx, header)
             break
-    
+
     if url_col_idx is None:
-        print(f"Warning: No URL/Downloads column found in sheet '{sheet_name}'")
-        return pd.DataFrame()
+        logger.warning("Warning: No URL/Downloads column found in sheet '%s'", sheet_name)
+        return
 
     # Process rows
     row_count = 0
     skipped_count = 0
-    for row_idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
+    log_rows = logger.isEnabledFor(logging.DEBUG)
+    for row_idx, url, values in reader.iter_rows(sheet_name):
         try:
-            url_cell = row[url_col_idx]
-            url = None
-            
-            # Try to get URL from hyperlink first
-            if url_cell.hyperlink:
-                url = url_cell.hyperlink.target
-                print(f"Row {row_idx}: Found hyperlink: {url}")
-            # Fallback to cell value (relative or full path)
-            elif url_cell.value and isinstance(url_cell.value, str):
-                potential_url = str(url_cell.value).strip()
-                if "/wp-content/uploads" in potential_url:
-                    url = potential_url
-                    print(f"Row {row_idx}: Using cell value as URL: {url}")
-            
             if not url or "/wp-content/uploads" not in url:
                 skipped_count += 1
                 continue
-                
+            if log_rows:
+                logger.debug("Row %s: Using URL: %s", row_idx, url)
+
             row_data = {}
-            for header, cell in zip(headers, row):
-                if header in ["URL", "Downloads"]:
+            for header, value in zip(headers, values):
+                if header in URL_COLUMN_HEADERS:
                     row_data[header] = url
                 else:
                     # Convert cell value to appropriate type
-                    if cell.value is None:
+                    if value is None:
                         row_data[header] = None
-                    elif isinstance(cell.value, (int, float)):
-                        row_data[header] = cell.value
+                    elif isinstance(value, (int, float)):
+                        row_data[header] = value
                     else:
-                        row_data[header] = str(cell.value).strip()
-            
+                        row_data[header] = str(value).strip()
+
             data.append(row_data)
             row_count += 1
-            
+
         except Exception as e:
-            print(f"Error processing row {row_idx} in sheet '{sheet_name}': {e}")
-            traceback.print_exc()
+            logger.exception("Error processing row %s in sheet '%s': %s", row_idx, sheet_name, e)
             continue
 
-    if not data:
-        print(f"Info: No valid podcast URLs found in sheet '{sheet_name}'")
-        print(f"Total rows skipped: {skipped_count}")
+        if on_rows is not None and row_count % PROGRESS_ROWS == 0:
+            on_rows(row_count)
+
+        if len(data) >= chunk_rows:
+            yield data
+            data = []
+
+    if data:
+        yield data
+    if not row_count:
+        logger.info("Info: No valid podcast URLs found in sheet '%s'", sheet_name)
+        logger.info("Total rows skipped: %d", skipped_count)
+        return
+
+    logger.info("Successfully processed %d rows from sheet '%s'", row_count, sheet_name)
+    logger.info("Total rows skipped: %d", skipped_count)
+
+def read_excel_with_hyperlinks(filepath: str, sheet_name: str, workbook=None) -> pd.DataFrame:
+    """
+    Reads an Excel sheet with the openpyxl engine, extracting hyperlink URLs or cell values for 'URL' or 'Downloads' columns.
+    Pass an already loaded (non read-only) `workbook` to avoid parsing the file again for every sheet.
+    """
+    try:
+        reader = OpenpyxlWorkbookReader(filepath, workbook=workbook)
+    except FileNotFoundError:
+        logger.error("Error: File not found at %s", filepath)
+        return pd.DataFrame()
+    except Exception as e:
+        logger.exception("Error loading workbook %s: %s", filepath, e)
         return pd.DataFrame()
+    return read_sheet(reader, sheet_name)
 
-    df = pd.DataFrame(data)
-    df.columns = df.columns.str.strip()
-    
-    # Ensure URL column is string type and not truncated
-    if "URL" in df.columns:
-        df["URL"] = df["URL"].astype(str)
-        print(f"URL column sample (first 5 rows):\n{df['URL'].head().to_string()}")
-    elif "Downloads" in df.columns:
-        df["Downloads"] = df["Downloads"].astype(str)
-        print(f"Downloads column sample (first 5 rows):\n{df['Downloads'].head().to_string()}")
-    
-    print(f"Successfully processed {row_count} rows from sheet '{sheet_name}'")
-    print(f"Total rows skipped: {skipped_count}")
-    return df
+def compare_reader_engines(filepath: str) -> List[str]:
+    """
+    Read every sheet of `filepath` with both engines and return a list of differences
+    (empty when the xml engine produces exactly the rows of the openpyxl engine).
+    """
+    differences = []
+    xml_reader = open_workbook_reader(filepath, "xml")
+    openpyxl_reader = open_workbook_reader(filepath, "openpyxl")
+    try:
+        if xml_reader.sheetnames != openpyxl_reader.sheetnames:
+            differences.append(f"Sheet names differ: {xml_reader.sheetnames} != {openpyxl_reader.sheetnames}")
+        for sheet_name in openpyxl_reader.sheetnames:
+            expected = list(openpyxl_reader.iter_rows(sheet_name))
+            actual = list(xml_reader.iter_rows(sheet_name)) if sheet_name in xml_reader.sheetnames else []
+            if xml_reader.sheet_headers(sheet_name) != openpyxl_reader.sheet_headers(sheet_name):
+                differences.append(f"Sheet '{sheet_name}': headers differ")
+            if len(expected) != len(actual):
+                differences.append(f"Sheet '{sheet_name}': {len(actual)} rows (xml) != {len(expected)} rows (openpyxl)")
+            for expected_row, actual_row in zip(expected, actual):
+                if expected_row != actual_row:
+                    differences.append(f"Sheet '{sheet_name}' row {expected_row[0]}: {actual_row} != {expected_row}")
+            if not read_sheet(xml_reader, sheet_name).equals(read_sheet(openpyxl_reader, sheet_name)):
+                differences.append(f"Sheet '{sheet_name}': DataFrames differ")
+    finally:
+        xml_reader.close()
+        openpyxl_reader.close()
+    return differences
 
-def backup_database(db_path: str) -> str:
-    """Create a backup of the database before import.
-    Returns the path to the backup file."""
-    if not os.path.exists(db_path):
-        return None
-    
-    # Create backup filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_dir = os.path.join(os.path.dirname(db_path), "backups")
-    os.makedirs(backup_dir, exist_ok=True)
-    backup_path = os.path.join(backup_dir, f"podcasts_{timestamp}.db")
-    
-    # Copy the database file
-    shutil.copy2(db_path, backup_path)
-    print(f"Created database backup: {backup_path}")
-    return backup_path
-
-def import_data(filepath: str, override: bool = False, dry_run: bool = False, reset_db: bool = False, skip_backup: bool = False, original_filename: str = None) -> dict:
-    print(f"[DEBUG] import_data called for: {filepath}")
-    db_path = "data/podcasts.db"
-    if original_filename is not None:
-        filename_only = os.path.basename(original_filename)
+def parse_float_column(series: pd.Series) -> np.ndarray:
+    """Bulk version of `parse_float`: strings go through `parse_float` once per distinct value, everything else through `pd.to_numeric`."""
+    result = np.full(len(series), np.nan)
+    if not len(series):
+        return result
+    if pd.api.types.is_string_dtype(series):
+        is_str = series.notna().to_numpy(dtype=bool)
+    elif pd.api.types.is_numeric_dtype(series):
+        is_str = np.zeros(len(series), dtype=bool)
     else:
-        filename_only = os.path.basename(filepath)
-    file_type = detect_file_type(filename_only)
-    print(f"[DEBUG] Detected file type for '{filename_only}': {file_type}")
+        is_str = series.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    if (~is_str).any():
+        result[~is_str] = pd.to_numeric(series[~is_str], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    if is_str.any():
+        strings = series[is_str]
+        parsed = {value: parse_float(value) for value in pd.unique(strings)}
+        result[is_str] = pd.to_numeric(strings.map(parsed), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return result
+
+def _sequential_group_sums(sorted_values: np.ndarray, starts: np.ndarray, sizes: np.ndarray,
+                           initial: Optional[np.ndarray] = None, resumed: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Per-group sums of grouped (contiguous) values, added left to right like the old row loop did.
+    numpy/pandas reductions use pairwise summation, which can differ in the last bits for floats,
+    so groups with more than one row are re-added sequentially. Groups flagged in `resumed` continue
+    from their `initial` total (the sum over earlier chunks) instead of starting from zero.
+    """
+    sums = np.add.reduceat(sorted_values, starts) if len(starts) else np.zeros(0)
+    sequential = sizes > 1 if resumed is None else (sizes > 1) | resumed
+    for group in np.flatnonzero(sequential):
+        total = float(initial[group]) if resumed is not None and resumed[group] else 0.0
+        for value in sorted_values[starts[group]:starts[group] + sizes[group]].tolist():
+            total += value
+        sums[group] = total
+    return sums
+
+# Distinct URL variants per key listed in the reconciliation log (the total is always counted)
+MAX_RECONCILIATION_VARIANTS = reconciliation.MAX_VARIANTS
+
+class AggregateRecord:
+    """
+    Running aggregate of one key while its sheet is streamed: the first row's metadata, the metric
+    sums so far, the first longest URL and title, and the first MAX_RECONCILIATION_VARIANTS distinct
+    URLs (with their titles) for the reconciliation log.
+    """
+    __slots__ = ('key', 'index', 'code', 'feature', 'created_at', 'url', 'title',
+                 'full_sum', 'partial_sum', 'total_bw_sum', 'count', 'variants', 'variant_count')
+
+    def __init__(self, key: tuple, index: int, code: Optional[str], feature: Optional[str], created_at: Optional[str]):
+        self.key = key
+        self.index = index
+        self.code = code
+        self.feature = feature
+        self.created_at = created_at
+        self.url = None
+        self.title = None
+        self.full_sum = 0.0
+        self.partial_sum = 0.0
+        self.total_bw_sum = 0.0
+        self.count = 0
+        self.variants = []
+        self.variant_count = 0
+
+    def add_variant(self, url: str, title: str) -> None:
+        self.variant_count += 1
+        if len(self.variants) < MAX_RECONCILIATION_VARIANTS:
+            self.variants.append((url, title))
+
+class SheetAggregator:
+    """
+    Columnar aggregation of a mapped sheet, fed chunk by chunk (`add`), into one AggregateRecord per
+    (code, feature, normalized_title) key. Memory grows with the sheet's distinct URLs and keys, not
+    with its rows: a chunk is reduced into the records and dropped.
+
+    Metadata is parsed once per distinct URL of the sheet, metrics are coerced in bulk and each
+    chunk is reduced in one grouped pass. Keys keep first-seen order, sums are added in row order
+    across chunks and the canonical URL/title of a key is the first longest variant, as before.
+    The metadata pass is recorded in `timings` (stats['timings'] layout) when given.
+
+    The rows themselves are kept dictionary-encoded for the raw_rows table (`raw_rows()`): a
+    sheet-wide URL position and the coerced metrics per row, 28 bytes a row, plus each distinct
+    URL's metadata once. `known_metadata` (URL -> RAW_URL_FIELDS or None) replaces parsing for
+    the URLs it holds, which is how regroup_sheet() aggregates raw rows again under other keys.
+    """
+
+    def __init__(self, consumed_year: int, consumed_month: int, sheet_name: str = "", timings: Optional[dict] = None,
+                 known_metadata: Optional[Dict[str, Optional[tuple]]] = None):
+        self.consumed_year = consumed_year
+        self.consumed_month = consumed_month
+        self.sheet_name = sheet_name
+        self.timings = timings
+        self.records: List[AggregateRecord] = []
+        self.records_by_key: Dict[tuple, AggregateRecord] = {}
+        # Distinct URL -> (record index, or -1 when its metadata could not be parsed; title; position in url_metadata)
+        self.urls: Dict[str, Tuple[int, str, int]] = {}
+        # Per distinct URL in first-seen order: RAW_URL_FIELDS, or None when its metadata could not be parsed
+        self.url_metadata: List[Optional[tuple]] = []
+        self.raw_chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self.normalized_titles: Dict[str, str] = {}
+        self.known_metadata = known_metadata or {}
+        self.error_rows = 0
+        self.pattern_counts = Counter()
+
+    def _first_sight(self, url: str) -> Tuple[int, str, int]:
+        position = len(self.url_metadata)
+        if url in self.known_metadata:
+            metadata = self.known_metadata[url]
+            if metadata is None:
+                self.url_metadata.append(None)
+                return -1, "", position
+            code, feature, title, created_at = metadata[:4]
+            key = tuple(metadata[4:])
+        else:
+            try:
+                pattern, (code, feature, title, created_at) = match_filename_pattern(url)
+                self.pattern_counts[pattern] += 1
+                if title not in self.normalized_titles:
+                    self.normalized_titles[title] = normalize_title_for_grouping_key(title)
+                key = grouping_key(code, feature, self.normalized_titles[title])
+            except Exception as e:
+                logger.exception("Error processing URL '%s' in sheet '%s': %s", url, self.sheet_name, e)
+                self.url_metadata.append(None)
+                return -1, "", position
+            created_at = created_at.isoformat() if created_at else None
+            if len(self.urls) < 10:
+                logger.debug("Extracted title: '%s' from filename: '%s'", title, url)
+        record = self.records_by_key.get(key)
+        if record is None:
+            record = AggregateRecord(key, len(self.records), code, feature, created_at)
+            self.records.append(record)
+            self.records_by_key[key] = record
+        record.add_variant(url, title)
+        self.url_metadata.append((code, feature, title, created_at) + key)
+        return record.index, title, position
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Fold one chunk of mapped rows (url/full/partial/total_bw columns) into the records."""
+        urls = df['url']
+        if pd.api.types.is_string_dtype(urls):
+            valid = urls.str.strip().str.len().gt(0).to_numpy(dtype=bool)
+        else:
+            valid = urls.map(lambda url: isinstance(url, str) and bool(url.strip())).to_numpy(dtype=bool)
+        df = df[valid]
+        urls = df['url']
+        if df.empty:
+            return
+
+        # Metadata for the URLs this sheet has not seen yet
+        metadata_started = time.perf_counter()
+        url_codes, unique_urls = pd.factorize(urls)
+        url_codes = np.asarray(url_codes)
+        unique_urls = list(unique_urls)
+        record_ids = np.empty(len(unique_urls), dtype=np.int64)
+        url_positions = np.empty(len(unique_urls), dtype=np.int32)
+        titles = []
+        for idx, url in enumerate(unique_urls):
+            seen = self.urls.get(url)
+            if seen is None:
+                seen = self.urls[url] = self._first_sight(url)
+            record_ids[idx] = seen[0]
+            titles.append(seen[1])
+            url_positions[idx] = seen[2]
+        if self.timings is not None:
+            record_stage(self.timings, 'metadata', time.perf_counter() - metadata_started, len(df))
+
+        # Coerce metrics in bulk (missing/unparseable values count as 0, as before)
+        full = np.nan_to_num(pd.to_numeric(df['full'], errors='coerce').to_numpy(dtype=float, na_value=np.nan), nan=0.0)
+        partial = np.nan_to_num(pd.to_numeric(df['partial'], errors='coerce').to_numpy(dtype=float, na_value=np.nan), nan=0.0)
+        total_bw = np.nan_to_num(parse_float_column(df['total_bw']), nan=0.0)
+        # Raw rows keep the rows whose URL failed to parse too, so a rules fix can still place them
+        self.raw_chunks.append((url_positions[url_codes], full, partial, total_bw))
+
+        row_record_ids = record_ids[url_codes]
+        row_failed = row_record_ids < 0
+        if row_failed.any():
+            self.error_rows += int(row_failed.sum())
+            kept = ~row_failed
+            url_codes, row_record_ids = url_codes[kept], row_record_ids[kept]
+            full, partial, total_bw = full[kept], partial[kept], total_bw[kept]
+            if not len(url_codes):
+                return
+
+        # Per-row group ids in first-seen order, one group per record touched by this chunk
+        group_ids, group_record_ids = pd.factorize(row_record_ids)
+        group_ids = np.asarray(group_ids)
+        group_records = [self.records[record_id] for record_id in np.asarray(group_record_ids).tolist()]
+
+        # One stable sort groups the rows while keeping their original order inside each group
+        order = np.argsort(group_ids, kind='stable')
+        sorted_groups = group_ids[order]
+        sorted_url_codes = url_codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+        sizes = np.diff(np.r_[starts, len(order)])
+
+        # Keys already seen in earlier chunks continue their running sums
+        resumed = np.array([record.count > 0 for record in group_records], dtype=bool)
+        full_sums = _sequential_group_sums(full[order], starts, sizes,
+                                           np.array([record.full_sum for record in group_records]), resumed)
+        partial_sums = _sequential_group_sums(partial[order], starts, sizes,
+                                              np.array([record.partial_sum for record in group_records]), resumed)
+        total_bw_sums = _sequential_group_sums(total_bw[order], starts, sizes,
+                                               np.array([record.total_bw_sum for record in group_records]), resumed)
+
+        # First longest URL/title of each group in this chunk; it replaces the record's only if longer
+        def first_longest(lengths):
+            sorted_lengths = lengths[sorted_url_codes]
+            longest = np.maximum.reduceat(sorted_lengths, starts)
+            positions = np.flatnonzero(sorted_lengths == np.repeat(longest, sizes))
+            _, first_positions = np.unique(sorted_groups[positions], return_index=True)
+            return sorted_url_codes[positions[first_positions]].tolist()
+
+        longest_url_codes = first_longest(np.array([len(url) for url in unique_urls]))
+        longest_title_codes = first_longest(np.array([len(title) for title in titles]))
+
+        for group, record in enumerate(group_records):
+            url = unique_urls[longest_url_codes[group]]
+            if record.url is None or len(url) > len(record.url):
+                record.url = url
+            title = titles[longest_title_codes[group]]
+            if record.title is None or len(title) > len(record.title):
+                record.title = title
+            record.full_sum = float(full_sums[group])
+            record.partial_sum = float(partial_sums[group])
+            record.total_bw_sum = float(total_bw_sums[group])
+            record.count += int(sizes[group])
+
+    def raw_rows(self) -> Dict[str, Any]:
+        """
+        The rows added so far, dictionary-encoded: `urls` and their `url_metadata` in first-seen
+        order, and per row its position in them (`url_positions`) and coerced full/partial/total_bw.
+        """
+        columns = list(zip(*self.raw_chunks)) if self.raw_chunks else [[np.zeros(0, dtype=np.int32)], [np.zeros(0)], [np.zeros(0)], [np.zeros(0)]]
+        url_positions, full, partial, total_bw = (np.concatenate(column) for column in columns)
+        return {'urls': list(self.urls), 'url_metadata': self.url_metadata, 'url_positions': url_positions,
+                'full': full, 'partial': partial, 'total_bw': total_bw}
+
+    def results(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(aggregates, reconciliation_log) for the rows added so far."""
+        aggregates = []
+        reconciliation_log = []
+        for record in self.records:
+            # --- Ensure title is always stripped of audio file extensions for consistency ---
+            canonical_title_clean = re.sub(r'\.(mp3|wav|aac|m4a)$', '', record.title, flags=re.IGNORECASE)
+            agg_key = record.key + (self.consumed_year, self.consumed_month)
+
+            # Reconciliation reporting: If more than one variant, log the merge
+            if record.variant_count > 1:
+                reconciliation_log.append({
+                    'agg_key': agg_key,
+                    'titles': list(dict.fromkeys(title for _, title in record.variants)),
+                    'urls': [url for url, _ in record.variants],
+                    'variant_count': record.variant_count,
+                    'canonical_title': canonical_title_clean,
+                    'canonical_url': record.url
+                })
+
+            full_sum, partial_sum, total_bw_sum = record.full_sum, record.partial_sum, record.total_bw_sum
+            aggregates.append({
+                'agg_key': agg_key,
+                'url': record.url,
+                'title': canonical_title_clean,
+                'code': record.code,
+                'feature': record.feature,
+                'created_at': record.created_at,
+                'full_sum': full_sum,
+                'partial_sum': partial_sum,
+                'total_bw_sum': total_bw_sum,
+                # Calculate derived metrics
+                'avg_bw': total_bw_sum / (full_sum + partial_sum) if (full_sum + partial_sum) > 0 else None,
+                'eq_full': math.floor(full_sum + 0.5 * partial_sum),
+                'count': record.count
+            })
+        return aggregates, reconciliation_log
+
+def aggregate_sheet(df: pd.DataFrame, consumed_year: int, consumed_month: int, sheet_name: str = "",
+                    timings: Optional[dict] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int, Counter]:
+    """
+    Aggregate a whole mapped sheet into one row per
+    (code, feature, normalized_title, consumed_year, consumed_month) key (see SheetAggregator).
+    Returns (aggregates, reconciliation_log, error_rows, pattern_counts) where pattern_counts
+    counts the distinct URLs per match_filename_pattern() pattern.
+    """
+    aggregator = SheetAggregator(consumed_year, consumed_month, sheet_name, timings)
+    aggregator.add(df)
+    aggregates, reconciliation_log = aggregator.results()
+    return aggregates, reconciliation_log, aggregator.error_rows, aggregator.pattern_counts
+
+def file_sha256(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_reader_version() -> str:
+    """
+    Fingerprint of the code that turns workbook bytes into row records (reader engines and
+    iter_sheet_records). Part of the sheet cache key, so reader changes never serve stale records.
+    """
+    digest = hashlib.sha256()
+    for obj in (sys.modules[XlsxStreamReader.__module__], OpenpyxlWorkbookReader, iter_sheet_records):
+        digest.update(inspect.getsource(obj).encode('utf-8'))
+    digest.update(repr(URL_COLUMN_HEADERS).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def get_rules_version() -> str:
+    """
+    Fingerprint of everything that decides which rows a workbook turns into: the filename/title
+    parsing rules (including config/filename_rules.yaml), column mappings and aggregation. Changing
+    any of them changes the version, which invalidates import_manifest entries so the affected
+    files are re-imported.
+    """
+    digest = hashlib.sha256()
+    for func in (normalize_title_for_grouping_key, grouping_key, extract_code_feature_title, match_filename_pattern, extract_created_at_from_url,
+                 parse_excel_filename_date, detect_file_type, parse_float, iter_sheet_frames, records_frame, iter_sheet_records,
+                 parse_float_column, _sequential_group_sums, AggregateRecord, SheetAggregator, parse_sheet):
+        digest.update(inspect.getsource(func).encode('utf-8'))
+    digest.update(repr(sorted((k, sorted(v.items())) for k, v in COLUMN_MAPS.items())).encode('utf-8'))
+    digest.update(MONTHLY_FILENAME_PATTERN.pattern.encode('utf-8'))
+    digest.update(inspect.getsource(filename_grammar).encode('utf-8'))
+    digest.update(inspect.getsource(title_resolution).encode('utf-8'))
+    digest.update(repr(sorted(filename_grammar.get_grammar().rules.items())).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
 
-    # Initialize statistics early with filename and file_type
-    stats = {
+def new_import_stats(filename_only: str, file_type: Optional[str], engine: str) -> dict:
+    return {
         'filename': filename_only, # Ensure filename is in stats for Admin.py
         'file_type': file_type if file_type else 'Unknown', # Ensure file_type is in stats
         'dry_run': {'inserted': 0, 'replaced': 0, 'ignored': 0},
@@ -450,6 +896,7 @@ def import_data(filepath: str, override: bool = False, dry_run: bool = False, re
         'sheets': {
             'total': 0, # Will be updated after checking readable sheets
             'processed': 0,
+            'in_file': 0,
             'skipped': {'unreadable': 0, 'missing_cols': 0, 'bad_date': 0}
         },
         'rows': {
@@ -457,358 +904,718 @@ def import_data(filepath: str, override: bool = False, dry_run: bool = False, re
             'merged': 0,
             'errors': 0
         },
-        'unprocessed_sheet_info': [] # For detailed reporting of skipped/failed sheets
+        'unprocessed_sheet_info': [], # For detailed reporting of skipped/failed sheets
+        'patterns': {}, # Distinct URLs per filename pattern (match_filename_pattern), summed over sheets
+        'timings': new_stage_timings(), # Per-stage seconds, rows/sec and peak RSS (TIMING_STAGES)
+        'files': {'unchanged_skipped': 0},
+        'manifest': {'sha256': None, 'rules_version': None},
+        'import_id': None, # Set once written; undo with scripts/import_history.py
+        'workbook': {'engine': engine, 'loads': 0, 'loads_avoided': 0, 'open_seconds': 0.0, 'open_rss_mb': 0.0,
+                     'estimated_seconds_saved': 0.0, 'peak_rss_mb': 0.0, 'sheet_cache_hits': 0}
     }
 
+
+def parse_sheet(reader, sheet_name: str, file_type: str, filename_only: str, sha256: Optional[str] = None,
+                progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None) -> dict:
+    """
+    Read, map and aggregate one sheet into rows ready for the database (PODCASTS_COLUMNS order),
+    plus the sheet's dictionary-encoded raw rows (`raw`, see SheetAggregator.raw_rows).
+
+    Never raises, except ImportCancelled when `cancel` is cancelled while the sheet is read:
+    `status` is 'ok' or the stats['sheets']['skipped'] category the sheet falls under, with
+    `reason` filled in for unprocessed_sheet_info. Reports sheet_started, rows_parsed and
+    sheet_done events to `progress` (scripts/import_progress.py).
+    """
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    started = time.perf_counter()
+    result = {'sheet_name': sheet_name, 'status': 'ok', 'reason': None, 'db_rows': [],
+              'rows_scanned': 0, 'rows_merged': 0, 'rows_errors': 0, 'seconds': 0.0, 'cache_hit': False,
+              'pattern_counts': {}, 'timings': new_stage_timings()}
+    emit(progress, 'sheet_started', filename_only, sheet_name)
+
+    def skip(status, reason):
+        result['status'] = status
+        result['reason'] = reason
+        result['seconds'] = time.perf_counter() - started
+        emit(progress, 'sheet_done', filename_only, sheet_name, result['rows_scanned'], result['seconds'])
+        return result
+
+    def on_rows(rows):
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        emit(progress, 'rows_parsed', filename_only, sheet_name, rows, time.perf_counter() - started)
+
+    try:
+        logger.info("\n%s\nProcessing sheet: %s\n%s", '='*50, sheet_name, '='*50)
+
+        # The sheet is streamed in chunks: read one, fold it into the aggregator, read the next
+        frames = iter_sheet_frames(reader, sheet_name, sha256=sha256,
+                                   on_rows=on_rows if progress is not None or cancel is not None else None)
+
+        def next_frame():
+            read_started = time.perf_counter()
+            frame = next(frames, None)
+            record_stage(result['timings'], 'sheet_read', time.perf_counter() - read_started, 0 if frame is None else len(frame))
+            if frame is not None:
+                # Map columns according to file type
+                frame.columns = [str(col).strip() for col in frame.columns]
+                frame.rename(columns={v: k for k, v in col_map.items() if v in frame.columns}, inplace=True)
+            return frame
+
+        def skip_rest(status, reason):
+            # Skipped sheets are still read to the end, so they land in the sheet cache as before
+            while next_frame() is not None:
+                pass
+            return skip(status, reason)
+
+        col_map = COLUMN_MAPS[file_type]
+        df = next_frame()
+        if df is None:
+            logger.warning("No data found in sheet '%s'", sheet_name)
+            return skip('missing_cols', 'No data found in sheet') # Or a new category like 'empty'
+        result['cache_hit'] = df.attrs.get('from_cache', False)
+
+        logger.debug("Columns after renaming in sheet '%s': %s", sheet_name, list(df.columns))
+
+        if not EXPECTED_MAPPED_COLS.issubset(df.columns):
+            logger.warning("WARNING: Sheet '%s' missing required columns. Expected: %s. Got: %s", sheet_name, EXPECTED_MAPPED_COLS, set(df.columns))
+            return skip_rest('missing_cols', f"Missing required columns. Expected: {EXPECTED_MAPPED_COLS}, Got: {set(df.columns)}")
+
+        # Determine consumption date
+        if file_type == "report":
+            try:
+                consumed_year = int(sheet_name)
+                consumed_month = 12
+                consumed_at = date(consumed_year, 12, 31).isoformat()
+                assumed_month = 1
+                logger.info("Using year %d from sheet name", consumed_year)
+            except ValueError:
+                logger.warning("Warning: Invalid year in sheet name '%s'", sheet_name)
+                return skip_rest('bad_date', f"Invalid year in sheet name '{sheet_name}'")
+        else:  # monthly
+            parsed_date, yr, mn = parse_excel_filename_date(filename_only)
+            if not parsed_date:
+                logger.warning("Warning: Could not parse date from filename %s", filename_only)
+                # For monthly, usually the first sheet
+                return skip_rest('bad_date', f"Could not parse date from filename '{filename_only}' for this sheet")
+            consumed_year, consumed_month = yr, mn
+            consumed_at = parsed_date.isoformat()
+            assumed_month = 0
+            logger.info("Using date from filename: %s", consumed_at)
+
+        # Process rows
+        aggregator = SheetAggregator(consumed_year, consumed_month, sheet_name, timings=result['timings'])
+        aggregation_seconds = 0.0
+        while df is not None:
+            result['rows_scanned'] += len(df)
+            aggregation_started = time.perf_counter()
+            aggregator.add(df)
+            aggregation_seconds += time.perf_counter() - aggregation_started
+            df = next_frame()
+
+        aggregation_started = time.perf_counter()
+        aggregates, reconciliation_log = aggregator.results()
+        error_rows, pattern_counts = aggregator.error_rows, aggregator.pattern_counts
+        result['rows_errors'] = error_rows
+        result['pattern_counts'] = dict(pattern_counts)
+        result['rows_merged'] = sum(agg['count'] - 1 for agg in aggregates)
+        # Written to reconciliation_events with the rows (scripts/reconciliation.py)
+        result['reconciliation'] = reconciliation_log
+
+        imported_at = datetime.now().isoformat()
+        # Written to raw_rows next to the aggregates (scripts/raw_rows.py)
+        result['raw'] = dict(aggregator.raw_rows(), consumed_at=consumed_at, consumed_year=consumed_year,
+                             consumed_month=consumed_month, assumed_month=assumed_month, imported_at=imported_at)
+        result['db_rows'] = aggregate_db_rows(aggregates, result['raw'], filename_only)
+        # Everything after reading except the metadata pass (timed inside SheetAggregator.add)
+        aggregation_seconds += time.perf_counter() - aggregation_started - result['timings']['metadata']['seconds']
+        record_stage(result['timings'], 'aggregation', max(aggregation_seconds, 0.0), result['rows_scanned'])
+
+        # Per-sheet counters; the individual merges go to reconciliation_events
+        logger.info("Sheet '%s': %d rows -> %d keys (%d merged, %d errors); filename patterns: %s",
+                    sheet_name, result['rows_scanned'], len(aggregates), result['rows_merged'], error_rows,
+                    format_pattern_counts(pattern_counts))
+        if reconciliation_log:
+            logger.info("Merged URL variants for %d keys (listed by scripts/reconciliation.py)", len(reconciliation_log))
+    except Exception as e:
+        logger.exception("Error processing sheet '%s': %s", sheet_name, e)
+        return skip('unreadable', f'Error processing sheet: {str(e)}')
+
+    result['seconds'] = time.perf_counter() - started
+    emit(progress, 'sheet_done', filename_only, sheet_name, result['rows_scanned'], result['seconds'])
+    return result
+
+
+def aggregate_db_rows(aggregates: List[Dict[str, Any]], raw: Dict[str, Any], filename_only: str) -> List[tuple]:
+    """Rows for the database (PODCASTS_COLUMNS order) from a sheet's aggregates and its `raw` period fields."""
+    return [
+        (
+            agg['url'],
+            agg['title'],
+            agg['code'],
+            agg['feature'],
+            agg['full_sum'],
+            agg['partial_sum'],
+            agg['avg_bw'],
+            agg['total_bw_sum'],
+            agg['eq_full'],
+            agg['created_at'],
+            raw['consumed_at'],
+            raw['consumed_year'],
+            raw['consumed_month'],
+            raw['assumed_month'],
+            raw['imported_at'],
+            filename_only
+        )
+        for agg in aggregates
+    ]
+
+
+def regroup_sheet(sheet: dict, url_metadata: List[Optional[tuple]], filename_only: str) -> None:
+    """
+    Aggregate a parse_sheet() result again from its raw rows, with `url_metadata` (one entry per
+    URL of sheet['raw']['urls'], as in SheetAggregator.url_metadata) in place of the parsed
+    metadata. Sums stay in row order, so a key that is not merged keeps exactly the values it had.
+    """
+    raw = sheet['raw']
+    aggregator = SheetAggregator(raw['consumed_year'], raw['consumed_month'], sheet['sheet_name'],
+                                 known_metadata=dict(zip(raw['urls'], url_metadata)))
+    if len(raw['url_positions']):
+        aggregator.add(pd.DataFrame({
+            'url': np.array(raw['urls'], dtype=object)[raw['url_positions']],
+            'full': raw['full'], 'partial': raw['partial'], 'total_bw': raw['total_bw'],
+        }))
+    aggregates, sheet['reconciliation'] = aggregator.results()
+    sheet['raw'] = dict(raw, url_metadata=aggregator.url_metadata)
+    sheet['db_rows'] = aggregate_db_rows(aggregates, sheet['raw'], filename_only)
+    sheet['rows_merged'] = sum(agg['count'] - 1 for agg in aggregates)
+
+
+def resolve_sheet_titles(conn: sqlite3.Connection, sheets: List[dict], stats: dict, import_id: Optional[int]) -> int:
+    """
+    Replace the normalized title of every grouping key of `sheets` by its canonical title
+    (scripts/title_resolution.py), sheet by sheet in key order, merge the keys that now share one
+    (regroup_sheet) and give each row the display title of its episode. New titles are recorded in
+    `title_aliases` as part of `import_id`, in the caller's transaction; dry runs (`import_id`
+    None) record nothing. Returns the number of keys merged into another one.
+    """
+    resolver = title_resolution.resolver_for(conn)
+    merged = 0
+    for sheet in sheets:
+        raw = sheet.get('raw')
+        if not raw:
+            continue
+        canonical = {}
+        for metadata in raw['url_metadata']:
+            if metadata is not None and metadata[4:] not in canonical:
+                key = metadata[4:]
+                canonical[key] = key[:2] + (resolver.resolve(*key),)
+        if any(key != resolved for key, resolved in canonical.items()):
+            url_metadata = [None if metadata is None else metadata[:4] + canonical[metadata[4:]] for metadata in raw['url_metadata']]
+            sheet_merged = len(canonical) - len(set(canonical.values()))
+            if sheet_merged:
+                rows_merged = sheet['rows_merged']
+                regroup_sheet(sheet, url_metadata, stats['filename'])
+                stats['rows']['merged'] += sheet['rows_merged'] - rows_merged
+                logger.info("Sheet '%s': %d key(s) merged into a matching title", sheet['sheet_name'], sheet_merged)
+                merged += sheet_merged
+            else:
+                sheet['raw'] = dict(raw, url_metadata=url_metadata)
+        # Rows are in the first-seen order of their keys
+        keys = list(dict.fromkeys(canonical.values()))
+        sheet['db_rows'] = [row[:1] + (resolver.display_title(*key, row[1]),) + row[2:]
+                            for key, row in zip(keys, sheet['db_rows'])]
+        titles = {key: row[1] for key, row in zip(keys, sheet['db_rows'])}
+        for entry in sheet.get('reconciliation', ()):
+            key = canonical.get(entry['agg_key'][:3], entry['agg_key'][:3])
+            entry['agg_key'] = key + tuple(entry['agg_key'][3:])
+            entry['canonical_title'] = titles[key]
+    if import_id is not None:
+        resolver.flush(conn, import_id)
+    else:
+        resolver.discard()
+    return merged
+
+
+def format_pattern_counts(pattern_counts: Dict[str, int]) -> str:
+    if not pattern_counts:
+        return "none"
+    return ", ".join(f"{pattern}={count}" for pattern, count in sorted(pattern_counts.items()))
+
+
+def record_sheet_result(stats: dict, sheet: dict) -> None:
+    """Fold a parse_sheet() result into the file's stats."""
+    stats['rows']['scanned'] += sheet['rows_scanned']
+    for pattern, count in sheet.get('pattern_counts', {}).items():
+        stats['patterns'][pattern] = stats['patterns'].get(pattern, 0) + count
+    stats['rows']['errors'] += sheet['rows_errors']
+    stats['rows']['merged'] += sheet['rows_merged']
+    stats['workbook']['sheet_cache_hits'] += int(sheet.get('cache_hit', False))
+    merge_stage_timings(stats['timings'], sheet.get('timings', {}))
+    if sheet['status'] != 'ok':
+        stats['sheets']['skipped'][sheet['status']] += 1
+        stats['unprocessed_sheet_info'].append({'sheet_name': sheet['sheet_name'], 'reason': sheet['reason']})
+
+
+def _parse_sheet_in_worker(filepath: str, engine: str, sheet_name: str, file_type: str, filename_only: str,
+                           sha256: Optional[str], log_level: int = logging.INFO, relay_args=(None, None)) -> dict:
+    """
+    Sheet worker entry point: opens its own reader and captures its output for in-order printing.
+    `relay_args` come from WorkerRelay.worker_args() of the process waiting for the sheet.
+    """
+    progress, cancel = worker_hooks(*relay_args)
+    with capture_logs(log_level) as output:
+        reader = open_workbook_reader(filepath, engine)
+        try:
+            sheet = parse_sheet(reader, sheet_name, file_type, filename_only, sha256, progress, cancel)
+        finally:
+            reader.close()
+    sheet['output'] = output.getvalue()
+    sheet['peak_rss_mb'] = get_peak_rss_mb()
+    return sheet
+
+
+def parse_sheets_parallel(filepath: str, engine: str, sheet_names: List[str], file_type: str, filename_only: str,
+                          sheet_workers: int, sha256: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                          cancel: Optional[CancelToken] = None) -> List[dict]:
+    """
+    Parse independent sheets (the year sheets of a report) in worker processes, returning the
+    parse_sheet() results in sheet order. Processes rather than threads: reading and aggregating
+    a sheet is GIL-bound Python, so threads were slower than a plain loop in benchmarks.
+    The workers' progress events are relayed to `progress` and `cancel` stops them too.
+    """
+    relay = WorkerRelay(progress, cancel) if progress is not None or cancel is not None else None
+    try:
+        # spawn: forking a threaded parent (Streamlit) can deadlock the children
+        with ProcessPoolExecutor(max_workers=min(sheet_workers, len(sheet_names)),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(_parse_sheet_in_worker, filepath, engine, sheet_name, file_type, filename_only, sha256,
+                                       current_level(), relay.worker_args() if relay else (None, None))
+                       for sheet_name in sheet_names]
+            sheets = []
+            for sheet_name, future in zip(sheet_names, futures):
+                try:
+                    sheet = relay.result(future) if relay else future.result()
+                except Exception as e:
+                    logger.error("Error processing sheet '%s' in worker: %s", sheet_name, e)
+                    sheet = {'sheet_name': sheet_name, 'status': 'unreadable', 'reason': f'Error processing sheet: {str(e)}',
+                             'db_rows': [], 'rows_scanned': 0, 'rows_merged': 0, 'rows_errors': 0, 'seconds': 0.0,
+                             'cache_hit': False, 'pattern_counts': {}, 'timings': new_stage_timings()}
+                output = sheet.pop('output', '')
+                if output:
+                    sys.stdout.write(output)
+                sheets.append(sheet)
+    finally:
+        if relay:
+            relay.close()
+    return sheets
+
+
+def parse_workbook(filepath: str, original_filename: str = None, engine: str = DEFAULT_READER_ENGINE,
+                   sheet_workers: int = 1, sha256: Optional[str] = None, use_cache: bool = True,
+                   progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None) -> dict:
+    """
+    Parse phase of an import: read and aggregate every targeted sheet without touching the database.
+
+    Returns {'filepath', 'readable', 'stats', 'sheets', 'manifest'} where `sheets` holds the
+    parse_sheet() results that are ready to be written and `manifest` one import_manifest entry per
+    targeted sheet. The result is plain data, so it can be produced in a worker process and handed
+    to write_parsed_workbook() in the writer. `sha256` skips re-hashing a file the caller already hashed.
+    `use_cache` reads and fills the on-disk sheet cache (scripts/sheet_cache.py).
+
+    With `sheet_workers > 1` the sheets of a multi-sheet workbook are parsed in that many worker
+    processes (xml engine only; the openpyxl engine holds the whole workbook in memory and stays
+    sequential).
+
+    `progress` receives the file_opened and per-sheet events and `cancel` is checked while the
+    sheets are read (scripts/import_progress.py); a cancelled parse raises ImportCancelled.
+    """
+    filename_only = os.path.basename(original_filename if original_filename is not None else filepath)
+    file_type = detect_file_type(filename_only)
+    logger.debug("Detected file type for '%s': %s", filename_only, file_type)
+    stats = new_import_stats(filename_only, file_type, engine)
+    parsed = {'filepath': filepath, 'readable': False, 'stats': stats, 'sheets': [], 'manifest': []}
+
     if not file_type:
-        print(f"Error: Could not automatically determine file type for '{filename_only}'.")
+        logger.error("Error: Could not automatically determine file type for '%s'.", filename_only)
         # Populate stats for return even on early exit
         stats['sheets']['skipped']['unreadable'] = 1 # Assuming 1 sheet if file type unknown
         stats['unprocessed_sheet_info'].append({
             'sheet_name': 'N/A (file type undetermined)',
             'reason': 'Could not automatically determine file type.'
         })
-        return stats
-
-    if reset_db and os.path.exists(db_path) and not dry_run:
-        print(f"🗑️ Removing existing database {db_path} due to --reset-db flag.")
-        os.remove(db_path)
-
-    # Create database and table
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS podcasts (
-        url TEXT NOT NULL,
-        title TEXT,
-        code TEXT,
-        feature TEXT,
-        full INTEGER,
-        partial INTEGER,
-        avg_bw REAL,
-        total_bw REAL,
-        eq_full INTEGER,
-        created_at TEXT,        
-        consumed_at TEXT,       
-        consumed_year INTEGER NOT NULL, 
-        consumed_month INTEGER NOT NULL,
-        assumed_month INTEGER NOT NULL DEFAULT 0,
-        imported_at TEXT,
-        source_file_path TEXT,
-        PRIMARY KEY (url, consumed_year, consumed_month)
-    )
-    """)
-    conn.commit()
+        return parsed
 
     try:
-        wb = load_workbook(filepath, read_only=True, data_only=False)
-        all_sheet_names = wb.sheetnames
-        initial_sheets_in_file = len(all_sheet_names)
-        print(f"\nFound {initial_sheets_in_file} sheets in file: {all_sheet_names}")
+        # Open the workbook once and share the handle across every sheet instead of re-loading it per sheet.
+        rss_before_open = get_peak_rss_mb()
+        open_started = time.perf_counter()
+        reader = open_workbook_reader(filepath, engine)
+        open_seconds = time.perf_counter() - open_started
+        all_sheet_names = reader.sheetnames
+        stats['sheets']['in_file'] = len(all_sheet_names)
+        stats['workbook']['loads'] = 1
+        stats['workbook']['open_seconds'] = round(open_seconds, 3)
+        record_stage(stats['timings'], 'workbook_open', open_seconds)
+        stats['workbook']['open_rss_mb'] = round(max(get_peak_rss_mb() - rss_before_open, 0.0), 1)
+        stats['manifest'] = {'sha256': sha256 or file_sha256(filepath), 'rules_version': get_rules_version()}
+        logger.info("\nFound %d sheets in file: %s", len(all_sheet_names), all_sheet_names)
+        emit(progress, 'file_opened', filename_only, seconds=open_seconds)
     except Exception as e:
-        print(f"Error reading file {filepath}: {e}")
-        traceback.print_exc()
-        conn.close()
+        logger.exception("Error reading file %s: %s", filepath, e)
         # Populate stats for return even on file read error
         stats['sheets']['skipped']['unreadable'] = len(all_sheet_names) if 'all_sheet_names' in locals() else 1
         stats['unprocessed_sheet_info'].append({
             'sheet_name': 'N/A (file read error)',
             'reason': f'Error reading Excel file: {str(e)}'
         })
-        return stats
+        return parsed
+    parsed['readable'] = True
 
     # Determine which sheets to process
     sheets_to_process = all_sheet_names if file_type == "report" else [all_sheet_names[0]] if all_sheet_names else []
     stats['sheets']['total'] = len(sheets_to_process)
-    print(f"\nProcessing {len(sheets_to_process)} sheets: {sheets_to_process}")
+    logger.info("\nProcessing %d sheets: %s", len(sheets_to_process), sheets_to_process)
 
-    for sheet_name in sheets_to_process:
-        try:
-            print(f"\n{'='*50}")
-            print(f"Processing sheet: {sheet_name}")
-            print(f"{'='*50}")
-            
-            df = read_excel_with_hyperlinks(filepath, sheet_name)
-            print(f"[DEBUG] Columns found in sheet '{sheet_name}': {list(df.columns)}")
-            if df.empty:
-                print(f"No data found in sheet '{sheet_name}'")
-                stats['sheets']['skipped']['missing_cols'] += 1 # Or a new category like 'empty'
-                stats['unprocessed_sheet_info'].append({
-                    'sheet_name': sheet_name,
-                    'reason': 'No data found in sheet'
-                })
-                continue
+    # Loading the workbook per sheet used to cost one extra full parse for every sheet after the
+    # first (plus a read-only pass to list sheet names).
+    loads_avoided = max(len(sheets_to_process) - 1, 0)
+    stats['workbook']['loads_avoided'] = loads_avoided
+    stats['workbook']['estimated_seconds_saved'] = round(stats['workbook']['open_seconds'] * loads_avoided, 3)
 
-            # Map columns according to file type
-            col_map = COLUMN_MAPS[file_type]
-            df.columns = [str(col).strip() for col in df.columns]
-            renamed_cols = {v: k for k, v in col_map.items() if v in df.columns}
-            df.rename(columns=renamed_cols, inplace=True)
+    cache_sha256 = stats['manifest']['sha256'] if use_cache else None
+    parallel_sheets = sheet_workers > 1 and engine == "xml" and len(sheets_to_process) > 1
+    try:
+        if parallel_sheets:
+            logger.info("Parsing %d sheets with %d worker processes", len(sheets_to_process), min(sheet_workers, len(sheets_to_process)))
+            sheets = parse_sheets_parallel(filepath, engine, sheets_to_process, file_type, filename_only, sheet_workers,
+                                           cache_sha256, progress, cancel)
+        else:
+            sheets = (parse_sheet(reader, sheet_name, file_type, filename_only, cache_sha256, progress, cancel)
+                      for sheet_name in sheets_to_process)
+        for sheet in sheets:
+            record_sheet_result(stats, sheet)
+            if sheet['status'] == 'ok':
+                parsed['sheets'].append(sheet)
+            parsed['manifest'].append({
+                'file_sha256': stats['manifest']['sha256'],
+                'sheet_name': sheet['sheet_name'],
+                'filename': filename_only,
+                'file_type': file_type,
+                'rules_version': stats['manifest']['rules_version'],
+                'status': sheet['status'],
+                'rows_scanned': sheet['rows_scanned'],
+                'rows_merged': sheet['rows_merged'],
+                'rows_errors': sheet['rows_errors'],
+                'rows_written': 0,
+                'parse_seconds': round(sheet['seconds'], 3),
+            })
+    finally:
+        reader.close()
+    worker_peaks = [sheet.get('peak_rss_mb', 0.0) for sheet in parsed['sheets']] if parallel_sheets else []
+    stats['workbook']['peak_rss_mb'] = max([get_peak_rss_mb()] + worker_peaks)
+    # The workbook is opened once for all of its rows
+    record_stage(stats['timings'], 'workbook_open', 0.0, stats['rows']['scanned'], peak_rss_mb=0.0)
+    return parsed
 
-            print(f"[DEBUG] Columns after renaming in sheet '{sheet_name}': {list(df.columns)}")
 
-            if not EXPECTED_MAPPED_COLS.issubset(df.columns):
-                print(f"[DEBUG] WARNING: Sheet '{sheet_name}' missing required columns. Expected: {EXPECTED_MAPPED_COLS}. Got: {set(df.columns)}")
-                stats['sheets']['skipped']['missing_cols'] += 1
-                stats['unprocessed_sheet_info'].append({
-                    'sheet_name': sheet_name,
-                    'reason': f"Missing required columns. Expected: {EXPECTED_MAPPED_COLS}, Got: {set(df.columns)}"
-                })
-                continue
+def write_parsed_workbook(conn: sqlite3.Connection, parsed: dict, dry_run: bool = False,
+                          checkpoint: Optional[Callable[[sqlite3.Connection, dict], None]] = None,
+                          progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None,
+                          job_id: Optional[int] = None) -> dict:
+    """
+    Write phase of an import: apply the parsed sheets in order and return the updated stats.
 
-            # Determine consumption date
-            if file_type == "report":
-                try:
-                    consumed_year = int(sheet_name)
-                    consumed_month = 12
-                    consumed_at = date(consumed_year, 12, 31).isoformat()
-                    assumed_month = 1
-                    print(f"Using year {consumed_year} from sheet name")
-                except ValueError:
-                    print(f"Warning: Invalid year in sheet name '{sheet_name}'")
-                    stats['sheets']['skipped']['bad_date'] += 1
-                    stats['unprocessed_sheet_info'].append({
-                        'sheet_name': sheet_name,
-                        'reason': f"Invalid year in sheet name '{sheet_name}'"
-                    })
-                    continue
-            else:  # monthly
-                parsed_date, yr, mn = parse_excel_filename_date(filename_only)
-                if not parsed_date:
-                    print(f"Warning: Could not parse date from filename {filename_only}")
-                    stats['sheets']['skipped']['bad_date'] += 1
-                    stats['unprocessed_sheet_info'].append({
-                        'sheet_name': sheet_name, # For monthly, usually the first sheet
-                        'reason': f"Could not parse date from filename '{filename_only}' for this sheet"
-                    })
-                    continue
-                consumed_year, consumed_month = yr, mn
-                consumed_at = parsed_date.isoformat()
-                assumed_month = 0
-                print(f"Using date from filename: {consumed_at}")
-
-            # Process rows
-            stats['rows']['scanned'] += len(df)
-            aggregated_data = {}
-            reconciliation_log = []  # Track reconciliation events for reporting
-
-            # Debug: Print the full extracted title for the first 10 rows
-            debug_title_count = 0
-            for _, row in df.iterrows():
-                url = row['url']
-                code, feature, title, created_at = extract_code_feature_title(url)
-                if debug_title_count < 10:
-                    print(f"[DEBUG] Extracted title: '{title}' from filename: '{url}")
-                    debug_title_count += 1
-
-            for _, row in df.iterrows():
-                try:
-                    url = row['url']
-                    if pd.isna(url) or not isinstance(url, str) or not url.strip():
-                        continue
-
-                    # Extract metadata from URL
-                    code, feature, title, created_at = extract_code_feature_title(url)
-                    created_at_str = created_at.isoformat() if created_at else None
-
-                    # Calculate metrics
-                    full = pd.to_numeric(row.get('full'), errors='coerce')
-                    partial = pd.to_numeric(row.get('partial'), errors='coerce')
-                    total_bw = parse_float(row.get('total_bw'))
-                    avg_bw = parse_float(row.get('avg_bw'))
-
-                    # Create aggregation key (canonicalized)
-                    agg_key = (
-                        str(code) if code else "_NO_CODE_",
-                        str(feature) if feature else "_NO_FEATURE_",
-                        normalize_title_for_grouping_key(title),
-                        consumed_year,
-                        consumed_month
-                    )
-
-                    # Track all variants for reconciliation
-                    if agg_key not in aggregated_data:
-                        aggregated_data[agg_key] = {
-                            'urls': [url],
-                            'titles': [title],
-                            'code': code,
-                            'feature': feature,
-                            'created_at': created_at_str,
-                            'full_sum': float(full) if pd.notna(full) else 0.0,
-                            'partial_sum': float(partial) if pd.notna(partial) else 0.0,
-                            'total_bw_sum': float(total_bw) if pd.notna(total_bw) else 0.0,
-                            'count': 1
-                        }
-                    else:
-                        agg = aggregated_data[agg_key]
-                        agg['urls'].append(url)
-                        agg['titles'].append(title)
-                        agg['full_sum'] += float(full) if pd.notna(full) else 0.0
-                        agg['partial_sum'] += float(partial) if pd.notna(partial) else 0.0
-                        agg['total_bw_sum'] += float(total_bw) if pd.notna(total_bw) else 0.0
-                        agg['count'] += 1
+    Monthly files replace existing keys and report files ignore them. All sheets of the file are
+    written in one transaction and, when possible, one bulk statement; a sheet that fails to write
+    is rolled back on its own and reported as unreadable. Dry runs diff the sheets against the
+    database instead (stats['dry_run_diff']). `checkpoint(conn, stats)` runs just before the
+    commit, so whatever it records commits with the file (see scripts/import_jobs.py).
 
-                except Exception as e:
-                    print(f"Error processing row in sheet '{sheet_name}': {e}")
-                    traceback.print_exc()
-                    stats['rows']['errors'] += 1
-                    continue
-
-            # Insert aggregated data into database
-            imported_at = datetime.now().isoformat()
-            for agg_key, agg_data in aggregated_data.items():
-                try:
-                    if agg_data['count'] > 1:
-                        stats['rows']['merged'] += agg_data['count'] - 1
-
-                    # Choose the most complete (longest) title/url for canonicalization
-                    canonical_title = max(agg_data['titles'], key=len)
-                    canonical_url = max(agg_data['urls'], key=len)
-
-                    # --- Ensure title is always stripped of audio file extensions for consistency ---
-                    canonical_title_clean = re.sub(r'\.(mp3|wav|aac|m4a)$', '', canonical_title, flags=re.IGNORECASE)
-
-                    # Reconciliation reporting: If more than one variant, log the merge
-                    if len(set(agg_data['titles'])) > 1 or len(set(agg_data['urls'])) > 1:
-                        reconciliation_log.append({
-                            'agg_key': agg_key,
-                            'titles': list(set(agg_data['titles'])),
-                            'urls': list(set(agg_data['urls'])),
-                            'canonical_title': canonical_title_clean,
-                            'canonical_url': canonical_url
-                        })
-
-                    # Calculate derived metrics
-                    eq_full = math.floor(agg_data['full_sum'] + 0.5 * agg_data['partial_sum'])
-                    avg_bw = (agg_data['total_bw_sum'] / (agg_data['full_sum'] + agg_data['partial_sum'])
-                             if (agg_data['full_sum'] + agg_data['partial_sum']) > 0 else None)
-
-                    db_values = (
-                        canonical_url,
-                        canonical_title_clean,
-                        agg_data['code'],
-                        agg_data['feature'],
-                        agg_data['full_sum'],
-                        agg_data['partial_sum'],
-                        avg_bw,
-                        agg_data['total_bw_sum'],
-                        eq_full,
-                        agg_data['created_at'],
-                        consumed_at,
-                        consumed_year,
-                        consumed_month,
-                        assumed_month,
-                        imported_at,
-                        filename_only
-                    )
-
-                    if dry_run:
-                        c.execute("SELECT 1 FROM podcasts WHERE url = ? AND consumed_year = ? AND consumed_month = ?",
-                                  (canonical_url, consumed_year, consumed_month))
-                        exists = c.fetchone()
-                        if file_type == "monthly":
-                            stats['dry_run']['replaced' if exists else 'inserted'] += 1
-                        else:
-                            stats['dry_run']['ignored' if exists else 'inserted'] += 1
-                    else:
-                        if file_type == "monthly":
-                            c.execute("SELECT 1 FROM podcasts WHERE url = ? AND consumed_year = ? AND consumed_month = ?",
-                                    (canonical_url, consumed_year, consumed_month))
-                            exists = c.fetchone()
-                            c.execute("""
-                                INSERT OR REPLACE INTO podcasts (
-                                    url, title, code, feature, full, partial, avg_bw, total_bw, eq_full,
-                                    created_at, consumed_at, consumed_year, consumed_month, assumed_month, imported_at, source_file_path
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, db_values)
-                            stats['actual']['replaced' if exists else 'inserted'] += 1
-                        else:
-                            c.execute("""
-                                INSERT OR IGNORE INTO podcasts (
-                                    url, title, code, feature, full, partial, avg_bw, total_bw, eq_full,
-                                    created_at, consumed_at, consumed_year, consumed_month, assumed_month, imported_at, source_file_path
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, db_values)
-                            if c.rowcount > 0:
-                                stats['actual']['inserted'] += 1
-                            else:
-                                stats['actual']['ignored'] += 1
+    The file is recorded as one import (stats['import_id']) with the changeset needed to undo it,
+    in the same transaction (scripts/import_history.py); `job_id` links it to its import job.
 
-                except Exception as e:
-                    print(f"Error inserting aggregated data for URL {agg_data['urls']}: {e}")
-                    traceback.print_exc()
-                    stats['rows']['errors'] += 1
-                    continue
-
-            stats['sheets']['processed'] += 1
-            print(f"Successfully processed sheet '{sheet_name}'")
-
-            # Print reconciliation summary for this sheet if any merges occurred
-            if reconciliation_log:
-                print("\n[RECONCILIATION SUMMARY]")
-                for rec in reconciliation_log:
-                    print(f"Merged variants for key {rec['agg_key']}:")
-                    print(f"  Titles: {rec['titles']}")
-                    print(f"  URLs: {rec['urls']}")
-                    print(f"  Canonical Title: {rec['canonical_title']}")
-                    print(f"  Canonical URL: {rec['canonical_url']}")
-                print("[END RECONCILIATION SUMMARY]\n")
+    `progress` receives aggregate_written per sheet and file_done once committed. `cancel` is
+    checked before the transaction starts and again before it commits; a cancelled write is
+    rolled back whole and raises ImportCancelled.
+    """
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    stats = parsed['stats']
+    mode = "replace" if stats['file_type'] == "monthly" else "ignore"
+    c = conn.cursor()
+    dry_run_diffs = []
+    write_started = time.perf_counter()
+    failed_sheets = set()
 
+    import_id = None
+    if not dry_run:
+        c.execute("BEGIN")
+        import_id = import_history.start_import(conn, stats['filename'], stats['manifest']['sha256'],
+                                                stats['file_type'], job_id)
+    # Keys are merged across files here rather than in the parse workers, in write order
+    resolve_sheet_titles(conn, parsed['sheets'], stats, import_id)
+
+    # Sheets cover disjoint periods, so they are staged together and written in one bulk statement;
+    # if that fails, fall back to sheet-by-sheet so only the failing sheet is dropped.
+    pending = parsed['sheets']
+    if len(pending) > 1:
+        sheets_started = time.perf_counter()
+        try:
+            dry_run_diffs.append(_write_sheets(conn, pending, mode, stats, dry_run, import_id))
+        except Exception as e:
+            logger.warning("Bulk write of %d sheets failed (%s); writing sheet by sheet", len(pending), e)
+        else:
+            for sheet in pending:
+                emit(progress, 'aggregate_written', stats['filename'], sheet['sheet_name'], len(sheet['db_rows']),
+                     time.perf_counter() - sheets_started)
+            pending = []
+    for sheet in pending:
+        sheets_started = time.perf_counter()
+        try:
+            dry_run_diffs.append(_write_sheets(conn, [sheet], mode, stats, dry_run, import_id))
         except Exception as e:
-            print(f"Error processing sheet '{sheet_name}': {e}")
-            traceback.print_exc()
+            logger.exception("Error processing sheet '%s': %s", sheet['sheet_name'], e)
+            failed_sheets.add(sheet['sheet_name'])
             stats['sheets']['skipped']['unreadable'] += 1
             stats['unprocessed_sheet_info'].append({
-                'sheet_name': sheet_name,
+                'sheet_name': sheet['sheet_name'],
                 'reason': f'Error processing sheet: {str(e)}'
             })
-            continue
+        else:
+            emit(progress, 'aggregate_written', stats['filename'], sheet['sheet_name'], len(sheet['db_rows']),
+                 time.perf_counter() - sheets_started)
+
+    if import_id is not None:
+        import_history.finish_import(conn, import_id, stats['actual'])
+        stats['import_id'] = import_id
 
-    conn.commit()
-    conn.close()
+    if not dry_run and parsed.get('manifest'):
+        # Recorded in the same transaction as the rows, so the manifest never claims an import that rolled back
+        rows_written = {sheet['sheet_name']: len(sheet['db_rows']) for sheet in parsed['sheets']}
+        write_seconds = round(time.perf_counter() - write_started, 3)
+        imported_at = datetime.now().isoformat()
+        entries = []
+        for entry in parsed['manifest']:
+            failed = entry['sheet_name'] in failed_sheets
+            entries.append(dict(entry, status='unreadable' if failed else entry['status'],
+                                rows_written=0 if failed else rows_written.get(entry['sheet_name'], 0),
+                                write_seconds=write_seconds, imported_at=imported_at))
+        podcasts_db.record_manifest_entries(conn, entries)
 
-    # Print summary
-    print("\n" + "="*70)
-    print(f" Import Summary for: {filename_only}")
-    print("="*70)
-    print(f"File Type: {file_type.capitalize()}")
-    print(f"Processing Mode: {'Dry Run' if dry_run else 'Actual Import'}")
-    print(f"Source Path: {filepath}\n")
+    if checkpoint:
+        checkpoint(conn, stats)
+
+    if cancel is not None and cancel.cancelled:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        stats['import_id'] = None
+        logger.warning("Import of '%s' cancelled; nothing was written for it", stats['filename'])
+        raise ImportCancelled(f"Import of '{stats['filename']}' cancelled")
+
+    staged_rows = sum(len(sheet['db_rows']) for sheet in parsed['sheets'] if sheet['sheet_name'] not in failed_sheets)
+    record_stage(stats['timings'], 'db_write', time.perf_counter() - write_started, staged_rows)
+    if conn.in_transaction:
+        commit_started = time.perf_counter()
+        c.execute("COMMIT")
+        record_stage(stats['timings'], 'commit', time.perf_counter() - commit_started, staged_rows)
+    emit(progress, 'file_done', stats['filename'], rows=staged_rows, seconds=time.perf_counter() - write_started)
+    if dry_run:
+        dry_run_diffs = [diff for diff in dry_run_diffs if diff is not None]
+        stats['dry_run_diff'] = pd.concat(dry_run_diffs, ignore_index=True) if dry_run_diffs else pd.DataFrame(columns=DRY_RUN_DIFF_COLUMNS)
+    return stats
+
+
+def _write_sheets(conn: sqlite3.Connection, sheets: List[dict], mode: str, stats: dict, dry_run: bool,
+                  import_id: Optional[int] = None) -> Optional[pd.DataFrame]:
+    """
+    Stage `sheets` together and apply them (or diff them when dry_run) in one statement, as part
+    of `import_id`, along with their raw rows and reconciliation events. Stats are only updated once the write succeeded; a
+    failed write is rolled back entirely, changeset, raw rows and events included.
+    """
+    c = conn.cursor()
+    db_rows = [row for sheet in sheets for row in sheet['db_rows']]
+    sheet_diff = None
+    if dry_run:
+        # Diff the staged sheets against the database instead of applying them
+        podcasts_db.stage_rows(conn, db_rows)
+        sheet_diff = podcasts_db.diff_staged_rows(conn, mode)
+        for action, count in sheet_diff['action'].value_counts().items():
+            stats['dry_run'][DRY_RUN_ACTION_LABELS[action]] += int(count)
+        # Staging order is sheet order, so each diff row maps back to its sheet by position
+        sheet_diff.insert(0, 'sheet_name', np.repeat([sheet['sheet_name'] for sheet in sheets],
+                                                     [len(sheet['db_rows']) for sheet in sheets]))
+        sheet_diff.insert(0, 'source_file', stats['filename'])
+    else:
+        c.execute("SAVEPOINT sheet_write")
+        try:
+            podcasts_db.stage_rows(conn, db_rows)
+            counts = podcasts_db.apply_staged_rows(conn, mode, import_id)
+            if import_id is not None:
+                for sheet in sheets:
+                    raw_rows.record_sheet(conn, import_id, sheet, stats['manifest']['rules_version'])
+                    reconciliation.record_events(conn, import_id, sheet)
+            c.execute("RELEASE sheet_write")
+        except Exception:
+            c.execute("ROLLBACK TO sheet_write")
+            c.execute("RELEASE sheet_write")
+            raise
+        for action, count in counts.items():
+            stats['actual'][action] += count
+    for sheet in sheets:
+        stats['sheets']['processed'] += 1
+        logger.info("Successfully processed sheet '%s'", sheet['sheet_name'])
+    return sheet_diff
+
+
+def print_import_summary(stats: dict, filepath: str, dry_run: bool) -> None:
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("\n" + "="*70)
+    logger.info(f" Import Summary for: {stats['filename']}")
+    logger.info("="*70)
+    logger.info(f"File Type: {stats['file_type'].capitalize()}")
+    logger.info(f"Processing Mode: {'Dry Run' if dry_run else 'Actual Import'}")
+    logger.info(f"Source Path: {filepath}\n")
     
-    print("File & Sheet Details:")
-    print(f"  Sheets in file: {initial_sheets_in_file}")
-    print(f"  Sheets targeted: {stats['sheets']['total']}")
-    print(f"  Sheets processed: {stats['sheets']['processed']}")
-    print("  Sheets skipped:")
-    print(f"    - Unreadable: {stats['sheets']['skipped']['unreadable']}")
-    print(f"    - Missing columns: {stats['sheets']['skipped']['missing_cols']}")
-    print(f"    - Bad date format: {stats['sheets']['skipped']['bad_date']}\n")
+    logger.info("File & Sheet Details:")
+    logger.info(f"  Sheets in file: {stats['sheets']['in_file']}")
+    logger.info(f"  Sheets targeted: {stats['sheets']['total']}")
+    logger.info(f"  Sheets processed: {stats['sheets']['processed']}")
+    logger.info("  Sheets skipped:")
+    logger.info(f"    - Unreadable: {stats['sheets']['skipped']['unreadable']}")
+    logger.info(f"    - Missing columns: {stats['sheets']['skipped']['missing_cols']}")
+    logger.info(f"    - Bad date format: {stats['sheets']['skipped']['bad_date']}\n")
     
-    print("Row Processing:")
-    print(f"  Total rows scanned: {stats['rows']['scanned']}")
-    print(f"  Rows merged: {stats['rows']['merged']}")
-    print(f"  Processing errors: {stats['rows']['errors']}\n")
+    logger.info("Row Processing:")
+    logger.info(f"  Total rows scanned: {stats['rows']['scanned']}")
+    logger.info(f"  Rows merged: {stats['rows']['merged']}")
+    logger.info(f"  Processing errors: {stats['rows']['errors']}")
+    logger.info(f"  Distinct URLs per filename pattern: {format_pattern_counts(stats['patterns'])}\n")
+
+    logger.info("Workbook Loading:")
+    logger.info(f"  Engine: {stats['workbook']['engine']}")
+    logger.info(f"  Workbook opened: {stats['workbook']['loads']}x in {stats['workbook']['open_seconds']:.2f}s (+{stats['workbook']['open_rss_mb']:.1f} MB)")
+    logger.info(f"  Re-parses avoided: {stats['workbook']['loads_avoided']} (~{stats['workbook']['estimated_seconds_saved']:.2f}s saved)")
+    logger.info(f"  Sheets read from cache: {stats['workbook']['sheet_cache_hits']}")
+    logger.info(f"  Peak RSS: {stats['workbook']['peak_rss_mb']:.1f} MB\n")
+
+    logger.info("Stage Timings:")
+    for stage, timer in stats['timings'].items():
+        logger.info(f"  {stage:<14} {timer['seconds']:8.3f}s  {timer['rows']:>9,} rows  {timer['rows_per_sec']:>12,.0f} rows/s  peak {timer['peak_rss_mb']:.1f} MB")
+    logger.info("")
     
     if dry_run:
-        print("Database Changes (Preview):")
-        print(f"  Would insert: {stats['dry_run']['inserted']}")
-        print(f"  Would replace: {stats['dry_run']['replaced']}")
-        print(f"  Would ignore: {stats['dry_run']['ignored']}")
+        logger.info("Database Changes (Preview):")
+        logger.info(f"  Would insert: {stats['dry_run']['inserted']}")
+        logger.info(f"  Would replace: {stats['dry_run']['replaced']}")
+        logger.info(f"  Would ignore: {stats['dry_run']['ignored']}")
+        diff = stats['dry_run_diff']
+        changed = diff[diff['action'] == 'replace']
+        if not changed.empty:
+            logger.info("  Net change on replaced rows:")
+            for metric in podcasts_db.DIFF_METRICS:
+                logger.info(f"    - {metric}: {changed[f'{metric}_delta'].sum():+,.2f}")
     else:
-        print("Database Changes (Actual):")
-        print(f"  Inserted: {stats['actual']['inserted']}")
-        print(f"  Replaced: {stats['actual']['replaced']}")
-        print(f"  Ignored: {stats['actual']['ignored']}")
+        logger.info("Database Changes (Actual):")
+        logger.info(f"  Inserted: {stats['actual']['inserted']}")
+        logger.info(f"  Replaced: {stats['actual']['replaced']}")
+        logger.info(f"  Ignored: {stats['actual']['ignored']}")
+        if stats.get('import_id') is not None:
+            logger.info(f"  Import id: {stats['import_id']} (undo with: python scripts/import_history.py --undo {stats['import_id']})")
     
-    print("-"*70)
+    logger.info("-"*70)
 
+
+def unchanged_file_stats(conn: sqlite3.Connection, filepath: str, sha256: str, original_filename: str = None,
+                         engine: str = DEFAULT_READER_ENGINE) -> Optional[dict]:
+    """
+    Stats for skipping `filepath` if the exact same content was already imported under the same
+    filename and the current rules version (see import_manifest), otherwise None.
+    """
+    filename_only = os.path.basename(original_filename if original_filename is not None else filepath)
+    entries = podcasts_db.find_manifest_entries(conn, sha256, filename_only, get_rules_version())
+    if not entries:
+        return None
+    stats = new_import_stats(filename_only, detect_file_type(filename_only), engine)
+    stats['files']['unchanged_skipped'] = 1
+    stats['manifest'] = {'sha256': sha256, 'rules_version': get_rules_version()}
+    stats['sheets']['total'] = len(entries)
+    logger.info("⏭️ Skipping '%s': identical content was already imported on %s (%d sheet(s)). Use --force to import it again.",
+                filename_only, entries[0]['imported_at'], len(entries))
     return stats
 
+
+def import_data(filepath: str, override: bool = False, dry_run: bool = False, reset_db: bool = False, original_filename: str = None, engine: str = DEFAULT_READER_ENGINE, db_path: str = podcasts_db.DEFAULT_DB_PATH, sheet_workers: int = 1, force: bool = False, use_cache: bool = True, progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None) -> dict:
+    logger.debug("import_data called for: %s", filepath)
+    # Files whose exact content was already imported under the current rules are skipped unless forced
+    sha256 = None
+    if not force and not reset_db and os.path.exists(db_path) and os.path.isfile(filepath):
+        sha256 = file_sha256(filepath)
+        conn = podcasts_db.connect(db_path)
+        try:
+            skipped = unchanged_file_stats(conn, filepath, sha256, original_filename, engine)
+        finally:
+            conn.close()
+        if skipped:
+            return skipped
+
+    parsed = parse_workbook(filepath, original_filename=original_filename, engine=engine, sheet_workers=sheet_workers,
+                            sha256=sha256, use_cache=use_cache, progress=progress, cancel=cancel)
+    stats = parsed['stats']
+    if stats['file_type'] == 'Unknown':
+        return stats
+
+    if not parsed['readable']:
+        return stats
+
+    # --reset-db builds a new database beside the live one and swaps it in once written
+    target_db = db_path
+    if reset_db and not dry_run:
+        logger.info("🗑️ Rebuilding database %s from scratch due to --reset-db flag.", db_path)
+        target_db = podcasts_db.start_shadow_build(db_path)
+    try:
+        conn = podcasts_db.connect(target_db)
+        try:
+            write_parsed_workbook(conn, parsed, dry_run=dry_run, progress=progress, cancel=cancel)
+        finally:
+            conn.close()
+        if target_db != db_path:
+            podcasts_db.publish_shadow_build(db_path)
+    except BaseException:
+        if target_db != db_path:
+            podcasts_db.discard_shadow_build(db_path)
+        raise
+    stats['workbook']['peak_rss_mb'] = get_peak_rss_mb()
+
+    print_import_summary(stats, filepath, dry_run)
+    return stats
+
+
 if __name__ == "__main__":
     parser = ArgumentParser(description="Import podcast data from Excel files into SQLite database.") # Keep description generic or update
     parser.add_argument("filepath", help="Path to Excel file") # Or more generic "Path to data file"
     parser.add_argument("--override-db", action="store_true", help="Delete and recreate the database before import. Use with caution.")
     parser.add_argument("--dry-run", action="store_true", help="Preview actions only; no changes will be made to the database.")
-    parser.add_argument("--reset-db", action="store_true", help="Reset the database before import. Use with caution.")
+    parser.add_argument("--reset-db", action="store_true", help="Rebuild the database from this file alone; the current one stays readable until the new one replaces it. Use with caution.")
+    parser.add_argument("--engine", choices=READER_ENGINES, default=DEFAULT_READER_ENGINE, help="Excel reader engine: 'xml' streams the raw sheet XML, 'openpyxl' is the full-load fallback.")
+    parser.add_argument("--sheet-workers", type=int, default=1, help="Parse the sheets of a multi-sheet report in this many worker processes (xml engine only).")
+    parser.add_argument("--force", action="store_true", help="Import the file even if the same content was already imported under the current parsing rules.")
+    parser.add_argument("--no-cache", action="store_true", help="Read every sheet from the workbook instead of the data/cache/ sheet cache.")
+    parser.add_argument("--diff-output", help="With --dry-run, write the row-level diff to this CSV file.")
+    parser.add_argument("--progress", action="store_true", help="Print progress events (sheets, rows read, rows written) with their throughput to stderr.")
+    parser.add_argument("--compare-engines", action="store_true", help="Check that both reader engines produce identical rows for the file, then exit without importing.")
+    add_verbosity_arguments(parser)
     args = parser.parse_args()
-    import_data(args.filepath, args.override_db, args.dry_run, args.reset_db) # Call renamed function 
\ No newline at end of file
+    configure_logging(level_from_args(args))
+    if args.compare_engines:
+        differences = compare_reader_engines(args.filepath)
+        for difference in differences:
+            print(difference)
+        print("Reader engines produce identical rows." if not differences else f"{len(differences)} difference(s) found.")
+        sys.exit(1 if differences else 0)
+    result = import_data(args.filepath, args.override_db, args.dry_run, args.reset_db, engine=args.engine, sheet_workers=args.sheet_workers, force=args.force, use_cache=not args.no_cache, progress=print_progress if args.progress else None) # Call renamed function
+    if args.diff_output and 'dry_run_diff' in result:
+        result['dry_run_diff'].to_csv(args.diff_output, index=False)
+        print(f"Wrote {len(result['dry_run_diff'])} diff rows to {args.diff_output}") 
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Recorded imports and how to undo them.
+
+Every file written into `podcasts` is an import with its own `import_id`, recorded in the
+`imports` table together with its changeset in `import_changes` (see scripts/podcasts_db.py).
+write_parsed_workbook() records both in the transaction that writes the rows, so a rolled back
+import leaves no trace. Dry runs are not imports.
+
+undo_import() puts back what the import changed: rows it inserted are deleted and rows it
+replaced get their previous values (and import_id) back. It only touches the keys in the
+changeset, so undoing an import costs time proportional to the rows it wrote rather than to the
+size of the database, and replaces the whole-database copies taken before every import. An
+import whose rows were since overwritten by a later import cannot be undone before that one, so
+imports are undone newest first (undo_imports). The changeset and raw rows (scripts/raw_rows.py)
+of an undone import are dropped; its `imports` row stays, marked 'undone', and the file can be imported again.
+
+Rebuilds (--reset-db) start a new database, so the imports before a rebuild cannot be undone;
+the Cloud Storage backups taken by the Admin page cover those.
+
+Usage:
+    python scripts/import_history.py                 # list the latest imports
+    python scripts/import_history.py --undo 41 42     # undo imports 42 and 41, in that order
+    python scripts/import_history.py --undo-job 7     # undo every import of import job 7
+"""
+import os
+import sqlite3
+import sys
+from argparse import ArgumentParser
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from scripts import podcasts_db
+from scripts.import_logging import add_verbosity_arguments, configure_logging, get_logger, level_from_args
+
+logger = get_logger("import_history")
+
+IMPORT_COLUMNS = ("import_id", "filename", "file_sha256", "file_type", "job_id", "status", "rows_inserted",
+                  "rows_replaced", "imported_at", "undone_at")
+DEFAULT_LIST_LIMIT = 20
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def start_import(conn: sqlite3.Connection, filename: str, file_sha256: Optional[str], file_type: Optional[str],
+                 job_id: Optional[int] = None) -> int:
+    """Record a new import and return its id; call inside the transaction that writes its rows."""
+    cursor = conn.execute(
+        "INSERT INTO imports (filename, file_sha256, file_type, job_id, status, imported_at) VALUES (?, ?, ?, ?, 'imported', ?)",
+        (filename, file_sha256, file_type, job_id, _now())
+    )
+    return cursor.lastrowid
+
+
+def finish_import(conn: sqlite3.Connection, import_id: int, counts: Dict[str, int]) -> None:
+    conn.execute("UPDATE imports SET rows_inserted = ?, rows_replaced = ? WHERE import_id = ?",
+                 (counts.get("inserted", 0), counts.get("replaced", 0), import_id))
+
+
+def get_import(conn: sqlite3.Connection, import_id: int) -> Optional[Dict[str, object]]:
+    row = conn.execute(f"SELECT {', '.join(IMPORT_COLUMNS)} FROM imports WHERE import_id = ?", (import_id,)).fetchone()
+    return dict(zip(IMPORT_COLUMNS, row)) if row else None
+
+
+def list_imports(conn: sqlite3.Connection, limit: Optional[int] = DEFAULT_LIST_LIMIT,
+                 job_id: Optional[int] = None) -> List[Dict[str, object]]:
+    """The latest imports first, optionally only those of one import job."""
+    where, params = ("WHERE job_id = ?", [job_id]) if job_id is not None else ("", [])
+    if limit is not None:
+        params.append(limit)
+    cursor = conn.execute(
+        f"SELECT {', '.join(IMPORT_COLUMNS)} FROM imports {where} ORDER BY import_id DESC"
+        + (" LIMIT ?" if limit is not None else ""), params
+    )
+    return [dict(zip(IMPORT_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def later_imports_blocking(conn: sqlite3.Connection, import_id: int) -> List[int]:
+    """Imports that overwrote rows written by `import_id`; they have to be undone first."""
+    key_match = " AND ".join(f"p.{col} = c.{col}" for col in podcasts_db.KEY_COLUMNS)
+    return [row[0] for row in conn.execute(f"""
+        SELECT DISTINCT p.import_id FROM import_changes c
+        JOIN podcasts p ON {key_match}
+        WHERE c.import_id = ? AND p.import_id IS NOT c.import_id
+        ORDER BY p.import_id DESC
+    """, (import_id,))]
+
+
+def undo_import(conn: sqlite3.Connection, import_id: int) -> Dict[str, int]:
+    """
+    Undo one import in a single transaction: delete the rows it inserted and restore the ones it
+    replaced. Returns {'deleted': n, 'restored': n}. Raises ValueError if the import does not
+    exist, was already undone, or has rows that later imports overwrote (undo those first).
+    """
+    keys = ", ".join(podcasts_db.KEY_COLUMNS)
+    restored_columns = ", ".join(col if col in podcasts_db.KEY_COLUMNS else f"prior_{col}"
+                                 for col in podcasts_db.PODCASTS_COLUMNS + ("import_id",))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        entry = get_import(conn, import_id)
+        if entry is None or entry["status"] != "imported":
+            raise ValueError(f"Import {import_id} " + ("does not exist" if entry is None else f"is {entry['status']}"))
+        blocking = later_imports_blocking(conn, import_id)
+        if blocking:
+            raise ValueError(f"Import {import_id} has rows that later imports overwrote; undo import(s) "
+                             f"{', '.join(str(i) for i in blocking)} first")
+        deleted = podcasts_db.delete_rows(
+            conn, f"SELECT {keys} FROM import_changes WHERE import_id = ? AND replaced = 0", (import_id,)
+        )
+        restored = podcasts_db.write_rows(conn, f"""
+            SELECT {restored_columns} FROM import_changes WHERE import_id = ? AND replaced = 1
+        """, (import_id,), "replace")
+        podcasts_db.prune_dimensions(conn, "SELECT url FROM import_changes WHERE import_id = ?", (import_id,))
+        conn.execute("DELETE FROM import_changes WHERE import_id = ?", (import_id,))
+        conn.execute("DELETE FROM reconciliation_events WHERE import_id = ?", (import_id,))
+        conn.execute("DELETE FROM raw_rows WHERE sheet_id IN (SELECT sheet_id FROM raw_sheets WHERE import_id = ?)", (import_id,))
+        conn.execute("DELETE FROM raw_sheets WHERE import_id = ?", (import_id,))
+        conn.execute("UPDATE imports SET status = 'undone', undone_at = ? WHERE import_id = ?", (_now(), import_id))
+        # The file is no longer imported, so it must not be skipped as unchanged next time, unless
+        # another import of the same content is still in place
+        conn.execute("""
+            DELETE FROM import_manifest WHERE file_sha256 = ? AND filename = ? AND NOT EXISTS (
+                SELECT 1 FROM imports WHERE file_sha256 = ? AND filename = ? AND status = 'imported'
+            )
+        """, (entry["file_sha256"], entry["filename"], entry["file_sha256"], entry["filename"]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    logger.debug("↩️ Undid import %d (%s): %d row(s) deleted, %d restored", import_id, entry["filename"], deleted, restored)
+    return {"deleted": deleted, "restored": restored}
+
+
+def undo_imports(conn: sqlite3.Connection, import_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """Undo several imports, newest first. Stops at the first one that cannot be undone (ValueError)."""
+    return {import_id: undo_import(conn, import_id) for import_id in sorted(set(import_ids), reverse=True)}
+
+
+def undo_job(conn: sqlite3.Connection, job_id: int) -> Dict[int, Dict[str, int]]:
+    """Undo every import still in place that import job `job_id` wrote."""
+    return undo_imports(conn, [entry["import_id"] for entry in list_imports(conn, limit=None, job_id=job_id)
+                               if entry["status"] == "imported"])
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="List recorded imports and undo them.")
+    parser.add_argument("--db", default=podcasts_db.DEFAULT_DB_PATH, help=f"Database to work on (default: {podcasts_db.DEFAULT_DB_PATH})")
+    parser.add_argument("--undo", type=int, nargs="+", metavar="IMPORT_ID", help="Undo these imports, newest first")
+    parser.add_argument("--undo-job", type=int, metavar="JOB_ID", help="Undo every import of this import job")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIST_LIMIT, help="Number of imports to list")
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    configure_logging(level_from_args(args))
+    conn = podcasts_db.connect(args.db)
+    try:
+        if args.undo or args.undo_job is not None:
+            try:
+                undone = undo_job(conn, args.undo_job) if args.undo_job is not None else undo_imports(conn, args.undo)
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            for import_id, counts in undone.items():
+                print(f"Undid import {import_id}: {counts['deleted']} row(s) deleted, {counts['restored']} restored")
+        else:
+            for entry in list_imports(conn, args.limit):
+                print(f"{entry['import_id']:>6}  {entry['status']:<8}  {entry['imported_at'][:19]}  "
+                      f"job {entry['job_id'] if entry['job_id'] is not None else '-':<4}  "
+                      f"+{entry['rows_inserted'] or 0} ~{entry['rows_replaced'] or 0}  {entry['filename']}")
+    finally:
+        conn.close()
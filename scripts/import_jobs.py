@@ -0,0 +1,200 @@
+"""
+Resumable multi-file import jobs.
+
+A job is the list of files of one multi-file import (in write order) plus the options it runs with,
+kept in the `import_jobs` / `import_job_files` tables of the podcasts database. Each file moves from
+'pending' (not available locally yet) to 'downloaded' (a local copy is at `local_path`) to one of
+the finished statuses:
+
+    imported         written
+    previewed        diffed against the database by a dry run, nothing written
+    unchanged        skipped because the same content was already imported
+    failed           unreadable, or the worker parsing it failed
+    download_failed  no local copy could be made
+
+The 'imported' (or 'previewed') checkpoint is written inside the transaction that writes the file's
+rows (see import_files_parallel(job_id=...)), so after a crash or restart a file is either imported
+and marked finished, or neither. Resuming a job imports the files that are not finished, in order.
+
+Jobs themselves are 'queued' until the import worker (scripts/import_worker.py) takes them, then
+'running' until they are 'completed' or 'abandoned'. A 'running' job with no worker alive was
+interrupted and is taken again first. Jobs with the `reset_db` option rebuild the database in a
+shadow copy (podcasts_db.start_shadow_build): the job is checkpointed here, in the live database,
+after each batch, starts over if it is interrupted, and is carried over into the rebuilt database
+just before that replaces the live one. While it runs, the worker keeps the job's latest progress
+event (scripts/import_progress.py) in `progress`, and abandoning it cancels the file in progress.
+"""
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from scripts.import_progress import ImportEvent
+
+FINISHED_STATUSES = ("imported", "previewed", "unchanged", "failed", "download_failed")
+REMAINING_STATUSES = ("pending", "downloaded")
+# The parts of an import's stats kept per file, enough to rebuild the job's summary after a restart
+STATS_FIELDS = ("filename", "file_type", "dry_run", "actual", "sheets", "rows", "unprocessed_sheet_info",
+                "patterns", "timings", "files", "workbook", "import_id")
+
+JOB_COLUMNS = ("job_id", "status", "options", "work_dir", "created_at", "updated_at", "finished_at", "progress")
+FILE_COLUMNS = ("job_id", "filename", "position", "status", "local_path", "stats", "timing", "error", "updated_at")
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def create_job(conn: sqlite3.Connection, filenames: Sequence[str], options: Optional[Dict[str, object]] = None,
+               work_dir: Optional[str] = None, local_paths: Optional[Dict[str, str]] = None) -> int:
+    """
+    Queue a new job for `filenames`, which must already be in write order
+    (batch_import.order_import_files). Files with an entry in `local_paths` start as 'downloaded',
+    the others as 'pending'. Returns the job id.
+    """
+    local_paths = local_paths or {}
+    now = _now()
+    conn.execute("BEGIN")
+    try:
+        cursor = conn.execute(
+            "INSERT INTO import_jobs (status, options, work_dir, created_at, updated_at) VALUES ('queued', ?, ?, ?, ?)",
+            (json.dumps(options or {}), work_dir, now, now)
+        )
+        job_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO import_job_files (job_id, filename, position, status, local_path, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(job_id, name, position, "downloaded" if name in local_paths else "pending", local_paths.get(name), now)
+             for position, name in enumerate(dict.fromkeys(filenames))]
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return job_id
+
+
+def get_job(conn: sqlite3.Connection, job_id: int) -> Optional[Dict[str, object]]:
+    row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM import_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job["options"] = json.loads(job["options"] or "{}")
+    job["progress"] = ImportEvent(**json.loads(job["progress"])) if job["progress"] else None
+    return job
+
+
+def unfinished_jobs(conn: sqlite3.Connection) -> List[Dict[str, object]]:
+    """Queued and running jobs in the order the worker takes them: interrupted ones first, then oldest first."""
+    rows = conn.execute("""
+        SELECT job_id FROM import_jobs WHERE status IN ('queued', 'running')
+        ORDER BY status = 'running' DESC, job_id
+    """).fetchall()
+    return [get_job(conn, row[0]) for row in rows]
+
+
+def next_job(conn: sqlite3.Connection) -> Optional[Dict[str, object]]:
+    jobs = unfinished_jobs(conn)
+    return jobs[0] if jobs else None
+
+
+def mark_running(conn: sqlite3.Connection, job_id: int) -> None:
+    conn.execute("UPDATE import_jobs SET status = 'running', updated_at = ? WHERE job_id = ? AND status IN ('queued', 'running')",
+                 (_now(), job_id))
+
+
+def job_files(conn: sqlite3.Connection, job_id: int, statuses: Optional[Iterable[str]] = None) -> List[Dict[str, object]]:
+    """The job's files in write order, optionally only those with one of `statuses`."""
+    query = f"SELECT {', '.join(FILE_COLUMNS)} FROM import_job_files WHERE job_id = ?"
+    params: List[object] = [job_id]
+    if statuses is not None:
+        statuses = list(statuses)
+        query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+        params += statuses
+    files = [dict(zip(FILE_COLUMNS, row)) for row in conn.execute(query + " ORDER BY position", params)]
+    for entry in files:
+        entry["stats"] = json.loads(entry["stats"]) if entry["stats"] else None
+        entry["timing"] = json.loads(entry["timing"]) if entry["timing"] else None
+    return files
+
+
+def record_progress(conn: sqlite3.Connection, job_id: int, event: ImportEvent) -> None:
+    """Keep `event` as the job's latest progress, for the Admin page to show."""
+    conn.execute("UPDATE import_jobs SET progress = ? WHERE job_id = ?", (json.dumps(event._asdict()), job_id))
+
+
+def status_counts(conn: sqlite3.Connection, job_id: int) -> Dict[str, int]:
+    return dict(conn.execute("SELECT status, COUNT(*) FROM import_job_files WHERE job_id = ? GROUP BY status", (job_id,)))
+
+
+def set_local_path(conn: sqlite3.Connection, job_id: int, filename: str, local_path: str) -> None:
+    """Mark a file 'downloaded' to `local_path` (a file that is not finished yet)."""
+    conn.execute(f"""
+        UPDATE import_job_files SET status = 'downloaded', local_path = ?, updated_at = ?
+        WHERE job_id = ? AND filename = ? AND status IN ({', '.join('?' for _ in REMAINING_STATUSES)})
+    """, (local_path, _now(), job_id, filename, *REMAINING_STATUSES))
+
+
+def checkpoint_file(conn: sqlite3.Connection, job_id: int, filename: str, status: str,
+                    stats: Optional[dict] = None, error: Optional[str] = None) -> None:
+    """
+    Mark a file finished. Call it inside the transaction that writes the file, so the checkpoint
+    commits (or rolls back) with the rows.
+    """
+    if status not in FINISHED_STATUSES:
+        raise ValueError(f"Unknown finished status '{status}'")
+    now = _now()
+    conn.execute("UPDATE import_job_files SET status = ?, stats = ?, error = ?, updated_at = ? WHERE job_id = ? AND filename = ?",
+                 (status, _stats_json(stats), error, now, job_id, filename))
+    conn.execute("UPDATE import_jobs SET updated_at = ? WHERE job_id = ?", (now, job_id))
+
+
+def record_timing(conn: sqlite3.Connection, job_id: int, filename: str, timing: Dict[str, object],
+                  stats: Optional[dict] = None) -> None:
+    """
+    Attach a finished file's batch timing row (batch_import.TIMING_COLUMNS) and its final stats,
+    which include the write and commit timers that were still running at the checkpoint.
+    """
+    conn.execute("UPDATE import_job_files SET timing = ?, stats = COALESCE(?, stats) WHERE job_id = ? AND filename = ?",
+                 (json.dumps(timing, default=str), _stats_json(stats), job_id, filename))
+
+
+def _stats_json(stats: Optional[dict]) -> Optional[str]:
+    if not stats:
+        return None
+    return json.dumps({field: stats[field] for field in STATS_FIELDS if field in stats}, default=str)
+
+
+def reopen_files(conn: sqlite3.Connection, job_id: int) -> None:
+    """Put every finished file of the job back in the queue, for a job that starts over."""
+    conn.execute(f"""
+        UPDATE import_job_files
+        SET status = CASE WHEN local_path IS NULL THEN 'pending' ELSE 'downloaded' END,
+            stats = NULL, timing = NULL, error = NULL, updated_at = ?
+        WHERE job_id = ? AND status IN ({', '.join('?' for _ in FINISHED_STATUSES)})
+    """, (_now(), job_id, *FINISHED_STATUSES))
+
+
+def carry_over_jobs(conn: sqlite3.Connection, source_db_path: str) -> None:
+    """Copy every job of the database at `source_db_path` into the database of `conn` (a rebuilt one)."""
+    conn.execute("ATTACH DATABASE ? AS source", (source_db_path,))
+    try:
+        conn.execute("BEGIN")
+        for table, columns in (("import_jobs", JOB_COLUMNS), ("import_job_files", FILE_COLUMNS)):
+            column_list = ", ".join(columns)
+            conn.execute(f"INSERT OR REPLACE INTO main.{table} ({column_list}) SELECT {column_list} FROM source.{table}")
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DETACH DATABASE source")
+
+
+def finish_job(conn: sqlite3.Connection, job_id: int, status: str = "completed") -> None:
+    """Close a job as 'completed' or 'abandoned'; the worker no longer takes it."""
+    if status not in ("completed", "abandoned"):
+        raise ValueError(f"Unknown job status '{status}'")
+    now = _now()
+    conn.execute("UPDATE import_jobs SET status = ?, updated_at = ?, finished_at = ? WHERE job_id = ? AND status IN ('queued', 'running')",
+                 (status, now, now, job_id))
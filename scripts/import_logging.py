@@ -0,0 +1,82 @@
+"""
+Logging for the import scripts.
+
+Every import module logs to a child of the `scripts` logger (e.g. `scripts.import_data`), so one
+call to configure_logging() sets the verbosity of the whole import path:
+
+    DEBUG    per-row and per-URL detail (URL picked for a row, filename pattern matched, merges)
+    INFO     per-file and per-sheet progress and the import summary (the old default output)
+    WARNING  skipped sheets and unparseable values only
+
+Interactive single-file runs default to INFO; batch runs and the Admin page default to WARNING.
+Messages are written without decoration so INFO output reads like the old print() output.
+"""
+import contextlib
+import io
+import logging
+import sys
+from argparse import ArgumentParser
+from typing import Iterator, Optional
+
+IMPORT_LOGGER_NAME = "scripts"
+
+_handler: Optional[logging.Handler] = None
+
+
+def get_logger(module: str) -> logging.Logger:
+    """Logger for an import module. Named explicitly because the modules also run as __main__."""
+    return logging.getLogger(f"{IMPORT_LOGGER_NAME}.{module}")
+
+
+def configure_logging(level: int = logging.INFO, stream=None) -> None:
+    """Send import logs at `level` and above to `stream` (default stdout). Safe to call repeatedly."""
+    global _handler
+    logger = logging.getLogger(IMPORT_LOGGER_NAME)
+    if _handler is not None:
+        logger.removeHandler(_handler)
+    _handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def current_level() -> int:
+    return logging.getLogger(IMPORT_LOGGER_NAME).getEffectiveLevel()
+
+
+@contextlib.contextmanager
+def capture_logs(level: Optional[int] = None) -> Iterator[io.StringIO]:
+    """
+    Collect import logs (and stray prints) in a buffer instead of emitting them, so worker
+    processes can hand their output back to be printed whole and in order. `level` defaults to
+    the current one; spawned workers pass the parent's level since they start unconfigured.
+    """
+    logger = logging.getLogger(IMPORT_LOGGER_NAME)
+    saved = (logger.handlers[:], logger.level, logger.propagate)
+    buffer = io.StringIO()
+    handler = logging.StreamHandler(buffer)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.handlers = [handler]
+    logger.setLevel(level if level is not None else current_level())
+    logger.propagate = False
+    try:
+        with contextlib.redirect_stdout(buffer):
+            yield buffer
+    finally:
+        logger.handlers = saved[0]
+        logger.setLevel(saved[1])
+        logger.propagate = saved[2]
+
+
+def add_verbosity_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="More output; repeat (-vv) for more. The most verbose level logs every row.")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print warnings and errors.")
+
+
+def level_from_args(args, default: int = logging.INFO) -> int:
+    """Log level for parsed add_verbosity_arguments() flags: each -v is one level below `default`."""
+    if args.quiet:
+        return max(default, logging.WARNING)
+    return max(default - 10 * args.verbose, logging.DEBUG)
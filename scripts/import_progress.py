@@ -0,0 +1,167 @@
+"""
+Progress events and cooperative cancellation for imports.
+
+import_data(), parse_workbook(), write_parsed_workbook() and batch_import.import_files_parallel()
+take an optional `progress` callback, called with an ImportEvent as each file goes through:
+
+    kind               when                                       rows / seconds
+    file_opened        the workbook is open                       - / time to open it
+    sheet_started      a sheet is about to be read                -
+    rows_parsed        every PROGRESS_ROWS rows read              rows read so far / since sheet_started
+    sheet_done         the sheet is read and aggregated           rows read / parse time
+    aggregate_written  the sheet's aggregates are written         aggregate rows / write time
+    file_done          the file's transaction is committed        aggregate rows / write time
+
+Sheets are parsed before anything is written, so a file's aggregate_written events follow all of
+its sheet_done events. Dry runs report the diffed rows as written.
+
+They also take an optional `cancel` CancelToken, checked every PROGRESS_ROWS rows, between sheets
+and between files; a cancelled import raises ImportCancelled. Parsing never touches the database
+and the write phase checks the token once more before committing a file, rolling back instead, so
+a cancelled import leaves every file either fully written or not written at all.
+
+Files and sheets parsed in worker processes report through a WorkerRelay: their events are queued
+back to the calling process, which hands them to `progress` while it waits for the results, and
+the calling process passes a cancellation on to the workers.
+"""
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import IO, Callable, NamedTuple, Optional, Tuple
+
+EVENT_KINDS = ("file_opened", "sheet_started", "rows_parsed", "sheet_done", "aggregate_written", "file_done")
+# Rows between rows_parsed events (and cancellation checks) while a sheet is read
+PROGRESS_ROWS = 10_000
+# How often a process waiting on workers forwards their events and checks for cancellation
+RELAY_POLL_SECONDS = 0.2
+
+
+class ImportEvent(NamedTuple):
+    kind: str
+    filename: str
+    sheet_name: Optional[str] = None
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+ProgressCallback = Callable[[ImportEvent], None]
+
+
+class ImportCancelled(BaseException):
+    """
+    Raised by an import whose CancelToken was cancelled. A BaseException, like KeyboardInterrupt,
+    so the per-sheet and per-file error handling that reports failures as skipped sheets lets it through.
+    """
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag: `cancel()` can be called from any thread, the import stops at
+    its next check. `check` adds an outside condition (e.g. "the import job was abandoned"), polled
+    at most every `check_seconds`. `event` is the underlying flag, a threading.Event by default.
+    """
+
+    def __init__(self, check: Optional[Callable[[], bool]] = None, check_seconds: float = 1.0, event=None):
+        self._event = event if event is not None else threading.Event()
+        self._check = check
+        self._check_seconds = check_seconds
+        self._next_check = 0.0
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self._check is not None and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self._check_seconds
+            if self._check():
+                self._event.set()
+                return True
+        return False
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise ImportCancelled("Import cancelled")
+
+
+def emit(progress: Optional[ProgressCallback], kind: str, filename: str, sheet_name: Optional[str] = None,
+         rows: int = 0, seconds: float = 0.0) -> None:
+    if progress is not None:
+        progress(ImportEvent(kind, filename, sheet_name, rows, round(seconds, 3)))
+
+
+class WorkerRelay:
+    """
+    Carries events and cancellation across a spawn process pool. Pass `worker_args()` to the
+    worker, which turns them back into (progress, cancel) with worker_hooks(), and wait for its
+    futures with `result()` instead of `future.result()`. `close()` after the pool has shut down.
+    """
+
+    def __init__(self, progress: Optional[ProgressCallback], cancel: Optional[CancelToken]):
+        self.progress = progress
+        self.cancel = cancel
+        self._manager = multiprocessing.get_context("spawn").Manager()
+        self._events = self._manager.Queue() if progress is not None else None
+        self._cancelled = self._manager.Event() if cancel is not None else None
+
+    def worker_args(self) -> Tuple[object, object]:
+        return self._events, self._cancelled
+
+    def pump(self) -> None:
+        """Hand the queued worker events to `progress` and pass a cancellation on to the workers."""
+        if self._events is not None:
+            while True:
+                try:
+                    event = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                self.progress(event)
+        if self.cancel is not None and self.cancel.cancelled:
+            self._cancelled.set()
+
+    def result(self, future: Future):
+        """future.result(), forwarding events while it waits; raises ImportCancelled once cancelled."""
+        while True:
+            self.pump()
+            if self.cancel is not None:
+                self.cancel.raise_if_cancelled()
+            try:
+                result = future.result(timeout=RELAY_POLL_SECONDS)
+            except TimeoutError:
+                continue
+            self.pump()
+            return result
+
+    def close(self) -> None:
+        try:
+            self.pump()
+        finally:
+            self._manager.shutdown()
+
+
+def worker_hooks(events, cancelled) -> Tuple[Optional[ProgressCallback], Optional[CancelToken]]:
+    """The (progress, cancel) pair for a worker process from WorkerRelay.worker_args()."""
+    return (events.put if events is not None else None,
+            CancelToken(event=cancelled) if cancelled is not None else None)
+
+
+def print_progress(event: ImportEvent, stream: IO = None) -> None:
+    """A `progress` callback for the command line: one line per event on stderr."""
+    stream = stream or sys.stderr
+    where = f"{event.filename} [{event.sheet_name}]" if event.sheet_name else event.filename
+    if event.kind in ("rows_parsed", "sheet_done", "aggregate_written", "file_done"):
+        detail = f": {event.rows:,} rows in {event.seconds:.2f}s ({event.rows_per_sec:,.0f} rows/s)"
+    elif event.kind == "file_opened":
+        detail = f" in {event.seconds:.2f}s"
+    else:
+        detail = ""
+    print(f"{event.kind:>17} {where}{detail}", file=stream, flush=True)
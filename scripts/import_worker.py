@@ -0,0 +1,360 @@
+"""
+Background import worker.
+
+Runs import jobs (scripts/import_jobs.py) outside the Streamlit script run. The Admin page queues a
+job and starts the worker; the worker imports the job's files in chunks of `batch_files`,
+checkpointing every file, while the page only polls the job tables for progress. The latest
+progress event of the running job is kept in its `progress` column, at most every
+PROGRESS_SECONDS, and abandoning the job cancels the file being imported (rolled back, not half
+written) within CANCEL_CHECK_SECONDS.
+
+At most one worker runs per database: it holds an exclusive lock on `import_worker.lock` next to the
+database for as long as it runs. Jobs are taken in import_jobs.unfinished_jobs() order (an
+interrupted job before any queued one) and the worker exits once the queue has been empty for
+`idle_seconds`. Workbooks of jobs queued from the Admin page are downloaded from the job's
+`bucket_url` into its `work_dir`; dry-run diffs are kept there until the page has shown them.
+
+    python scripts/import_worker.py [--db data/podcasts.db] [--idle-seconds 30] [-v]
+"""
+import contextlib
+import fcntl
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from typing import IO, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from scripts import import_jobs, podcasts_db
+from scripts.batch_import import TIMING_COLUMNS, import_files_parallel
+from scripts.import_progress import CancelToken, ImportCancelled, ImportEvent, ProgressCallback
+from scripts.import_logging import add_verbosity_arguments, configure_logging, get_logger, level_from_args
+
+logger = get_logger("import_worker")
+
+LOCK_FILENAME = "import_worker.lock"
+LOG_FILENAME = "import_worker.log"
+DEFAULT_BATCH_FILES = 25
+DEFAULT_IDLE_SECONDS = 30.0
+POLL_SECONDS = 2.0
+# A worker started while the previous one is exiting waits this long for its lock
+LOCK_WAIT_SECONDS = 5.0
+# Job options passed on to import_files_parallel()
+IMPORT_OPTIONS = ('workers', 'sheet_workers', 'dry_run', 'engine', 'force', 'use_cache')
+DRY_RUN_DIFF_DIR = "dry_run_diffs"
+PROGRESS_SECONDS = 1.0
+CANCEL_CHECK_SECONDS = 1.0
+
+
+def lock_path(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), LOCK_FILENAME)
+
+
+def acquire_lock(db_path: str, wait_seconds: float = 0.0) -> Optional[IO]:
+    """
+    The worker lock for `db_path` as an open file (closing it releases the lock), or None if
+    another process still holds it after `wait_seconds`.
+    """
+    lock_file = open(lock_path(db_path), "a")
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                lock_file.close()
+                return None
+            time.sleep(0.1)
+
+
+def worker_running(db_path: str) -> bool:
+    lock_file = acquire_lock(db_path)
+    if lock_file is None:
+        return True
+    lock_file.close()
+    return False
+
+
+def start_worker(db_path: str, idle_seconds: float = DEFAULT_IDLE_SECONDS) -> bool:
+    """
+    Start a detached worker for `db_path` unless one is running; returns whether one was started.
+    Its output goes to import_worker.log next to the database.
+    """
+    if worker_running(db_path):
+        return False
+    db_path = os.path.abspath(db_path)
+    with open(os.path.join(os.path.dirname(db_path), LOG_FILENAME), "a") as log_file:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--db", db_path, "--idle-seconds", str(idle_seconds)],
+            stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT, cwd=_project_root,
+            start_new_session=True  # Outlives the Streamlit session (and server) that started it
+        )
+    return True
+
+
+def download_files(bucket_url: str, gcs_filenames: Sequence[str], work_dir: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Copy files from the bucket into `work_dir` with one `gsutil -m cp`.
+    Returns ({gcs filename: local path}, [filenames that could not be downloaded]).
+    """
+    env = os.environ.copy()
+    env["CLOUDSDK_PYTHON"] = "python3.11"
+    cmd = ["gsutil", "-m", "cp"] + [f"{bucket_url}/{filename}" for filename in gcs_filenames] + [work_dir]
+    try:
+        # -m can succeed for some files and fail for others, so the files on disk are what counts
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False, env=env)
+        if result.returncode != 0 or "Some files failed" in result.stderr:
+            logger.warning("gsutil reported some issues during batch download. Stderr: %s", result.stderr[:500])
+    except FileNotFoundError:
+        logger.error("gsutil command not found. Please ensure Google Cloud SDK is installed and in PATH.")
+        return {}, list(gcs_filenames)
+
+    downloaded = {}
+    for filename in gcs_filenames:
+        local_path = os.path.join(work_dir, filename)
+        if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
+            downloaded[filename] = local_path
+    return downloaded, [filename for filename in gcs_filenames if filename not in downloaded]
+
+
+def fetch_job_files(conn, job: dict) -> List[str]:
+    """
+    Make sure every unfinished file of the job has a local copy: download the ones that have none
+    (all of them for a new Admin job, the lost ones after a restart). Files that cannot be fetched
+    are marked 'download_failed'; returns their names.
+    """
+    missing = [entry['filename'] for entry in import_jobs.job_files(conn, job['job_id'], statuses=import_jobs.REMAINING_STATUSES)
+               if not (entry['local_path'] and os.path.exists(entry['local_path']) and os.path.getsize(entry['local_path']) > 0)]
+    if not missing:
+        return []
+    bucket_url = job['options'].get('bucket_url')
+    if bucket_url and job['work_dir']:
+        os.makedirs(job['work_dir'], exist_ok=True)
+        downloaded, failed = download_files(bucket_url, missing, job['work_dir'])
+        for filename, local_path in downloaded.items():
+            import_jobs.set_local_path(conn, job['job_id'], filename, local_path)
+        error = "Could not be downloaded from GCS"
+    else:
+        failed, error = missing, "Local file not found"
+    for filename in failed:
+        import_jobs.checkpoint_file(conn, job['job_id'], filename, 'download_failed', error=error)
+    if failed:
+        logger.warning("Import job %d: %d file(s) could not be fetched and are skipped: %s",
+                       job['job_id'], len(failed), ", ".join(failed))
+    return failed
+
+
+def _save_dry_run_diffs(job: dict, file_stats: Sequence[dict]) -> None:
+    if not job['work_dir']:
+        return
+    diff_dir = os.path.join(job['work_dir'], DRY_RUN_DIFF_DIR)
+    os.makedirs(diff_dir, exist_ok=True)
+    for stats in file_stats:
+        diff = stats.get('dry_run_diff')
+        if diff is not None and not diff.empty:
+            diff.to_parquet(os.path.join(diff_dir, f"{len(os.listdir(diff_dir)):05d}.parquet"), index=False)
+
+
+def load_dry_run_diff(job: dict) -> pd.DataFrame:
+    """The row-level diff of a dry-run job, in write order (empty if it found nothing to write)."""
+    diff_dir = os.path.join(job['work_dir'] or "", DRY_RUN_DIFF_DIR)
+    if not job['work_dir'] or not os.path.isdir(diff_dir):
+        return pd.DataFrame()
+    parts = [pd.read_parquet(os.path.join(diff_dir, name)) for name in sorted(os.listdir(diff_dir))]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def _clean_work_dir(conn, job: dict) -> None:
+    """Remove the job's downloads once it is over; dry-run diffs stay until the Admin page has shown them."""
+    if not job['work_dir'] or not os.path.isdir(job['work_dir']):
+        return
+    if job['options'].get('dry_run') and import_jobs.get_job(conn, job['job_id'])['status'] == 'completed':
+        for entry in import_jobs.job_files(conn, job['job_id']):
+            if entry['local_path'] and os.path.exists(entry['local_path']):
+                os.remove(entry['local_path'])
+    else:
+        shutil.rmtree(job['work_dir'], ignore_errors=True)
+
+
+class JobProgress:
+    """
+    `progress` callback that records a job's latest event (import_jobs.record_progress), at most
+    every PROGRESS_SECONDS, and passes every event on to `forward`. It writes through its own
+    connection without waiting for locks: while the import holds the database the update is
+    dropped and a later event records it instead.
+    """
+
+    def __init__(self, db_path: str, job_id: int, forward: Optional[ProgressCallback] = None):
+        self.job_id = job_id
+        self.forward = forward
+        self.conn = sqlite3.connect(db_path, timeout=0, isolation_level=None)
+        self.recorded_at = 0.0
+
+    def __call__(self, event: ImportEvent) -> None:
+        if self.forward is not None:
+            self.forward(event)
+        if time.monotonic() - self.recorded_at < PROGRESS_SECONDS and event.kind != "file_done":
+            return
+        try:
+            import_jobs.record_progress(self.conn, self.job_id, event)
+            self.recorded_at = time.monotonic()
+        except sqlite3.OperationalError:
+            pass
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _checkpoint_rebuilt_files(conn, job_id: int, batch: Sequence[dict], result: Dict[str, object]) -> None:
+    """Checkpoint a batch written into a shadow database, which does not hold the job, once it is written."""
+    # import_files_parallel() returns the files in write order, which is the job's order
+    for entry, stats, timing in zip(batch, result['files'], result['timings'].to_dict('records')):
+        import_jobs.checkpoint_file(conn, job_id, entry['filename'], timing['status'], stats, error=timing['error'])
+        import_jobs.record_timing(conn, job_id, entry['filename'], timing, stats)
+
+
+def _publish_rebuild(conn, db_path: str, job_id: int) -> bool:
+    """
+    Finish a rebuild job: carry the job tables over into the shadow database, mark the job
+    completed there and swap it in. Returns False (and abandons the job) if the rebuilt database
+    fails its integrity check.
+    """
+    with contextlib.closing(podcasts_db.connect(podcasts_db.shadow_path(db_path))) as shadow_conn:
+        import_jobs.carry_over_jobs(shadow_conn, db_path)
+        import_jobs.finish_job(shadow_conn, job_id)
+    try:
+        podcasts_db.publish_shadow_build(db_path)
+    except sqlite3.DatabaseError as e:
+        logger.error("Import job %d: the rebuilt database was not swapped in: %s", job_id, e)
+        import_jobs.finish_job(conn, job_id, status="abandoned")
+        return False
+    logger.info("Import job %d: rebuilt database swapped in for %s", job_id, db_path)
+    return True
+
+
+def run_job(db_path: str, job_id: int, batch_files: int = DEFAULT_BATCH_FILES,
+            progress: Optional[ProgressCallback] = None) -> Dict[str, object]:
+    """
+    Import the unfinished files of a job, `batch_files` at a time, and mark it completed. If the
+    job is abandoned meanwhile, the file being imported is cancelled (rolled back) and the job
+    stops. The caller must hold the worker lock. `progress` receives the import's events too.
+    Returns {'files': [per-file stats], 'timings': DataFrame} for the files imported by this call.
+
+    Jobs with the `reset_db` option (outside dry runs) rebuild the database: their files are
+    written into a shadow database that replaces `db_path` when the job completes, so the live
+    data stays readable throughout. The shadow is discarded if the job stops before that, and an
+    interrupted rebuild starts over from its first file.
+    """
+    results = []
+    timings = []
+    published = False
+    with contextlib.closing(podcasts_db.connect(db_path)) as conn, \
+            contextlib.closing(JobProgress(db_path, job_id, progress)) as job_progress:
+        cancel = CancelToken(check=lambda: import_jobs.get_job(conn, job_id)['status'] != 'running',
+                             check_seconds=CANCEL_CHECK_SECONDS)
+        import_jobs.mark_running(conn, job_id)
+        job = import_jobs.get_job(conn, job_id)
+        import_options = {option: job['options'][option] for option in IMPORT_OPTIONS if option in job['options']}
+        rebuild = bool(job['options'].get('reset_db')) and not job['options'].get('dry_run')
+        target_db = db_path
+        if rebuild:
+            import_jobs.reopen_files(conn, job_id)
+            target_db = podcasts_db.start_shadow_build(db_path)
+        fetch_job_files(conn, job)
+        while True:
+            status = import_jobs.get_job(conn, job_id)['status']
+            if status != 'running':
+                logger.warning("Import job %d was %s; stopping", job_id, status)
+                break
+            batch = import_jobs.job_files(conn, job_id, statuses=import_jobs.REMAINING_STATUSES)[:batch_files]
+            if not batch:
+                if rebuild:
+                    published = _publish_rebuild(conn, db_path, job_id)
+                else:
+                    import_jobs.finish_job(conn, job_id)
+                break
+            logger.info("Import job %d: importing %d file(s) from %s", job_id, len(batch), batch[0]['filename'])
+            try:
+                result = import_files_parallel(
+                    [entry['local_path'] for entry in batch],
+                    original_filenames=[entry['filename'] for entry in batch],
+                    db_path=target_db, job_id=None if rebuild else job_id, progress=job_progress, cancel=cancel,
+                    **import_options
+                )
+            except ImportCancelled:
+                logger.warning("Import job %d was cancelled; the file in progress was rolled back", job_id)
+                break
+            except Exception as e:
+                logger.exception("Import job %d: batch starting at %s failed: %s", job_id, batch[0]['filename'], e)
+                # Files the batch did not get to commit are skipped rather than retried forever
+                batch_filenames = {entry['filename'] for entry in batch}
+                for entry in import_jobs.job_files(conn, job_id, statuses=import_jobs.REMAINING_STATUSES):
+                    if entry['filename'] in batch_filenames:
+                        import_jobs.checkpoint_file(conn, job_id, entry['filename'], 'failed', error=str(e))
+                continue
+            if rebuild:
+                _checkpoint_rebuilt_files(conn, job_id, batch, result)
+            if import_options.get('dry_run'):
+                _save_dry_run_diffs(job, result['files'])
+            results.extend(result['files'])
+            timings.append(result['timings'])
+        if rebuild and not published:
+            podcasts_db.discard_shadow_build(db_path)
+        _clean_work_dir(conn, job)
+    return {'files': results,
+            'timings': pd.concat(timings, ignore_index=True) if timings else pd.DataFrame(columns=TIMING_COLUMNS)}
+
+
+def run_worker(db_path: str = podcasts_db.DEFAULT_DB_PATH, idle_seconds: float = DEFAULT_IDLE_SECONDS,
+               batch_files: int = DEFAULT_BATCH_FILES) -> int:
+    """
+    Take and run jobs until the queue has been empty for `idle_seconds`. Returns the number of jobs
+    run, or 0 straight away if another worker holds the lock.
+    """
+    lock_file = acquire_lock(db_path, wait_seconds=LOCK_WAIT_SECONDS)
+    if lock_file is None:
+        logger.info("Another import worker is running for %s", db_path)
+        return 0
+    jobs_run = 0
+    try:
+        idle_since = time.monotonic()
+        while True:
+            with contextlib.closing(podcasts_db.connect(db_path)) as conn:
+                job = import_jobs.next_job(conn)
+            if job:
+                started = time.perf_counter()
+                logger.info("Starting import job %d", job['job_id'])
+                result = run_job(db_path, job['job_id'], batch_files)
+                logger.info("Import job %d: %d file(s) %s in %.1fs", job['job_id'], len(result['files']),
+                            "previewed" if job['options'].get('dry_run') else "imported", time.perf_counter() - started)
+                jobs_run += 1
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= idle_seconds:
+                return jobs_run
+            else:
+                time.sleep(POLL_SECONDS)
+    finally:
+        lock_file.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Run queued podcast import jobs in the background.")
+    parser.add_argument("--db", default=podcasts_db.DEFAULT_DB_PATH, help=f"Database holding the jobs (default: {podcasts_db.DEFAULT_DB_PATH})")
+    parser.add_argument("--idle-seconds", type=float, default=DEFAULT_IDLE_SECONDS, help="Exit after the queue has been empty this long")
+    parser.add_argument("--batch-files", type=int, default=DEFAULT_BATCH_FILES, help="Files handed to the import at a time")
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    # The worker's output is its log (import_worker.log when started from the Admin page)
+    configure_logging(level_from_args(args, default=logging.INFO))
+    run_worker(args.db, idle_seconds=args.idle_seconds, batch_files=args.batch_files)
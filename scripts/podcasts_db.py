@@ -0,0 +1,733 @@
+"""
+SQLite helpers for the podcasts database used by the import scripts.
+
+`podcasts` is a view over a narrow `downloads` fact table (metrics per episode and period) and
+its `episodes` and `download_sources` dimensions, which hold the URL/title/code/feature/created_at
+and the consumed_at/imported_at/source file strings once instead of on every row. Older databases
+with a `podcasts` table are migrated when first opened.
+
+The schema is versioned: PRAGMA user_version is the last of the numbered MIGRATIONS applied.
+connect() applies the missing ones, each in its own transaction, so the import scripts and the
+app (migrate_database() at startup) always see the current schema.
+
+Aggregated rows are written set-based: a sheet's aggregates are loaded into a TEMP staging
+table with one `executemany`, the insert/replace/ignore counts are computed with joins against
+`podcasts`, and the rows are applied with a few `INSERT ... SELECT`s (write_rows). Dry runs diff
+the same staging table against `podcasts` instead of applying it.
+
+`import_manifest` records which workbook contents (by SHA-256) and sheets were imported under
+which parsing rules, so re-imports can skip files that have not changed. `import_jobs` and
+`import_job_files` track multi-file imports file by file so they can be resumed (scripts/import_jobs.py).
+
+Every write is an import with its own `import_id` (`imports`, scripts/import_history.py). The
+rows it writes carry that id in `podcasts.import_id`, and `import_changes` records, per key it
+touched, whether the row was new or the values it replaced. Undoing an import deletes or restores
+exactly those rows, so the cost scales with the rows it touched, not with the database.
+
+The rows of every imported sheet are also kept before aggregation, in `raw_rows`: integer URL
+ids into the `raw_urls` dictionary (which holds each URL's parsed metadata and grouping key once),
+the row's metrics and its sheet (`raw_sheets`, one per sheet of an import). `podcasts` can be
+derived again from them entirely in SQL (scripts/raw_rows.py).
+
+Grouping keys use the canonical form of a title: `title_aliases` maps each normalized title seen
+within a (code, feature) block to the title of the episode it was resolved to (scripts/title_resolution.py).
+`reconciliation_events` records, per import, the keys whose rows merged several URL variants
+(scripts/reconciliation.py).
+
+Rebuilds from scratch (--reset-db) write a shadow database next to the live one
+(`podcasts.db.building`) and swap it in with one rename once it is complete and checked, so
+readers keep seeing the old data until then instead of an empty or partial table.
+"""
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from scripts.import_logging import get_logger
+
+logger = get_logger("podcasts_db")
+
+DEFAULT_DB_PATH = "data/podcasts.db"
+SHADOW_SUFFIX = ".building"
+# How long the swap waits for readers of the live database to finish their queries
+SWAP_TIMEOUT_SECONDS = 30.0
+
+PODCASTS_COLUMNS = (
+    "url", "title", "code", "feature", "full", "partial", "avg_bw", "total_bw", "eq_full",
+    "created_at", "consumed_at", "consumed_year", "consumed_month", "assumed_month", "imported_at", "source_file_path"
+)
+KEY_COLUMNS = ("url", "consumed_year", "consumed_month")
+
+# `podcasts` as a table, up to schema version 1
+LEGACY_PODCASTS_DDL = """
+CREATE TABLE IF NOT EXISTS podcasts (
+    url TEXT NOT NULL,
+    title TEXT,
+    code TEXT,
+    feature TEXT,
+    full INTEGER,
+    partial INTEGER,
+    avg_bw REAL,
+    total_bw REAL,
+    eq_full INTEGER,
+    created_at TEXT,
+    consumed_at TEXT,
+    consumed_year INTEGER NOT NULL,
+    consumed_month INTEGER NOT NULL,
+    assumed_month INTEGER NOT NULL DEFAULT 0,
+    imported_at TEXT,
+    source_file_path TEXT,
+    import_id INTEGER,
+    PRIMARY KEY (url, consumed_year, consumed_month)
+)
+"""
+
+EPISODE_COLUMNS = ("url", "title", "code", "feature", "created_at")
+SOURCE_COLUMNS = ("consumed_at", "assumed_month", "imported_at", "source_file_path")
+DOWNLOAD_METRICS = ("full", "partial", "avg_bw", "total_bw", "eq_full")
+
+# `podcasts` rows are stored normalized: each distinct (url, title, code, feature, created_at) is
+# an episode, each distinct (consumed_at, assumed_month, imported_at, source_file_path) a source
+# (one per sheet written), and `downloads` holds the metrics per (episode, period) with integer
+# references to both. A URL has one row per period, whichever episode it is (write_rows keeps it
+# so); an episode of the same URL with other metadata only differs by what the key's first row said.
+EPISODES_DDL = """
+CREATE TABLE IF NOT EXISTS episodes (
+    episode_id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT,
+    code TEXT,
+    feature TEXT,
+    created_at TEXT
+)
+"""
+EPISODES_INDEX_DDL = "CREATE INDEX IF NOT EXISTS episodes_url ON episodes (url)"
+DOWNLOAD_SOURCES_DDL = """
+CREATE TABLE IF NOT EXISTS download_sources (
+    source_id INTEGER PRIMARY KEY,
+    consumed_at TEXT,
+    assumed_month INTEGER NOT NULL DEFAULT 0,
+    imported_at TEXT,
+    source_file_path TEXT
+)
+"""
+DOWNLOAD_SOURCES_INDEX_DDL = "CREATE INDEX IF NOT EXISTS download_sources_imported ON download_sources (imported_at)"
+DOWNLOADS_DDL = """
+CREATE TABLE IF NOT EXISTS downloads (
+    episode_id INTEGER NOT NULL REFERENCES episodes (episode_id),
+    consumed_year INTEGER NOT NULL,
+    consumed_month INTEGER NOT NULL,
+    full INTEGER,
+    partial INTEGER,
+    avg_bw REAL,
+    total_bw REAL,
+    eq_full INTEGER,
+    source_id INTEGER NOT NULL REFERENCES download_sources (source_id),
+    import_id INTEGER,
+    PRIMARY KEY (episode_id, consumed_year, consumed_month)
+) WITHOUT ROWID
+"""
+# The rows as they were stored before, for readers (the app, the changesets, dry-run diffs)
+PODCASTS_VIEW_DDL = """
+CREATE VIEW IF NOT EXISTS podcasts AS
+SELECT e.url, e.title, e.code, e.feature, d.full, d.partial, d.avg_bw, d.total_bw, d.eq_full, e.created_at,
+       s.consumed_at, d.consumed_year, d.consumed_month, s.assumed_month, s.imported_at, s.source_file_path, d.import_id
+FROM downloads d
+JOIN episodes e ON e.episode_id = d.episode_id
+JOIN download_sources s ON s.source_id = d.source_id
+"""
+
+# `seq` keeps the staging order so duplicate keys resolve exactly like row-by-row writes did
+STAGING_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS podcasts_staging (
+    seq INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT,
+    code TEXT,
+    feature TEXT,
+    full INTEGER,
+    partial INTEGER,
+    avg_bw REAL,
+    total_bw REAL,
+    eq_full INTEGER,
+    created_at TEXT,
+    consumed_at TEXT,
+    consumed_year INTEGER NOT NULL,
+    consumed_month INTEGER NOT NULL,
+    assumed_month INTEGER NOT NULL DEFAULT 0,
+    imported_at TEXT,
+    source_file_path TEXT
+)
+"""
+
+# One row per (workbook content, sheet) that was imported, so unchanged files can be skipped. The
+# filename is part of the key because monthly files take their consumption month from it.
+IMPORT_MANIFEST_DDL = """
+CREATE TABLE IF NOT EXISTS import_manifest (
+    file_sha256 TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    filename TEXT,
+    file_type TEXT,
+    rules_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rows_scanned INTEGER,
+    rows_merged INTEGER,
+    rows_errors INTEGER,
+    rows_written INTEGER,
+    parse_seconds REAL,
+    write_seconds REAL,
+    imported_at TEXT,
+    PRIMARY KEY (file_sha256, filename, sheet_name)
+)
+"""
+MANIFEST_COLUMNS = (
+    "file_sha256", "sheet_name", "filename", "file_type", "rules_version", "status", "rows_scanned",
+    "rows_merged", "rows_errors", "rows_written", "parse_seconds", "write_seconds", "imported_at"
+)
+
+# One row per import (a file written into `podcasts`); status is 'imported' or 'undone'
+IMPORTS_DDL = """
+CREATE TABLE IF NOT EXISTS imports (
+    import_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT,
+    file_sha256 TEXT,
+    file_type TEXT,
+    job_id INTEGER,
+    status TEXT NOT NULL,
+    rows_inserted INTEGER,
+    rows_replaced INTEGER,
+    imported_at TEXT,
+    undone_at TEXT
+)
+"""
+# The changeset of an import: one row per key it wrote. `replaced` = 0 means the import inserted
+# the row; otherwise the prior_* columns hold the values it overwrote (including the import that
+# wrote them). Report files never overwrite, so their changesets are keys only.
+IMPORT_CHANGES_DDL = """
+CREATE TABLE IF NOT EXISTS import_changes (
+    import_id INTEGER NOT NULL REFERENCES imports (import_id),
+    url TEXT NOT NULL,
+    consumed_year INTEGER NOT NULL,
+    consumed_month INTEGER NOT NULL,
+    replaced INTEGER NOT NULL,
+    prior_title TEXT,
+    prior_code TEXT,
+    prior_feature TEXT,
+    prior_full INTEGER,
+    prior_partial INTEGER,
+    prior_avg_bw REAL,
+    prior_total_bw REAL,
+    prior_eq_full INTEGER,
+    prior_created_at TEXT,
+    prior_consumed_at TEXT,
+    prior_assumed_month INTEGER,
+    prior_imported_at TEXT,
+    prior_source_file_path TEXT,
+    prior_import_id INTEGER,
+    PRIMARY KEY (import_id, url, consumed_year, consumed_month)
+) WITHOUT ROWID
+"""
+# Everything but the key is restored from the prior_* columns
+PRIOR_COLUMNS = tuple(col for col in PODCASTS_COLUMNS if col not in KEY_COLUMNS) + ("import_id",)
+
+# Raw rows before aggregation. A URL's metadata and grouping key (group_*; NULL when the URL could
+# not be parsed) are those of the rules it was last imported under.
+RAW_URLS_DDL = """
+CREATE TABLE IF NOT EXISTS raw_urls (
+    url_id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    code TEXT,
+    feature TEXT,
+    title TEXT,
+    created_at TEXT,
+    group_code TEXT,
+    group_feature TEXT,
+    group_title TEXT,
+    rules_version TEXT
+)
+"""
+RAW_URL_FIELDS = ("code", "feature", "title", "created_at", "group_code", "group_feature", "group_title")
+RAW_SHEETS_DDL = """
+CREATE TABLE IF NOT EXISTS raw_sheets (
+    sheet_id INTEGER PRIMARY KEY,
+    import_id INTEGER NOT NULL REFERENCES imports (import_id),
+    sheet_name TEXT,
+    consumed_at TEXT,
+    consumed_year INTEGER NOT NULL,
+    consumed_month INTEGER NOT NULL,
+    assumed_month INTEGER NOT NULL,
+    imported_at TEXT,
+    row_count INTEGER
+)
+"""
+RAW_SHEETS_INDEX_DDL = "CREATE INDEX IF NOT EXISTS raw_sheets_import ON raw_sheets (import_id)"
+# `row_no` is the row's position among the sheet's rows with a URL, which decides first-seen order
+RAW_ROWS_DDL = """
+CREATE TABLE IF NOT EXISTS raw_rows (
+    sheet_id INTEGER NOT NULL REFERENCES raw_sheets (sheet_id),
+    row_no INTEGER NOT NULL,
+    url_id INTEGER NOT NULL REFERENCES raw_urls (url_id),
+    full INTEGER,
+    partial INTEGER,
+    total_bw REAL,
+    PRIMARY KEY (sheet_id, row_no)
+) WITHOUT ROWID
+"""
+
+# Normalized title -> canonical title of its episode, per grouping block. A canonical title maps to
+# itself (similarity 1) and holds the episode's display title; aliases are added as titles are
+# first seen and never rewritten.
+TITLE_ALIASES_DDL = """
+CREATE TABLE IF NOT EXISTS title_aliases (
+    alias_id INTEGER PRIMARY KEY,
+    group_code TEXT NOT NULL,
+    group_feature TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    title TEXT,
+    import_id INTEGER,
+    created_at TEXT,
+    UNIQUE (group_code, group_feature, alias)
+)
+"""
+
+# Grouping keys of a sheet that merged more than one distinct URL (scripts/reconciliation.py): the
+# first variant titles and URLs as JSON arrays, their total, and the URL and title the row got.
+RECONCILIATION_EVENTS_DDL = """
+CREATE TABLE IF NOT EXISTS reconciliation_events (
+    event_id INTEGER PRIMARY KEY,
+    import_id INTEGER NOT NULL REFERENCES imports (import_id),
+    sheet_name TEXT,
+    group_code TEXT NOT NULL,
+    group_feature TEXT NOT NULL,
+    group_title TEXT NOT NULL,
+    consumed_year INTEGER NOT NULL,
+    consumed_month INTEGER NOT NULL,
+    variant_count INTEGER NOT NULL,
+    variant_titles TEXT NOT NULL,
+    variant_urls TEXT NOT NULL,
+    canonical_title TEXT,
+    canonical_url TEXT
+)
+"""
+RECONCILIATION_EVENTS_INDEX_DDL = "CREATE INDEX IF NOT EXISTS reconciliation_events_import ON reconciliation_events (import_id)"
+
+# A multi-file import and the status of each of its files. A file's status is updated in the same
+# transaction that writes its rows, so a resumed job never imports a file twice or skips one.
+IMPORT_JOBS_DDL = """
+CREATE TABLE IF NOT EXISTS import_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    options TEXT,
+    work_dir TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    finished_at TEXT,
+    progress TEXT
+)
+"""
+IMPORT_JOB_FILES_DDL = """
+CREATE TABLE IF NOT EXISTS import_job_files (
+    job_id INTEGER NOT NULL REFERENCES import_jobs (job_id),
+    filename TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    local_path TEXT,
+    stats TEXT,
+    timing TEXT,
+    error TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (job_id, filename)
+)
+"""
+
+_COLUMN_LIST = ", ".join(PODCASTS_COLUMNS)
+_KEY_MATCH = " AND ".join(f"p.{col} = s.{col}" for col in KEY_COLUMNS)
+
+
+def connect(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """
+    Open the database in autocommit mode, with its schema brought up to date (migrate); callers
+    group their writes with explicit BEGIN/COMMIT (and SAVEPOINTs) instead of relying on implicit
+    transactions.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    migrate(conn)
+    return conn
+
+
+def _migration_1_base_schema(conn: sqlite3.Connection) -> None:
+    # Everything up to raw rows, title aliases and reconciliation events, with `podcasts` as a table.
+    # Databases from before versioning have some of it already, so every step checks first.
+    for ddl in (LEGACY_PODCASTS_DDL, IMPORT_MANIFEST_DDL, IMPORT_JOBS_DDL, IMPORT_JOB_FILES_DDL, IMPORTS_DDL,
+                IMPORT_CHANGES_DDL, RAW_URLS_DDL, RAW_SHEETS_DDL, RAW_SHEETS_INDEX_DDL, RAW_ROWS_DDL,
+                TITLE_ALIASES_DDL, RECONCILIATION_EVENTS_DDL, RECONCILIATION_EVENTS_INDEX_DDL):
+        conn.execute(ddl)
+    # podcasts tables created before rows were tagged with their import
+    if conn.execute("SELECT type FROM sqlite_master WHERE name = 'podcasts'").fetchone() == ("table",) \
+            and "import_id" not in {row[1] for row in conn.execute("PRAGMA table_info(podcasts)")}:
+        conn.execute("ALTER TABLE podcasts ADD COLUMN import_id INTEGER")
+    # import_jobs tables created before jobs reported their progress
+    if "progress" not in {row[1] for row in conn.execute("PRAGMA table_info(import_jobs)")}:
+        conn.execute("ALTER TABLE import_jobs ADD COLUMN progress TEXT")
+
+
+def _migration_2_episodes_downloads(conn: sqlite3.Connection) -> None:
+    # Move the rows of the `podcasts` table into episodes/downloads and put the view in its place
+    for ddl in (EPISODES_DDL, EPISODES_INDEX_DDL, DOWNLOAD_SOURCES_DDL, DOWNLOAD_SOURCES_INDEX_DDL, DOWNLOADS_DDL):
+        conn.execute(ddl)
+    if conn.execute("SELECT type FROM sqlite_master WHERE name = 'podcasts'").fetchone() == ("table",):
+        write_rows(conn, f"SELECT {_COLUMN_LIST}, import_id FROM podcasts ORDER BY rowid", (), "replace")
+        conn.execute("DROP TABLE podcasts")
+    conn.execute(PODCASTS_VIEW_DDL)
+
+
+# Schema migrations in order: (version, description, migration, vacuum afterwards). A migration is
+# never changed once released; schema changes go into a new one. PRAGMA user_version holds the
+# version of the last one applied.
+MIGRATIONS = (
+    (1, "base schema", _migration_1_base_schema, False),
+    (2, "podcasts as episodes, download sources and downloads", _migration_2_episodes_downloads, True),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, vacuum: bool = True) -> List[Dict[str, object]]:
+    """
+    Apply the migrations the database has not had yet, each in its own transaction that also
+    stamps its version, so a failed migration leaves the database at the previous version. With
+    `vacuum`, the file is vacuumed afterwards if a migration freed space. Returns one
+    {'version', 'description', 'seconds'} per migration applied; an up-to-date database costs one
+    PRAGMA. Raises sqlite3.DatabaseError for a database of a newer schema than this code knows.
+    """
+    current = schema_version(conn)
+    if current == SCHEMA_VERSION:
+        return []
+    applied, freed_space = [], False
+    for version, description, migration, frees_space in MIGRATIONS:
+        started = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another connection may have migrated while this one waited for the lock
+            current = schema_version(conn)
+            if current > SCHEMA_VERSION:
+                raise sqlite3.DatabaseError(f"Database schema version {current} is newer than this code's ({SCHEMA_VERSION})")
+            if current >= version:
+                conn.execute("ROLLBACK")
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        applied.append({'version': version, 'description': description, 'seconds': time.perf_counter() - started})
+        freed_space = freed_space or frees_space
+        logger.info("Migrated database schema to version %d (%s) in %.1fs", version, description, applied[-1]['seconds'])
+    if vacuum and freed_space:
+        conn.execute("VACUUM")
+    return applied
+
+
+def migrate_database(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, object]]:
+    """migrate() the database at `db_path`, e.g. at app startup; see migrate()."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def shadow_path(db_path: str) -> str:
+    return db_path + SHADOW_SUFFIX
+
+
+def start_shadow_build(db_path: str) -> str:
+    """
+    Path of a new, empty shadow database for rebuilding `db_path`; a shadow left behind by an
+    interrupted rebuild is discarded.
+    """
+    discard_shadow_build(db_path)
+    return shadow_path(db_path)
+
+
+def discard_shadow_build(db_path: str) -> None:
+    for path in (shadow_path(db_path), shadow_path(db_path) + "-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def publish_shadow_build(db_path: str) -> None:
+    """
+    Check the shadow database of `db_path` (PRAGMA integrity_check), ANALYZE it and rename it over
+    the live database. The rename happens while holding an exclusive lock on the live database,
+    so it waits for running queries and never lands in the middle of a write; connections opened
+    before it keep reading the old file. Raises sqlite3.DatabaseError, leaving both files as they
+    are, if the check fails.
+    """
+    shadow = shadow_path(db_path)
+    conn = sqlite3.connect(shadow, isolation_level=None)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if problems != ["ok"]:
+            raise sqlite3.DatabaseError(f"Integrity check of {shadow} failed: {'; '.join(problems[:5])}")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    if not os.path.exists(db_path):
+        os.replace(shadow, db_path)
+        return
+    live = sqlite3.connect(db_path, isolation_level=None, timeout=SWAP_TIMEOUT_SECONDS)
+    try:
+        live.execute("BEGIN EXCLUSIVE")
+        os.replace(shadow, db_path)
+        live.execute("ROLLBACK")
+    finally:
+        live.close()
+
+
+def stage_rows(conn: sqlite3.Connection, rows: Iterable[Sequence]) -> int:
+    """Replace the contents of the TEMP staging table with `rows` (tuples in PODCASTS_COLUMNS order)."""
+    conn.execute(STAGING_DDL)
+    conn.execute("DELETE FROM podcasts_staging")
+    placeholders = ", ".join("?" for _ in PODCASTS_COLUMNS)
+    conn.executemany(f"INSERT INTO podcasts_staging ({_COLUMN_LIST}) VALUES ({placeholders})", rows)
+    return conn.execute("SELECT COUNT(*) FROM podcasts_staging").fetchone()[0]
+
+
+def stage_select(conn: sqlite3.Connection, select_sql: str, params: Sequence = ()) -> int:
+    """Like stage_rows(), with the rows of a query (columns in PODCASTS_COLUMNS order) staged in its row order."""
+    conn.execute(STAGING_DDL)
+    conn.execute("DELETE FROM podcasts_staging")
+    conn.execute(f"INSERT INTO podcasts_staging ({_COLUMN_LIST}) {select_sql}", params)
+    return conn.execute("SELECT COUNT(*) FROM podcasts_staging").fetchone()[0]
+
+
+# Rows on their way into downloads, one per key, with the import that writes them
+WRITES_DDL = f"""
+CREATE TEMP TABLE IF NOT EXISTS podcasts_writes (
+    {", ".join(PODCASTS_COLUMNS)},
+    import_id INTEGER,
+    PRIMARY KEY ({", ".join(KEY_COLUMNS)})
+)
+"""
+
+
+def _same(columns: Sequence[str], left: str, right: str) -> str:
+    return " AND ".join(f"{left}.{col} IS {right}.{col}" for col in columns)
+
+
+_EPISODE_MATCH = "e.url = w.url AND " + _same(EPISODE_COLUMNS[1:], "e", "w")
+_SOURCE_MATCH = _same(SOURCE_COLUMNS, "s", "w")
+_EXISTING_KEY = "JOIN episodes e ON e.url = k.url JOIN downloads d ON d.episode_id = e.episode_id " \
+                "AND d.consumed_year = k.consumed_year AND d.consumed_month = k.consumed_month"
+
+
+def _stored_rows(keys: str) -> str:
+    """
+    LEFT JOINs of the stored row (aliases d, e, src) of each key of `keys`. A LEFT JOIN of the
+    `podcasts` view would materialize all of it; this looks each key up by index.
+    """
+    return f"""
+        LEFT JOIN downloads d ON d.episode_id IN (SELECT episode_id FROM episodes WHERE url = {keys}.url)
+            AND d.consumed_year = {keys}.consumed_year AND d.consumed_month = {keys}.consumed_month
+        LEFT JOIN episodes e ON e.episode_id = d.episode_id
+        LEFT JOIN download_sources src ON src.source_id = d.source_id
+    """
+
+
+# Each column of `podcasts` in _stored_rows()
+_STORED = {col: f"{'e' if col in EPISODE_COLUMNS else 'src' if col in SOURCE_COLUMNS else 'd'}.{col}"
+           for col in PODCASTS_COLUMNS + ("import_id",)}
+
+
+def write_rows(conn: sqlite3.Connection, select_sql: str, params: Sequence = (), mode: str = "replace") -> int:
+    """
+    Write the rows of a query (PODCASTS_COLUMNS then import_id) into episodes/downloads, as
+    `INSERT OR <mode> INTO podcasts` would have in the query's row order: mode 'replace' keeps the
+    last row of a key and overwrites the stored one, 'ignore' keeps the first row of a key that is
+    not stored yet. Episodes and sources are added as needed. Returns the number of rows written.
+    """
+    if mode not in ("replace", "ignore"):
+        raise ValueError(f"Unknown write mode '{mode}'")
+    conn.execute(WRITES_DDL)
+    conn.execute("DELETE FROM podcasts_writes")
+    conn.execute(f"INSERT OR {mode.upper()} INTO podcasts_writes ({_COLUMN_LIST}, import_id) {select_sql}", params)
+    if mode == "replace":
+        conn.execute(f"""
+            DELETE FROM downloads WHERE (episode_id, consumed_year, consumed_month) IN (
+                SELECT d.episode_id, d.consumed_year, d.consumed_month FROM podcasts_writes k {_EXISTING_KEY}
+            )
+        """)
+    else:
+        conn.execute(f"""
+            DELETE FROM podcasts_writes WHERE ({', '.join(KEY_COLUMNS)}) IN (
+                SELECT {', '.join(f'k.{col}' for col in KEY_COLUMNS)} FROM podcasts_writes k {_EXISTING_KEY}
+            )
+        """)
+    conn.execute(f"""
+        INSERT INTO episodes ({', '.join(EPISODE_COLUMNS)})
+        SELECT DISTINCT {', '.join(f'w.{col}' for col in EPISODE_COLUMNS)} FROM podcasts_writes w
+        WHERE NOT EXISTS (SELECT 1 FROM episodes e WHERE {_EPISODE_MATCH})
+    """)
+    conn.execute(f"""
+        INSERT INTO download_sources ({', '.join(SOURCE_COLUMNS)})
+        SELECT DISTINCT {', '.join(f'w.{col}' for col in SOURCE_COLUMNS)} FROM podcasts_writes w
+        WHERE NOT EXISTS (SELECT 1 FROM download_sources s WHERE {_SOURCE_MATCH})
+    """)
+    return conn.execute(f"""
+        INSERT INTO downloads (episode_id, consumed_year, consumed_month, {', '.join(DOWNLOAD_METRICS)}, source_id, import_id)
+        SELECT e.episode_id, w.consumed_year, w.consumed_month, {', '.join(f'w.{col}' for col in DOWNLOAD_METRICS)}, s.source_id, w.import_id
+        FROM podcasts_writes w
+        JOIN episodes e ON {_EPISODE_MATCH}
+        JOIN download_sources s ON {_SOURCE_MATCH}
+    """).rowcount
+
+
+def delete_rows(conn: sqlite3.Connection, keys_sql: str, params: Sequence = ()) -> int:
+    """Delete the rows whose keys (KEY_COLUMNS) a query returns; returns how many were stored."""
+    return conn.execute(f"""
+        DELETE FROM downloads WHERE (episode_id, consumed_year, consumed_month) IN (
+            SELECT d.episode_id, d.consumed_year, d.consumed_month FROM ({keys_sql}) k {_EXISTING_KEY}
+        )
+    """, params).rowcount
+
+
+def prune_dimensions(conn: sqlite3.Connection, urls_sql: Optional[str] = None, params: Sequence = ()) -> None:
+    """
+    Drop the episodes and sources no row refers to any more. With `urls_sql`, only the episodes
+    of the URLs it returns are checked and sources are left to the next full prune, so the cost
+    follows the keys touched rather than the table.
+    """
+    if urls_sql is None:
+        conn.execute("DELETE FROM episodes WHERE episode_id NOT IN (SELECT episode_id FROM downloads)")
+        conn.execute("DELETE FROM download_sources WHERE source_id NOT IN (SELECT source_id FROM downloads)")
+        return
+    conn.execute(f"""
+        DELETE FROM episodes WHERE url IN ({urls_sql})
+          AND NOT EXISTS (SELECT 1 FROM downloads d WHERE d.episode_id = episodes.episode_id)
+    """, params)
+
+
+def count_new_staged_keys(conn: sqlite3.Connection) -> int:
+    """Number of distinct staged keys that do not exist in `podcasts` yet."""
+    return conn.execute(f"""
+        SELECT COUNT(*) FROM (
+            SELECT DISTINCT s.url, s.consumed_year, s.consumed_month
+            FROM podcasts_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM podcasts p WHERE {_KEY_MATCH})
+        )
+    """).fetchone()[0]
+
+
+def record_staged_changes(conn: sqlite3.Connection, import_id: int, mode: str) -> None:
+    """
+    Add the keys that applying the staged rows with `mode` will write to the changeset of
+    `import_id`, with the values they replace. A key already in the changeset keeps its entry, so
+    it always holds the values from before the import.
+    """
+    prior_columns = ", ".join(f"prior_{col}" for col in PRIOR_COLUMNS)
+    prior_values = ", ".join(_STORED[col] for col in PRIOR_COLUMNS)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO import_changes (import_id, url, consumed_year, consumed_month, replaced, {prior_columns})
+        SELECT ?, s.url, s.consumed_year, s.consumed_month, d.episode_id IS NOT NULL, {prior_values}
+        FROM (SELECT DISTINCT url, consumed_year, consumed_month FROM podcasts_staging) s
+        {_stored_rows("s")}
+        WHERE d.episode_id IS NULL OR ? = 'replace'
+    """, (import_id, mode))
+
+
+def apply_staged_rows(conn: sqlite3.Connection, mode: str, import_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Write the staged rows into `podcasts` (write_rows), tagged with `import_id`.
+
+    mode 'replace' (monthly files) overwrites existing keys, mode 'ignore' (report files) keeps
+    them. Counts follow row-by-row semantics: a staged row is 'inserted' if its key is neither in
+    `podcasts` nor staged earlier, otherwise it is 'replaced' or 'ignored'. With an `import_id`,
+    the keys written are recorded in its changeset first (record_staged_changes).
+    """
+    if mode not in ("replace", "ignore"):
+        raise ValueError(f"Unknown write mode '{mode}'")
+    total = conn.execute("SELECT COUNT(*) FROM podcasts_staging").fetchone()[0]
+    inserted = count_new_staged_keys(conn)
+    if import_id is not None:
+        record_staged_changes(conn, import_id, mode)
+    write_rows(conn, f"SELECT {_COLUMN_LIST}, ? FROM podcasts_staging ORDER BY seq", (import_id,), mode)
+    existing_label = "replaced" if mode == "replace" else "ignored"
+    return {"inserted": inserted, existing_label: total - inserted}
+
+
+DIFF_METRICS = ("full", "partial", "total_bw", "eq_full")
+
+
+def diff_staged_rows(conn: sqlite3.Connection, mode: str) -> pd.DataFrame:
+    """
+    Row-level preview of `apply_staged_rows(conn, mode)` without writing anything.
+
+    Returns one row per staged row with its action ('insert', 'replace' or 'ignore'), the key,
+    the current and incoming title and the before/after/delta of each metric. Ignored rows keep
+    their before/after values for reference but have a zero delta since nothing would change.
+    """
+    if mode not in ("replace", "ignore"):
+        raise ValueError(f"Unknown write mode '{mode}'")
+    existing_action = "replace" if mode == "replace" else "ignore"
+    metric_columns = ",\n            ".join(
+        f"{_STORED[metric]} AS {metric}_before, s.{metric} AS {metric}_after" for metric in DIFF_METRICS
+    )
+    diff = pd.read_sql_query(f"""
+        WITH first_staged AS (
+            SELECT url, consumed_year, consumed_month, MIN(seq) AS first_seq
+            FROM podcasts_staging
+            GROUP BY url, consumed_year, consumed_month
+        )
+        SELECT
+            CASE WHEN d.episode_id IS NULL AND s.seq = f.first_seq THEN 'insert' ELSE ? END AS action,
+            s.url, s.consumed_year, s.consumed_month,
+            e.title AS title_before, s.title AS title_after,
+            {metric_columns},
+            src.source_file_path AS source_file_before
+        FROM podcasts_staging s
+        JOIN first_staged f
+          ON f.url = s.url AND f.consumed_year = s.consumed_year AND f.consumed_month = s.consumed_month
+        {_stored_rows("s")}
+        ORDER BY s.seq
+    """, conn, params=(existing_action,))
+    changes = diff["action"] != "ignore"
+    for metric in DIFF_METRICS:
+        before = pd.to_numeric(diff[f"{metric}_before"], errors="coerce").fillna(0)
+        after = pd.to_numeric(diff[f"{metric}_after"], errors="coerce").fillna(0)
+        diff[f"{metric}_delta"] = (after - before).where(changes, 0)
+    return diff
+
+
+def find_manifest_entries(conn: sqlite3.Connection, file_sha256: str, filename: str, rules_version: str) -> List[Dict[str, object]]:
+    """
+    Manifest rows for a workbook imported under `rules_version`. Empty when the file is new, was
+    imported under other parsing rules, or had a sheet that failed to read or write last time.
+    """
+    cursor = conn.execute(f"""
+        SELECT {", ".join(MANIFEST_COLUMNS)} FROM import_manifest
+        WHERE file_sha256 = ? AND filename = ? AND rules_version = ?
+        ORDER BY rowid
+    """, (file_sha256, filename, rules_version))
+    entries = [dict(zip(MANIFEST_COLUMNS, row)) for row in cursor.fetchall()]
+    if any(entry["status"] == "unreadable" for entry in entries):
+        return []
+    return entries
+
+
+def record_manifest_entries(conn: sqlite3.Connection, entries: Iterable[Dict[str, object]]) -> None:
+    """Upsert manifest rows; call inside the import's transaction so they commit with the data."""
+    placeholders = ", ".join("?" for _ in MANIFEST_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO import_manifest ({', '.join(MANIFEST_COLUMNS)}) VALUES ({placeholders})",
+        [tuple(entry.get(col) for col in MANIFEST_COLUMNS) for entry in entries]
+    )
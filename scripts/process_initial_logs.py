@@ -2,10 +2,12 @@
 import os
 import sys
 import argparse
+import logging
 from datetime import datetime
-from import_data import import_data
+from batch_import import DEFAULT_WORKERS, import_files_parallel
+from scripts.import_logging import add_verbosity_arguments, configure_logging, level_from_args
 
-def process_initial_logs(override=False, dry_run=False, reset_db=False):
+def process_initial_logs(override=False, dry_run=False, reset_db=False, workers=DEFAULT_WORKERS, force=False):
     """
     Process all Excel files in the data/initial_logs directory.
     Monthly files are processed first, followed by the report file.
@@ -14,6 +16,8 @@ def process_initial_logs(override=False, dry_run=False, reset_db=False):
         override: Whether to override existing data
         dry_run: Whether to perform a dry run
         reset_db: Whether to reset the database before import
+        workers: Number of processes parsing files in parallel
+        force: Re-import files even if their content was already imported
     """
     initial_logs_dir = os.path.join("data", "initial_logs")
     
@@ -32,47 +36,23 @@ def process_initial_logs(override=False, dry_run=False, reset_db=False):
         print("Warning: No Excel files found in initial_logs directory")
         return False
 
-    # Sort files to ensure monthly data is processed before report
-    monthly_files = [f for f in initial_files if not f.endswith('report0416.xls')]
-    report_file = [f for f in initial_files if f.endswith('report0416.xls')]
-    
     total_stats = {
         'sheets': {'processed': 0, 'total': 0},
         'rows': {'scanned': 0, 'merged': 0, 'errors': 0},
-        'actual': {'inserted': 0, 'replaced': 0, 'ignored': 0}
+        'actual': {'inserted': 0, 'replaced': 0, 'ignored': 0},
+        'dry_run': {'inserted': 0, 'replaced': 0, 'ignored': 0}
     }
     
-    # Process monthly files first
-    if monthly_files:
-        print("\nProcessing Monthly Files:")
-        print("=" * 50)
-        for file_path in monthly_files:
-            print(f"\nProcessing {os.path.basename(file_path)}...")
-            stats = import_data(
-                filepath=file_path,
-                override=override,
-                dry_run=dry_run,
-                reset_db=reset_db if file_path == monthly_files[0] else False
-            )
-            if stats:
-                accumulate_stats(total_stats, stats)
-                display_import_summary(stats, override, reset_db, dry_run)
-    
-    # Process report file last
-    if report_file:
-        print("\nProcessing Report File:")
-        print("=" * 50)
-        for file_path in report_file:
-            print(f"\nProcessing {os.path.basename(file_path)}...")
-            stats = import_data(
-                filepath=file_path,
-                override=override,
-                dry_run=dry_run,
-                reset_db=False  # Never reset DB for report file
-            )
-            if stats:
-                accumulate_stats(total_stats, stats)
-                display_import_summary(stats, override, reset_db, dry_run)
+    # Parse in parallel; files are written monthly first (chronologically), then the report file
+    print(f"\nProcessing {len(initial_files)} files with {workers} worker(s):")
+    print("=" * 50)
+    result = import_files_parallel(initial_files, workers=workers, dry_run=dry_run, reset_db=reset_db, force=force)
+    for stats in result['files']:
+        accumulate_stats(total_stats, stats)
+        display_import_summary(stats, override, reset_db, dry_run)
+
+    print("\nPer-file timings:")
+    print(result['timings'].to_string(index=False))
     
     # Display total summary
     print("\nTotal Import Summary:")
@@ -91,6 +71,9 @@ def accumulate_stats(total_stats, stats):
     total_stats['actual']['inserted'] += stats['actual']['inserted']
     total_stats['actual']['replaced'] += stats['actual']['replaced']
     total_stats['actual']['ignored'] += stats['actual']['ignored']
+    total_stats['dry_run']['inserted'] += stats['dry_run']['inserted']
+    total_stats['dry_run']['replaced'] += stats['dry_run']['replaced']
+    total_stats['dry_run']['ignored'] += stats['dry_run']['ignored']
 
 def display_import_summary(stats, override, reset_db, dry_run):
     """Display a summary of the import process"""
@@ -100,9 +83,15 @@ def display_import_summary(stats, override, reset_db, dry_run):
     print(f"Total rows merged: {stats['rows']['merged']}")
     print(f"Total rows with errors: {stats['rows']['errors']}")
     print(f"Dry run: {dry_run}")
-    print(f"Total inserted: {stats['actual']['inserted']}")
-    print(f"Total replaced: {stats['actual']['replaced']}")
-    print(f"Total ignored: {stats['actual']['ignored']}")
+    if dry_run:
+        # Nothing was written; these are the changes the import would have made
+        print(f"Total would insert: {stats['dry_run']['inserted']}")
+        print(f"Total would replace: {stats['dry_run']['replaced']}")
+        print(f"Total would ignore: {stats['dry_run']['ignored']}")
+    else:
+        print(f"Total inserted: {stats['actual']['inserted']}")
+        print(f"Total replaced: {stats['actual']['replaced']}")
+        print(f"Total ignored: {stats['actual']['ignored']}")
 
 def get_import_action_summary(override, reset_db, dry_run):
     """Get a summary of what actions will be taken"""
@@ -126,8 +115,12 @@ def main():
     parser.add_argument('--override', action='store_true', help='Update existing data for the same month/year')
     parser.add_argument('--reset-db', action='store_true', help='Clear all existing data before import')
     parser.add_argument('--dry-run', action='store_true', help='Preview changes without saving')
+    parser.add_argument('--force', action='store_true', help='Re-import files that are unchanged since their last import')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Number of files parsed in parallel')
+    add_verbosity_arguments(parser)
     
     args = parser.parse_args()
+    configure_logging(level_from_args(args, default=logging.WARNING))
     
     print(f"Starting import process at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Options: override={args.override}, reset_db={args.reset_db}, dry_run={args.dry_run}")
@@ -135,7 +128,9 @@ def main():
     success = process_initial_logs(
         override=args.override,
         dry_run=args.dry_run,
-        reset_db=args.reset_db
+        reset_db=args.reset_db,
+        workers=args.workers,
+        force=args.force
     )
     
     if success:
@@ -0,0 +1,268 @@
+"""
+Raw pre-aggregation rows and re-deriving `podcasts` from them.
+
+Imports keep every row of a sheet that has a URL in `raw_rows` (see scripts/podcasts_db.py), in
+the same transaction as the aggregates: its URL as an integer id into `raw_urls`, its metrics as
+they were coerced for aggregation and its position in the sheet. `raw_urls` holds each distinct
+URL once with the metadata and grouping key it was parsed into. Rows whose URL could not be parsed
+are kept as well.
+
+replay_imports() rebuilds `podcasts` from those rows without reading any workbook: each import
+still in place is replayed in order, aggregated entirely in SQL with the rules SheetAggregator
+applies in Python (rows grouped per sheet by grouping key, metrics summed in row order, the first
+longest URL, the episode's display title from `title_aliases` or else the first longest title, the
+first row's code/feature/created_at), staged and written exactly like the original import (replace
+for monthly files, ignore for reports), changeset and reconciliation events included. After a
+parsing rule changed, refreshing the grouping keys in `raw_urls` and replaying is all a
+re-derivation needs.
+
+Usage:
+    python scripts/raw_rows.py             # what is stored
+    python scripts/raw_rows.py --check     # re-derive in a rolled back transaction and compare
+    python scripts/raw_rows.py --rederive  # re-derive and keep the result
+"""
+import itertools
+import os
+import sqlite3
+import sys
+from argparse import ArgumentParser
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from scripts import import_history, podcasts_db, reconciliation
+from scripts.import_logging import add_verbosity_arguments, configure_logging, get_logger, level_from_args
+
+logger = get_logger("raw_rows")
+
+RAW_URL_STAGING_DDL = f"""
+CREATE TEMP TABLE IF NOT EXISTS raw_url_staging (
+    position INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    {", ".join(f"{field} TEXT" for field in podcasts_db.RAW_URL_FIELDS)}
+)
+"""
+
+_GROUP = "PARTITION BY r.sheet_id, u.group_code, u.group_feature, u.group_title"
+_TITLE_EXTENSIONS = "('.mp3', '.wav', '.aac', '.m4a')"
+
+
+def _strip_extension(column: str) -> str:
+    return f"CASE WHEN lower(substr({column}, -4)) IN {_TITLE_EXTENSIONS} THEN substr({column}, 1, length({column}) - 4) ELSE {column} END"
+
+# One import's aggregates in PODCASTS_COLUMNS order, in the order SheetAggregator produces them
+# (sheet by sheet, keys in first-seen order). Windows keep the sums sequential in row order, so
+# they match the Python sums to the bit; the floor of eq_full is spelled out for older SQLite.
+DERIVE_IMPORT_SQL = f"""
+    SELECT a.url, COALESCE(t.title, {_strip_extension('a.title')}),
+           a.code, a.feature, full_sum, partial_sum,
+           CASE WHEN full_sum + partial_sum > 0 THEN total_bw_sum / (full_sum + partial_sum) END,
+           total_bw_sum,
+           CAST(full_sum + 0.5 * partial_sum AS INTEGER) - (full_sum + 0.5 * partial_sum < CAST(full_sum + 0.5 * partial_sum AS INTEGER)),
+           a.created_at, s.consumed_at, s.consumed_year, s.consumed_month, s.assumed_month, s.imported_at, i.filename
+    FROM (
+        SELECT r.sheet_id, u.group_code, u.group_feature, u.group_title,
+               FIRST_VALUE(u.url) OVER ({_GROUP} ORDER BY length(u.url) DESC, r.row_no) AS url,
+               FIRST_VALUE(u.title) OVER ({_GROUP} ORDER BY length(u.title) DESC, r.row_no) AS title,
+               FIRST_VALUE(u.code) OVER ({_GROUP} ORDER BY r.row_no) AS code,
+               FIRST_VALUE(u.feature) OVER ({_GROUP} ORDER BY r.row_no) AS feature,
+               FIRST_VALUE(u.created_at) OVER ({_GROUP} ORDER BY r.row_no) AS created_at,
+               SUM(r.full) OVER ({_GROUP} ORDER BY r.row_no ROWS UNBOUNDED PRECEDING) AS full_sum,
+               SUM(r.partial) OVER ({_GROUP} ORDER BY r.row_no ROWS UNBOUNDED PRECEDING) AS partial_sum,
+               SUM(r.total_bw) OVER ({_GROUP} ORDER BY r.row_no ROWS UNBOUNDED PRECEDING) AS total_bw_sum,
+               MIN(r.row_no) OVER ({_GROUP}) AS first_row_no,
+               ROW_NUMBER() OVER ({_GROUP} ORDER BY r.row_no DESC) AS from_last
+        FROM raw_sheets rs
+        JOIN raw_rows r ON r.sheet_id = rs.sheet_id
+        JOIN raw_urls u ON u.url_id = r.url_id
+        WHERE rs.import_id = ? AND u.group_title IS NOT NULL
+    ) a
+    JOIN raw_sheets s ON s.sheet_id = a.sheet_id
+    JOIN imports i ON i.import_id = s.import_id
+    LEFT JOIN title_aliases t
+        ON t.group_code = a.group_code AND t.group_feature = a.group_feature AND t.alias = a.group_title AND t.canonical = t.alias
+    WHERE a.from_last = 1
+    ORDER BY a.sheet_id, a.first_row_no
+"""
+
+
+def record_sheet(conn: sqlite3.Connection, import_id: int, sheet: dict, rules_version: str) -> int:
+    """
+    Store the raw rows of a parse_sheet() result as part of `import_id`; call inside the
+    transaction that writes its aggregates. New URLs join `raw_urls` and URLs last parsed under
+    other rules get this sheet's metadata. Returns the number of rows stored.
+    """
+    raw = sheet.get('raw')
+    if not raw or not len(raw['url_positions']):
+        return 0
+    conn.execute(RAW_URL_STAGING_DDL)
+    conn.execute("DELETE FROM raw_url_staging")
+    fields = podcasts_db.RAW_URL_FIELDS
+    conn.executemany(
+        f"INSERT INTO raw_url_staging (position, url, {', '.join(fields)}) VALUES ({', '.join('?' for _ in range(len(fields) + 2))})",
+        ((position, url) + (metadata or (None,) * len(fields))
+         for position, (url, metadata) in enumerate(zip(raw['urls'], raw['url_metadata'])))
+    )
+    conn.execute(f"""
+        INSERT INTO raw_urls (url, {', '.join(fields)}, rules_version)
+        SELECT url, {', '.join(fields)}, ? FROM raw_url_staging WHERE true
+        ON CONFLICT (url) DO UPDATE SET {', '.join(f'{field} = excluded.{field}' for field in fields)},
+            rules_version = excluded.rules_version
+        WHERE raw_urls.rules_version IS NOT excluded.rules_version
+    """, (rules_version,))
+    url_ids = np.array([row[0] for row in conn.execute(
+        "SELECT u.url_id FROM raw_url_staging s JOIN raw_urls u ON u.url = s.url ORDER BY s.position"
+    )], dtype=np.int64)
+
+    row_count = len(raw['url_positions'])
+    sheet_id = conn.execute(
+        "INSERT INTO raw_sheets (import_id, sheet_name, consumed_at, consumed_year, consumed_month, assumed_month, imported_at, row_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (import_id, sheet['sheet_name'], raw['consumed_at'], raw['consumed_year'], raw['consumed_month'],
+         raw['assumed_month'], raw['imported_at'], row_count)
+    ).lastrowid
+    conn.executemany(
+        "INSERT INTO raw_rows (sheet_id, row_no, url_id, full, partial, total_bw) VALUES (?, ?, ?, ?, ?, ?)",
+        zip(itertools.repeat(sheet_id), range(row_count), url_ids[raw['url_positions']].tolist(),
+            raw['full'].tolist(), raw['partial'].tolist(), raw['total_bw'].tolist())
+    )
+    return row_count
+
+
+def fill_display_titles(conn: sqlite3.Connection) -> int:
+    """
+    Give canonical titles without a display title (those added outside an import, by
+    scripts/rederive_metadata.py) the one an import would have: the first longest title of the
+    episode in the first sheet, in import order, that has it. Returns the number filled.
+    """
+    return conn.execute(f"""
+        UPDATE title_aliases SET title = f.title
+        FROM (
+            SELECT DISTINCT u.group_code, u.group_feature, u.group_title,
+                   FIRST_VALUE({_strip_extension('u.title')}) OVER (
+                       PARTITION BY u.group_code, u.group_feature, u.group_title ORDER BY r.sheet_id, length(u.title) DESC, r.row_no
+                   ) AS title
+            FROM raw_rows r JOIN raw_urls u ON u.url_id = r.url_id
+            WHERE EXISTS (
+                SELECT 1 FROM title_aliases t
+                WHERE t.title IS NULL AND t.group_code = u.group_code AND t.group_feature = u.group_feature AND t.alias = u.group_title
+            )
+        ) f
+        WHERE title_aliases.title IS NULL AND title_aliases.alias = title_aliases.canonical
+          AND title_aliases.group_code = f.group_code AND title_aliases.group_feature = f.group_feature
+          AND title_aliases.alias = f.group_title
+    """).rowcount
+
+
+def rows_without_raw_data(conn: sqlite3.Connection) -> int:
+    """Rows of `podcasts` written before raw rows were kept (or by an import without them)."""
+    return conn.execute("""
+        SELECT COUNT(*) FROM podcasts p
+        WHERE p.import_id IS NULL OR NOT EXISTS (SELECT 1 FROM raw_sheets s WHERE s.import_id = p.import_id)
+    """).fetchone()[0]
+
+
+def replay_imports(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Rebuild `podcasts`, every changeset and the reconciliation events from the raw rows by
+    replaying the imports still in place, in order. Runs in the caller's transaction. Raises
+    ValueError, before changing anything, if `podcasts` holds rows that have no raw rows to be
+    derived from.
+    """
+    missing = rows_without_raw_data(conn)
+    if missing:
+        raise ValueError(f"{missing} row(s) in podcasts have no raw rows to be derived from "
+                         f"(imported before raw rows were kept); re-import their files first")
+    imports = conn.execute("""
+        SELECT import_id, file_type FROM imports i
+        WHERE status = 'imported' AND EXISTS (SELECT 1 FROM raw_sheets s WHERE s.import_id = i.import_id)
+        ORDER BY import_id
+    """).fetchall()
+    conn.execute("DELETE FROM downloads")
+    conn.execute("DELETE FROM import_changes")
+    conn.execute("DELETE FROM reconciliation_events")
+    totals = {'imports': len(imports), 'inserted': 0, 'replaced': 0, 'ignored': 0}
+    for import_id, file_type in imports:
+        podcasts_db.stage_select(conn, DERIVE_IMPORT_SQL, (import_id,))
+        reconciliation.derive_events(conn, import_id)
+        counts = podcasts_db.apply_staged_rows(conn, "replace" if file_type == "monthly" else "ignore", import_id)
+        import_history.finish_import(conn, import_id, counts)
+        for action, count in counts.items():
+            totals[action] += count
+    podcasts_db.prune_dimensions(conn)
+    return totals
+
+
+def rederive_podcasts(conn: sqlite3.Connection, apply: bool = False,
+                      before_replay: Optional[Callable[[sqlite3.Connection], Dict[str, object]]] = None) -> Dict[str, object]:
+    """
+    Replay every import from the raw rows (replay_imports) in one transaction and compare the
+    result with `podcasts` as it was: keys 'added', 'removed' and 'changed' count rows by
+    (url, consumed_year, consumed_month). `before_replay` runs first in the same transaction
+    (e.g. to refresh `raw_urls`) and its result is merged into the summary. Commits only with
+    `apply`, otherwise rolls back.
+    """
+    keys = ", ".join(podcasts_db.KEY_COLUMNS)
+    columns = ", ".join(podcasts_db.PODCASTS_COLUMNS)
+    key_match = " AND ".join(f"b.{col} = p.{col}" for col in podcasts_db.KEY_COLUMNS)
+    value_differs = " OR ".join(f"b.{col} IS NOT p.{col}" for col in podcasts_db.PODCASTS_COLUMNS
+                                if col not in podcasts_db.KEY_COLUMNS)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DROP TABLE IF EXISTS temp.podcasts_before")
+        conn.execute(f"CREATE TEMP TABLE podcasts_before AS SELECT {columns} FROM podcasts")
+        conn.execute(f"CREATE INDEX temp.podcasts_before_key ON podcasts_before ({keys})")
+        summary = dict(before_replay(conn)) if before_replay else {}
+        summary.update(replay_imports(conn))
+        summary['rows_before'] = conn.execute("SELECT COUNT(*) FROM podcasts_before").fetchone()[0]
+        summary['rows_after'] = conn.execute("SELECT COUNT(*) FROM podcasts").fetchone()[0]
+        summary['removed'] = conn.execute(
+            f"SELECT COUNT(*) FROM podcasts_before b WHERE NOT EXISTS (SELECT 1 FROM podcasts p WHERE {key_match})"
+        ).fetchone()[0]
+        summary['added'] = summary['rows_after'] - (summary['rows_before'] - summary['removed'])
+        summary['changed'] = conn.execute(
+            f"SELECT COUNT(*) FROM podcasts_before b JOIN podcasts p ON {key_match} WHERE {value_differs}"
+        ).fetchone()[0]
+        conn.execute("DROP TABLE temp.podcasts_before")
+        conn.execute("COMMIT" if apply else "ROLLBACK")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if apply:
+        logger.debug("Re-derived podcasts from the raw rows of %d import(s): %d added, %d removed, %d changed",
+                     summary['imports'], summary['added'], summary['removed'], summary['changed'])
+    return summary
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Inspect the raw rows kept by imports and re-derive podcasts from them.")
+    parser.add_argument("--db", default=podcasts_db.DEFAULT_DB_PATH, help=f"Database to work on (default: {podcasts_db.DEFAULT_DB_PATH})")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--check", action="store_true", help="Re-derive podcasts in a transaction that is rolled back and report the differences")
+    action.add_argument("--rederive", action="store_true", help="Re-derive podcasts from the raw rows and keep the result")
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    configure_logging(level_from_args(args))
+    conn = podcasts_db.connect(args.db)
+    try:
+        if args.check or args.rederive:
+            try:
+                summary = rederive_podcasts(conn, apply=args.rederive)
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            print(f"{'Re-derived' if args.rederive else 'Would re-derive'} {summary['imports']} import(s): "
+                  f"{summary['rows_before']} -> {summary['rows_after']} rows, {summary['added']} added, "
+                  f"{summary['removed']} removed, {summary['changed']} changed")
+        else:
+            sheets, rows = conn.execute("SELECT COUNT(*), COALESCE(SUM(row_count), 0) FROM raw_sheets").fetchone()
+            urls, unparsed = conn.execute("SELECT COUNT(*), COUNT(*) - COUNT(group_title) FROM raw_urls").fetchone()
+            print(f"{rows} raw rows in {sheets} sheet(s), {urls} distinct URLs ({unparsed} not parsed); "
+                  f"{rows_without_raw_data(conn)} podcasts row(s) without raw rows")
+    finally:
+        conn.close()
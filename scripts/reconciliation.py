@@ -0,0 +1,159 @@
+"""
+Which URL variants were merged into one row, per import.
+
+A sheet's rows are aggregated per grouping key (code, feature, normalized title, period), so
+several URLs of one episode end up as one row of `podcasts`. Each key that merged more than one
+distinct URL is a reconciliation event: imports record them in `reconciliation_events` (see
+scripts/podcasts_db.py) in the transaction that writes the rows, with the variant titles and URLs
+(the first MAX_VARIANTS distinct URLs of the key in first-seen order; `variant_count` counts them
+all) and the URL and title the row was written with. Undoing an import drops its events, and
+replaying the imports from their raw rows (scripts/raw_rows.py) derives them again, so they always
+describe the rows in `podcasts`.
+
+Usage:
+    python scripts/reconciliation.py                      # the latest events
+    python scripts/reconciliation.py --import 41          # the events of import 41
+    python scripts/reconciliation.py --title "ai update"  # events whose canonical title contains this
+"""
+import json
+import os
+import sqlite3
+import sys
+from argparse import ArgumentParser
+from typing import Any, Dict, Iterable, List, Optional
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from scripts import podcasts_db
+from scripts.import_logging import add_verbosity_arguments, configure_logging, get_logger, level_from_args
+
+logger = get_logger("reconciliation")
+
+# Distinct URL variants listed per event (the total is always counted)
+MAX_VARIANTS = 20
+DEFAULT_LIST_LIMIT = 20
+
+EVENT_COLUMNS = ("import_id", "sheet_name", "group_code", "group_feature", "group_title", "consumed_year",
+                 "consumed_month", "variant_count", "variant_titles", "variant_urls", "canonical_title", "canonical_url")
+
+
+def _event_row(import_id: int, sheet_name: str, entry: Dict[str, Any]) -> tuple:
+    return (import_id, sheet_name) + tuple(entry['agg_key']) + (
+        entry['variant_count'], json.dumps(entry['titles'], ensure_ascii=False),
+        json.dumps(entry['urls'], ensure_ascii=False), entry['canonical_title'], entry['canonical_url'])
+
+
+def _insert_events(conn: sqlite3.Connection, rows: Iterable[tuple]) -> int:
+    cursor = conn.executemany(
+        f"INSERT INTO reconciliation_events ({', '.join(EVENT_COLUMNS)}) VALUES ({', '.join('?' for _ in EVENT_COLUMNS)})",
+        rows
+    )
+    return max(cursor.rowcount, 0)
+
+
+def record_events(conn: sqlite3.Connection, import_id: int, sheet: dict) -> int:
+    """
+    Store the reconciliation log of a parse_sheet() result (sheet['reconciliation']) as events of
+    `import_id`, in one executemany; call inside the transaction that writes its rows. Returns
+    the number of events stored.
+    """
+    log = sheet.get('reconciliation')
+    if not log:
+        return 0
+    return _insert_events(conn, (_event_row(import_id, sheet['sheet_name'], entry) for entry in log))
+
+
+def derive_events(conn: sqlite3.Connection, import_id: int) -> int:
+    """
+    Store the events of `import_id` again from its raw rows, as the import recorded them, with
+    the canonical URL and title of each key taken from the import's rows in `podcasts_staging`
+    (podcasts_db.stage_select). Returns the number of events stored.
+    """
+    written = {(url, year, month): title for url, title, year, month in conn.execute(
+        "SELECT url, title, consumed_year, consumed_month FROM podcasts_staging"
+    )}
+    # Each distinct URL of a sheet once, in the order the sheet first lists it
+    rows = conn.execute("""
+        SELECT s.sheet_id, s.sheet_name, s.consumed_year, s.consumed_month,
+               u.group_code, u.group_feature, u.group_title, u.url, u.title, MIN(r.row_no) AS first_row_no
+        FROM raw_sheets s
+        JOIN raw_rows r ON r.sheet_id = s.sheet_id
+        JOIN raw_urls u ON u.url_id = r.url_id
+        WHERE s.import_id = ? AND u.group_title IS NOT NULL
+        GROUP BY r.sheet_id, r.url_id
+        ORDER BY s.sheet_id, first_row_no
+    """, (import_id,)).fetchall()
+    keys: Dict[tuple, List[tuple]] = {}
+    sheet_names = {}
+    for sheet_id, sheet_name, year, month, code, feature, group_title, url, title, _ in rows:
+        sheet_names[sheet_id] = sheet_name
+        keys.setdefault((sheet_id, code, feature, group_title, year, month), []).append((url, title))
+    events = []
+    for (sheet_id, *agg_key), variants in keys.items():
+        if len(variants) < 2:
+            continue
+        period = tuple(agg_key[3:])
+        canonical_url = next((url for url, _ in variants if (url, *period) in written), None)
+        listed = variants[:MAX_VARIANTS]
+        events.append(_event_row(import_id, sheet_names[sheet_id], {
+            'agg_key': agg_key,
+            'titles': list(dict.fromkeys(title for _, title in listed)),
+            'urls': [url for url, _ in listed],
+            'variant_count': len(variants),
+            'canonical_title': written.get((canonical_url, *period)),
+            'canonical_url': canonical_url,
+        }))
+    return _insert_events(conn, events)
+
+
+def list_events(conn: sqlite3.Connection, limit: Optional[int] = DEFAULT_LIST_LIMIT, import_id: Optional[int] = None,
+                title: Optional[str] = None) -> List[Dict[str, Any]]:
+    """The latest events first, optionally of one import or with `title` in their canonical title."""
+    conditions, params = [], []
+    if import_id is not None:
+        conditions.append("import_id = ?")
+        params.append(import_id)
+    if title:
+        conditions.append("instr(lower(canonical_title), lower(?)) > 0")
+        params.append(title)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = conn.execute(
+        f"SELECT event_id, {', '.join(EVENT_COLUMNS)} FROM reconciliation_events {where} ORDER BY event_id DESC"
+        + (" LIMIT ?" if limit is not None else ""),
+        params + ([limit] if limit is not None else [])
+    )
+    columns = [column[0] for column in cursor.description]
+    events = []
+    for row in cursor:
+        event = dict(zip(columns, row))
+        event['variant_titles'] = json.loads(event['variant_titles'])
+        event['variant_urls'] = json.loads(event['variant_urls'])
+        events.append(event)
+    return events
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="List the URL variants imports merged into one row.")
+    parser.add_argument("--db", default=podcasts_db.DEFAULT_DB_PATH, help=f"Database to work on (default: {podcasts_db.DEFAULT_DB_PATH})")
+    parser.add_argument("--import", dest="import_id", type=int, metavar="IMPORT_ID", help="Only the events of this import")
+    parser.add_argument("--title", help="Only events whose canonical title contains this text")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIST_LIMIT, help="Number of events to list")
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    configure_logging(level_from_args(args))
+    conn = podcasts_db.connect(args.db)
+    try:
+        for event in list_events(conn, args.limit, args.import_id, args.title):
+            print(f"import {event['import_id']}  {event['sheet_name']}  {event['consumed_year']}-{event['consumed_month']:02d}  "
+                  f"{event['group_code']} / {event['group_feature']}: {event['variant_count']} URL(s) -> '{event['canonical_title']}'")
+            print(f"    canonical: {event['canonical_url']}")
+            for url in event['variant_urls']:
+                print(f"    variant:   {url}")
+            if event['variant_count'] > len(event['variant_urls']):
+                print(f"    ({event['variant_count'] - len(event['variant_urls'])} more not listed)")
+            print(f"    titles:    {', '.join(event['variant_titles'])}")
+    finally:
+        conn.close()
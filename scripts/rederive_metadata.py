@@ -0,0 +1,249 @@
+"""
+Re-derive URL metadata in the database after the filename/title rules changed.
+
+Each distinct URL an import has seen is stored once in `raw_urls` together with its code,
+feature, title, created_at and grouping key and the rules version they were parsed under (see
+scripts/raw_rows.py). When extract_code_feature_title(), normalize_title_for_grouping_key() or
+config/filename_rules.yaml change, rederive_metadata():
+
+1. streams the URLs parsed under other rules (every URL with `all_urls`) out of `raw_urls` in
+   chunks and parses them again with the current rules over a process pool, into a temporary table;
+2. in one transaction, resolves the new normalized titles against the title catalog
+   (scripts/title_resolution.py), writes the new metadata into `raw_urls` and replays every import from its
+   raw rows (raw_rows.rederive_podcasts), so rows whose grouping keys now collide are merged and
+   rows whose keys came apart are split exactly as a re-import would, changesets included;
+3. marks the import manifest entries of the replayed files as current, so the next import run does
+   not read those workbooks again.
+
+No workbook is read. Only URL metadata is re-derived: a change to how sheets are read or
+aggregated still needs a re-import (--force). `podcasts` rows imported before raw rows were kept
+cannot be re-derived; re-import their files once (scripts/reimport_all.sh rebuilds in a shadow
+database, so the app keeps serving meanwhile).
+
+Usage:
+    python scripts/rederive_metadata.py             # re-derive and apply
+    python scripts/rederive_metadata.py --dry-run   # report what would change, keep nothing
+"""
+import collections
+import multiprocessing
+import os
+import sqlite3
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from scripts import import_data, podcasts_db, raw_rows, title_resolution
+from scripts.import_logging import add_verbosity_arguments, configure_logging, get_logger, level_from_args
+
+logger = get_logger("rederive_metadata")
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_CHUNK_URLS = 5_000
+# Keys listed per kind in the summary; the counts cover all of them
+SUMMARY_KEY_LIMIT = 20
+
+_FIELDS = podcasts_db.RAW_URL_FIELDS
+_GROUP_FIELDS = ("group_code", "group_feature", "group_title")
+URL_REFRESH_DDL = f"""
+CREATE TEMP TABLE IF NOT EXISTS url_refresh (
+    url_id INTEGER PRIMARY KEY,
+    {", ".join(f"{field} TEXT" for field in _FIELDS)}
+)
+"""
+
+
+def derive_chunk(urls: Sequence[str]) -> List[Optional[tuple]]:
+    """import_data.url_metadata() of each URL, None where the current rules cannot parse it."""
+    metadata = []
+    for url in urls:
+        try:
+            metadata.append(import_data.url_metadata(url))
+        except Exception:
+            metadata.append(None)
+    return metadata
+
+
+def _store_chunk(conn: sqlite3.Connection, url_ids: Sequence[int], metadata: Sequence[Optional[tuple]]) -> None:
+    conn.executemany(
+        f"INSERT INTO url_refresh (url_id, {', '.join(_FIELDS)}) VALUES ({', '.join('?' for _ in range(len(_FIELDS) + 1))})",
+        ((url_id,) + (values or (None,) * len(_FIELDS)) for url_id, values in zip(url_ids, metadata))
+    )
+
+
+def refresh_url_metadata(conn: sqlite3.Connection, rules_version: str, all_urls: bool = False,
+                         workers: int = DEFAULT_WORKERS, chunk_urls: int = DEFAULT_CHUNK_URLS) -> int:
+    """
+    Parse the URLs of `raw_urls` that were parsed under other rules than `rules_version` (all of
+    them with `all_urls`) again, `chunk_urls` at a time over `workers` processes, into the temporary
+    table `url_refresh`. Nothing else is written. Returns the number of URLs parsed.
+    """
+    conn.execute(URL_REFRESH_DDL)
+    conn.execute("DELETE FROM url_refresh")
+    where, params = ("", ()) if all_urls else ("WHERE rules_version IS NOT ?", (rules_version,))
+    source = conn.execute(f"SELECT url_id, url FROM raw_urls {where} ORDER BY url_id", params)
+    chunks = iter(lambda: source.fetchmany(chunk_urls), [])
+    parsed = 0
+    if workers <= 1:
+        for chunk in chunks:
+            _store_chunk(conn, [row[0] for row in chunk], derive_chunk([row[1] for row in chunk]))
+            parsed += len(chunk)
+        return parsed
+    # A bounded number of chunks in flight keeps memory flat however many URLs there are
+    pending = collections.deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for chunk in chunks:
+            url_ids = [row[0] for row in chunk]
+            pending.append((url_ids, executor.submit(derive_chunk, [row[1] for row in chunk])))
+            if len(pending) >= 2 * workers:
+                url_ids, future = pending.popleft()
+                _store_chunk(conn, url_ids, future.result())
+                parsed += len(url_ids)
+        while pending:
+            url_ids, future = pending.popleft()
+            _store_chunk(conn, url_ids, future.result())
+            parsed += len(url_ids)
+    return parsed
+
+
+def _resolve_refreshed_titles(conn: sqlite3.Connection) -> None:
+    """
+    Replace the normalized titles in `url_refresh` by their canonical titles, URL by URL in the
+    order the imports first saw them, as a re-import would.
+    """
+    resolver = title_resolution.resolver_for(conn)
+    rows = conn.execute("""
+        SELECT f.url_id, f.group_code, f.group_feature, f.group_title FROM url_refresh f
+        LEFT JOIN (SELECT url_id, MIN(sheet_id * 4294967296 + row_no) AS first_seen FROM raw_rows GROUP BY url_id) o
+            ON o.url_id = f.url_id
+        WHERE f.group_title IS NOT NULL
+        ORDER BY o.first_seen IS NULL, o.first_seen, f.url_id
+    """).fetchall()
+    conn.executemany("UPDATE url_refresh SET group_title = ? WHERE url_id = ?",
+                     [(resolver.resolve(code, feature, title), url_id) for url_id, code, feature, title in rows])
+    resolver.flush(conn, None)
+
+
+def _key_changes(conn: sqlite3.Connection) -> Dict[str, object]:
+    """
+    How the refreshed metadata in `url_refresh` regroups `raw_urls`: a merged key collects the
+    URLs of several current keys, a split key has its URLs spread over several new keys.
+    """
+    differs = " OR ".join(f"r.{field} IS NOT u.{field}" for field in _FIELDS)
+    regrouped = " OR ".join(f"r.{field} IS NOT u.{field}" for field in _GROUP_FIELDS)
+    changed, moved = conn.execute(
+        f"SELECT COALESCE(SUM({differs}), 0), COALESCE(SUM({regrouped}), 0) FROM url_refresh r JOIN raw_urls u USING (url_id)"
+    ).fetchone()
+    # The old and new grouping key of every URL; URLs that were not refreshed keep theirs
+    keys = f"""
+        SELECT u.group_code AS old_code, u.group_feature AS old_feature, u.group_title AS old_title,
+               {', '.join(f'CASE WHEN r.url_id IS NULL THEN u.{field} ELSE r.{field} END AS new_{field[6:]}' for field in _GROUP_FIELDS)}
+        FROM raw_urls u LEFT JOIN url_refresh r USING (url_id)
+    """
+
+    def regrouped_keys(side: str, other: str) -> Tuple[int, List[Tuple[Tuple[str, str, str], int]]]:
+        rows = conn.execute(f"""
+            SELECT {side}_code, {side}_feature, {side}_title, COUNT(DISTINCT {other}_code || char(31) || {other}_feature || char(31) || {other}_title)
+            FROM ({keys})
+            WHERE {side}_title IS NOT NULL AND {other}_title IS NOT NULL
+            GROUP BY {side}_code, {side}_feature, {side}_title
+            HAVING COUNT(DISTINCT {other}_code || char(31) || {other}_feature || char(31) || {other}_title) > 1
+            ORDER BY 4 DESC, 1, 2, 3
+        """).fetchall()
+        return len(rows), [((code, feature, title), count) for code, feature, title, count in rows[:SUMMARY_KEY_LIMIT]]
+
+    merged_count, merged = regrouped_keys("new", "old")
+    split_count, split = regrouped_keys("old", "new")
+    return {'urls_changed': changed, 'urls_regrouped': moved,
+            'merged_keys': merged_count, 'merged': merged, 'split_keys': split_count, 'split': split}
+
+
+def rederive_metadata(conn: sqlite3.Connection, apply: bool = True, all_urls: bool = False,
+                      workers: int = DEFAULT_WORKERS, chunk_urls: int = DEFAULT_CHUNK_URLS) -> Dict[str, object]:
+    """
+    Re-derive URL metadata with the current rules and rebuild `podcasts` from the raw rows with
+    it, in one transaction that is committed only with `apply`. Returns the summary of
+    raw_rows.rederive_podcasts() plus 'urls_checked', 'urls_changed', 'urls_regrouped',
+    'merged_keys' / 'split_keys' (counts) and 'merged' / 'split' (the first SUMMARY_KEY_LIMIT keys
+    with the number of keys they were merged from or split into). Raises ValueError if `podcasts`
+    holds rows without raw rows.
+    """
+    rules_version = import_data.get_rules_version()
+    missing = raw_rows.rows_without_raw_data(conn)
+    if missing:
+        raise ValueError(f"{missing} row(s) in podcasts have no raw rows to re-derive metadata from "
+                         f"(imported before raw rows were kept); re-import their files once first")
+    checked = refresh_url_metadata(conn, rules_version, all_urls=all_urls, workers=workers, chunk_urls=chunk_urls)
+
+    def apply_refresh(conn: sqlite3.Connection) -> Dict[str, object]:
+        _resolve_refreshed_titles(conn)
+        changes = _key_changes(conn)
+        conn.execute(f"""
+            UPDATE raw_urls SET {', '.join(f'{field} = r.{field}' for field in _FIELDS)}, rules_version = ?
+            FROM url_refresh r WHERE r.url_id = raw_urls.url_id
+        """, (rules_version,))
+        raw_rows.fill_display_titles(conn)
+        # The replay stands in for re-importing these files under the current rules
+        conn.execute("""
+            UPDATE import_manifest SET rules_version = ?
+            WHERE rules_version IS NOT ? AND EXISTS (
+                SELECT 1 FROM imports i
+                WHERE i.status = 'imported' AND i.file_sha256 = import_manifest.file_sha256 AND i.filename = import_manifest.filename
+                  AND EXISTS (SELECT 1 FROM raw_sheets s WHERE s.import_id = i.import_id)
+            )
+        """, (rules_version, rules_version))
+        return dict(changes, urls_checked=checked)
+
+    try:
+        summary = raw_rows.rederive_podcasts(conn, apply=apply, before_replay=apply_refresh)
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.url_refresh")
+    if apply:
+        logger.debug("Re-derived the metadata of %d URL(s) under rules %s: %d changed, %d regrouped, "
+                     "%d key(s) merged, %d split", summary['urls_checked'], rules_version, summary['urls_changed'],
+                     summary['urls_regrouped'], summary['merged_keys'], summary['split_keys'])
+    return summary
+
+
+def _format_key(key: Tuple[str, str, str]) -> str:
+    return " / ".join(key)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Re-derive code, feature, title, created_at and grouping keys of imported URLs "
+                                        "with the current filename rules, without re-importing any workbook.")
+    parser.add_argument("--db", default=podcasts_db.DEFAULT_DB_PATH, help=f"Database to work on (default: {podcasts_db.DEFAULT_DB_PATH})")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change in a transaction that is rolled back")
+    parser.add_argument("--all", dest="all_urls", action="store_true",
+                        help="Parse every URL again, not only those parsed under other rules")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Parser processes (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--chunk-urls", type=int, default=DEFAULT_CHUNK_URLS,
+                        help=f"URLs per chunk handed to a worker (default: {DEFAULT_CHUNK_URLS})")
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    configure_logging(level_from_args(args))
+    conn = podcasts_db.connect(args.db)
+    try:
+        try:
+            summary = rederive_metadata(conn, apply=not args.dry_run, all_urls=args.all_urls,
+                                        workers=args.workers, chunk_urls=args.chunk_urls)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if not summary['urls_checked']:
+            print(f"Every URL is already parsed under the current rules ({import_data.get_rules_version()})")
+        print(f"{'Would re-derive' if args.dry_run else 'Re-derived'} {summary['urls_checked']} URL(s): "
+              f"{summary['urls_changed']} with new metadata, {summary['urls_regrouped']} under a new grouping key")
+        print(f"Keys: {summary['merged_keys']} merged, {summary['split_keys']} split")
+        for label, keys in (("merged from", summary['merged']), ("split into", summary['split'])):
+            for key, count in keys:
+                print(f"  {_format_key(key)}  ({label} {count} keys)")
+        print(f"Rows: {summary['rows_before']} -> {summary['rows_after']} from {summary['imports']} import(s), "
+              f"{summary['added']} added, {summary['removed']} removed, {summary['changed']} changed")
+    finally:
+        conn.close()
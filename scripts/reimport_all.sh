@@ -1,6 +1,8 @@
 #!/bin/bash
 
-# Script to clear the database and re-import all podcast log data.
+# Script to rebuild the database from all podcast log data.
+# The new database is built beside the live one and swapped in when complete (--reset-db),
+# so the app keeps serving the current data during the re-import.
 
 # Exit immediately if a command exits with a non-zero status.
 set -e
@@ -8,17 +10,17 @@ set -e
 DB_PATH="data/podcasts.db"
 LOGS_DIR="data/podcast_logs"
 IMPORT_SCRIPT="scripts/import_data.py"
+BATCH_SCRIPT="scripts/batch_import.py"
+# Parser processes; override with WORKERS=8 scripts/reimport_all.sh
+WORKERS="${WORKERS:-$(nproc 2>/dev/null || echo 4)}"
 
 # --- Safety check for python script ---
-if [ ! -f "$IMPORT_SCRIPT" ]; then
-    echo "Error: Import script not found at $IMPORT_SCRIPT" >&2
-    exit 1
-fi
-
-# --- Clear the database ---
-echo "🗑️  Clearing the database: $DB_PATH ..."
-rm -f "$DB_PATH"
-echo "✅ Database cleared."
+for script in "$IMPORT_SCRIPT" "$BATCH_SCRIPT"; do
+    if [ ! -f "$script" ]; then
+        echo "Error: Import script not found at $script" >&2
+        exit 1
+    fi
+done
 
 # --- Define the order of files ---
 # Monthly files first, sorted chronologically
@@ -27,36 +29,32 @@ echo "✅ Database cleared."
 # Specific report file(s) to process last
 report_file_main="$LOGS_DIR/report0416.xlsx"
 
-# --- Process monthly files ---
+# --- Collect monthly files ---
 echo "
-🔄 Processing monthly log files..."
-find "$LOGS_DIR" -maxdepth 1 -type f -name "[0-9][0-9][0-9][0-9][0-1][0-9][0-3][0-9]_podcast_downloads.xlsx" | sort | \
+🔄 Collecting monthly log files..."
+monthly_files=()
 while IFS= read -r file_path; do
-    if [ -f "$file_path" ]; then
-        echo "
-👉 Importing Monthly: $file_path ..."
-        python "$IMPORT_SCRIPT" "$file_path"
-    else
-        # This condition might be unlikely if find just found it, but good practice
-        echo "⚠️ Warning: Monthly file $file_path somehow not found during processing, skipping." >&2
-    fi
-done
-echo "✅ Monthly log files processed."
+    monthly_files+=("$file_path")
+done < <(find "$LOGS_DIR" -maxdepth 1 -type f -name "[0-9][0-9][0-9][0-9][0-1][0-9][0-3][0-9]_podcast_downloads.xlsx" | sort)
+echo "✅ Found ${#monthly_files[@]} monthly log files."
 
-# --- Process the main report file ---
-echo "
-🔄 Processing main report file..."
+report_files=()
 if [ -f "$report_file_main" ]; then
-    echo "
-👉 Importing $report_file_main ..."
-    python "$IMPORT_SCRIPT" "$report_file_main"
-    echo "✅ Main report file processed."
+    report_files+=("$report_file_main")
 else
     echo "⚠️ Error: Main report file $report_file_main not found!" >&2
     # Decide if this should be a fatal error for your workflow
     # exit 1 
 fi
 
+# --- Import everything in one interpreter ---
+# Workbooks are parsed in parallel worker processes; a single writer applies them monthly files
+# first (chronologically), then the report file, exactly like importing them one by one.
+echo "
+🔄 Rebuilding $DB_PATH from ${#monthly_files[@]} monthly file(s) and ${#report_files[@]} report file(s) with $WORKERS worker(s)..."
+python "$BATCH_SCRIPT" --reset-db --workers "$WORKERS" "${monthly_files[@]}" "${report_files[@]}"
+echo "✅ All files processed."
+
 echo "
 🎉 All data re-imported successfully!"
 
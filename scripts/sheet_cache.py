@@ -0,0 +1,257 @@
+"""
+On-disk cache of parsed sheets, stored as Parquet under data/cache/.
+
+Reading a sheet (its XML plus hyperlink relationships) is the expensive part of an import, so the
+row records `read_sheet` builds are cached per workbook content hash, sheet name and reader
+version. A rebuild of the database (--reset-db, a schema change) then reads Parquet instead of
+XML for every workbook it has seen before.
+
+Records are stored column-wise with one typed Parquet column per Python type present in a column
+(str/int/float/bool), so values round-trip exactly: ints stay ints, floats stay floats and None
+stays None. Sheets whose values cannot be represented (e.g. integers beyond 64 bits) are simply
+not cached.
+
+Sheets are streamed in both directions: `RecordsWriter` encodes records chunk by chunk as the
+sheet is read and `load_record_batches` decodes a cached sheet one batch at a time, so only the
+columnar Arrow copy of a sheet is ever held whole, never its records.
+
+Eviction is LRU by total size: a cache hit touches the file's mtime and, after every store, the
+least recently used files are removed until the cache fits in `max_bytes`.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scripts.import_logging import get_logger
+
+logger = get_logger("sheet_cache")
+
+DEFAULT_CACHE_DIR = os.path.join("data", "cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_BATCH_ROWS = 50_000
+
+_METADATA_KEY = b"sheet_cache"
+_ARROW_TYPES = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+_KINDS_BY_NAME = {kind.__name__: kind for kind in _ARROW_TYPES}
+_MISSING = object()
+
+
+def cache_path(sha256: str, sheet_name: str, reader_version: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    # Sheet names can hold any character, so they are hashed into the filename
+    sheet_key = hashlib.sha1(sheet_name.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{sha256}_{sheet_key}_{reader_version}.parquet")
+
+
+def _encode(records: List[Dict[str, object]], columns: List[str]) -> pa.Table:
+    """
+    Records as typed Arrow columns named "<position>:<type>". `columns` holds the record keys seen so
+    far in position order and is extended with new keys, so the chunks of one sheet share positions.
+    """
+    for key in dict.fromkeys(key for record in records for key in record):
+        if key not in columns:
+            columns.append(key)
+    arrays = {}
+    for position, column in enumerate(columns):
+        values = [record.get(column, _MISSING) for record in records]
+        kinds = {type(value) for value in values} - {type(None), type(_MISSING)}
+        unsupported = kinds - set(_ARROW_TYPES)
+        if unsupported:
+            raise TypeError(f"Cannot cache values of type {sorted(kind.__name__ for kind in unsupported)} in column '{column}'")
+        for kind in kinds:
+            arrays[f"{position}:{kind.__name__}"] = pa.array(
+                [value if type(value) is kind else None for value in values], type=_ARROW_TYPES[kind]
+            )
+        if any(value is _MISSING for value in values):
+            arrays[f"{position}:present"] = pa.array([value is not _MISSING for value in values], type=pa.bool_())
+    return pa.Table.from_pydict(arrays)
+
+
+def _combine(chunks: List[Tuple[pa.Table, int]], columns: List[str]) -> pa.Table:
+    """
+    One table from the encoded chunks of a sheet, each paired with the number of columns known when
+    it was encoded. A typed column missing from a chunk is all null there; a missing "present"
+    column is all True for columns the chunk knew (none of its records lacked them), else all False.
+    """
+    fields = {}
+    for table, _ in chunks:
+        for field in table.schema:
+            fields.setdefault(field.name, field.type)
+    for position in range(min(known for _, known in chunks), len(columns)):
+        # Columns first seen after the first chunk are absent from the earlier ones
+        fields.setdefault(f"{position}:present", pa.bool_())
+    tables = []
+    for table, known in chunks:
+        arrays = {}
+        for name, kind in fields.items():
+            if name in table.column_names:
+                arrays[name] = table.column(name)
+            elif name.endswith(":present"):
+                arrays[name] = pa.array([int(name.split(":", 1)[0]) < known] * table.num_rows, type=pa.bool_())
+            else:
+                arrays[name] = pa.nulls(table.num_rows, type=kind)
+        tables.append(pa.table(arrays))
+    combined = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+    metadata = {_METADATA_KEY: json.dumps({"columns": columns, "rows": combined.num_rows}).encode("utf-8")}
+    return combined.replace_schema_metadata(metadata)
+
+
+def _decode(table: pa.Table, columns: List[str]) -> List[Dict[str, object]]:
+    row_count = table.num_rows
+    children: Dict[int, Dict[str, list]] = {position: {} for position in range(len(columns))}
+    for name in table.column_names:
+        position, kind = name.split(":", 1)
+        children[int(position)][kind] = table.column(name).to_pylist()
+
+    value_lists, present_lists = [], []
+    for position in range(len(columns)):
+        present_lists.append(children[position].pop("present", None))
+        typed = [values for kind, values in children[position].items() if kind in _KINDS_BY_NAME]
+        if not typed:
+            value_lists.append([None] * row_count)
+        elif len(typed) == 1:
+            value_lists.append(typed[0])
+        else:
+            # Exactly one typed child holds each row's value
+            value_lists.append([next((value for value in row if value is not None), None) for row in zip(*typed)])
+
+    if all(present is None for present in present_lists):
+        return [dict(zip(columns, row)) for row in zip(*value_lists)] if columns else [{} for _ in range(row_count)]
+    records = []
+    for row in range(row_count):
+        records.append({
+            column: values[row]
+            for column, values, present in zip(columns, value_lists, present_lists)
+            if present is None or present[row]
+        })
+    return records
+
+
+def load_record_batches(sha256: str, sheet_name: str, reader_version: str, batch_rows: int = DEFAULT_BATCH_ROWS,
+                        cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[Tuple[int, Iterator[List[Dict[str, object]]]]]:
+    """
+    (row count, iterator of record lists of up to `batch_rows` records) for a cached sheet, or None
+    on a miss (or a cache file whose footer cannot be read).
+    """
+    path = cache_path(sha256, sheet_name, reader_version, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        parquet_file = pq.ParquetFile(path)
+        columns = json.loads(parquet_file.schema_arrow.metadata[_METADATA_KEY])["columns"]
+    except Exception as e:
+        logger.warning("Warning: Ignoring unreadable sheet cache file %s: %s", path, e)
+        return None
+    try:
+        os.utime(path)  # Mark as recently used for LRU eviction
+    except OSError:
+        pass
+
+    def batches():
+        with parquet_file:
+            for batch in parquet_file.iter_batches(batch_size=batch_rows):
+                yield _decode(pa.Table.from_batches([batch]), columns)
+
+    return parquet_file.metadata.num_rows, batches()
+
+
+def load_records(sha256: str, sheet_name: str, reader_version: str,
+                 cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[List[Dict[str, object]]]:
+    """Cached records for the sheet, or None on a miss (or an unreadable cache file)."""
+    loaded = load_record_batches(sha256, sheet_name, reader_version, cache_dir=cache_dir)
+    if loaded is None:
+        return None
+    try:
+        return [record for batch in loaded[1] for record in batch]
+    except Exception as e:
+        logger.warning("Warning: Ignoring unreadable sheet cache file %s: %s",
+                       cache_path(sha256, sheet_name, reader_version, cache_dir), e)
+        return None
+
+
+class RecordsWriter:
+    """
+    Caches a sheet's records as they are read: `add` encodes each chunk, `close` writes the file.
+    A chunk that cannot be encoded turns the writer off for the sheet (with a warning).
+    """
+
+    def __init__(self, sha256: str, sheet_name: str, reader_version: str, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = cache_path(sha256, sheet_name, reader_version, cache_dir)
+        self.sheet_name = sheet_name
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.columns: List[str] = []
+        self.chunks: List[Tuple[pa.Table, int]] = []
+        self.failed = False
+
+    def add(self, records: List[Dict[str, object]]) -> None:
+        if self.failed or not records:
+            return
+        try:
+            self.chunks.append((_encode(records, self.columns), len(self.columns)))
+        except Exception as e:
+            logger.warning("Warning: Not caching sheet '%s': %s", self.sheet_name, e)
+            self.failed = True
+            self.chunks = []
+
+    def close(self) -> bool:
+        """Write the cache file; returns False (and caches nothing) if there is nothing to store or it fails."""
+        if self.failed or not self.chunks:
+            return False
+        try:
+            table = _combine(self.chunks, self.columns)
+            self.chunks = []
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write then rename, so concurrent workers never read a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            try:
+                pq.write_table(table, tmp_path, row_group_size=DEFAULT_BATCH_ROWS)
+                os.replace(tmp_path, self.path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except Exception as e:
+            logger.warning("Warning: Not caching sheet '%s': %s", self.sheet_name, e)
+            return False
+        evict(self.cache_dir, self.max_bytes)
+        return True
+
+
+def store_records(records: List[Dict[str, object]], sha256: str, sheet_name: str, reader_version: str,
+                  cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> bool:
+    """Cache the sheet's records; returns False (and caches nothing) if they cannot be stored."""
+    writer = RecordsWriter(sha256, sheet_name, reader_version, cache_dir, max_bytes)
+    writer.add(records)
+    return writer.close()
+
+
+def evict(cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> int:
+    """Remove least recently used cache files until the cache fits in `max_bytes`. Returns bytes freed."""
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.is_file() and entry.name.endswith(".parquet")]
+    except FileNotFoundError:
+        return 0
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    freed = 0
+    for _, size, path in sorted(files):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
@@ -0,0 +1,249 @@
+"""
+Which normalized titles name the same episode.
+
+normalize_title_for_grouping_key() (scripts/import_data.py) reduces a title to its lower-case
+alphanumeric words. Titles that still differ, e.g. spelling variants or a word added in one file,
+are matched here: within a block of titles that share code, feature and numbers (an episode number
+or date never matches a different one), by the Jaccard similarity of their character trigrams,
+at DEFAULT_SIMILARITY_THRESHOLD or above. Candidates come from a prefix-filter index: each
+canonical title is indexed under only the first few of its trigrams (in one fixed global order),
+few enough that any title similar enough must share one of them. Only titles sharing an indexed
+trigram are compared, so the number of comparisons stays close to linear in the catalog size.
+
+Every normalized title seen is recorded in `title_aliases` (scripts/podcasts_db.py) with the
+canonical title it resolved to: its own when nothing matched, otherwise that of the most similar
+canonical title (the first one on ties). Later imports look titles up there first, so a known
+title costs one dict lookup and only new titles are matched. Aliases are never rewritten, so a
+title keeps its canonical title as the catalog grows, also when the import that added it is undone.
+A canonical title also keeps the display title of the episode as the import that added it wrote
+it; rows of the same episode in later files get that title, so they add up under one name.
+
+Imports resolve titles while writing (import_data.resolve_sheet_titles), file by file in write
+order, so what a file is merged with does not depend on how many workers parsed the batch.
+
+Usage:
+    python scripts/title_resolution.py                 # catalog size and merged titles
+    python scripts/title_resolution.py --list 50       # the latest titles merged into another
+"""
+import math
+import os
+import re
+import sqlite3
+import sys
+import zlib
+from argparse import ArgumentParser
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Add project root to sys.path so sibling modules resolve when run as a script
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from scripts import podcasts_db
+from scripts.import_logging import add_verbosity_arguments, configure_logging, get_logger, level_from_args
+
+logger = get_logger("title_resolution")
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+DEFAULT_LIST_LIMIT = 20
+
+
+def trigrams(title: str) -> FrozenSet[str]:
+    padded = f" {title} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the character trigrams of two normalized titles."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def _block(code: str, feature: str, title: str) -> tuple:
+    return (code, feature) + tuple(str(int(number)) for number in re.findall(r"\d+", title))
+
+
+_gram_ranks: Dict[str, Tuple[int, str]] = {}
+
+
+def _gram_order(gram: str) -> Tuple[int, str]:
+    # Any fixed order keeps the prefix filter exact; a hash spreads common trigrams out of the prefixes
+    rank = _gram_ranks.get(gram)
+    if rank is None:
+        rank = _gram_ranks[gram] = (zlib.crc32(gram.encode("utf-8")), gram)
+    return rank
+
+
+def _matchable(title: str) -> bool:
+    # Placeholders for missing titles (see normalize_title_for_grouping_key) only ever match themselves
+    return not title.startswith("_")
+
+
+class _Catalog:
+    """Canonical titles per block, with a prefix-filter index for matches at `threshold` or above."""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.titles: Dict[Tuple[tuple, str], Tuple[int, FrozenSet[str]]] = {}
+        self.index: Dict[Tuple[tuple, str], List[str]] = defaultdict(list)
+
+    def prefix(self, grams: FrozenSet[str]) -> List[str]:
+        size = len(grams)
+        return sorted(grams, key=_gram_order)[:size - math.ceil(self.threshold * size - 1e-9) + 1]
+
+    def add(self, block: tuple, title: str, grams: FrozenSet[str], prefix: List[str]) -> None:
+        self.titles[(block, title)] = (len(self.titles), grams)
+        for gram in prefix:
+            self.index[(block, gram)].append(title)
+
+    def best_match(self, block: tuple, grams: FrozenSet[str], prefix: List[str]) -> Tuple[Optional[str], float]:
+        """The most similar title of `block` at the threshold or above (first added on ties), or (None, 0)."""
+        best, best_score, best_seq = None, 0.0, None
+        seen = set()
+        for gram in prefix:
+            for title in self.index.get((block, gram), ()):
+                if title in seen:
+                    continue
+                seen.add(title)
+                seq, candidate = self.titles[(block, title)]
+                if not self.threshold * len(grams) <= len(candidate) <= len(grams) / self.threshold:
+                    continue
+                shared = len(grams & candidate)
+                score = shared / (len(grams) + len(candidate) - shared)
+                if score >= self.threshold and (score > best_score or (score == best_score and seq < best_seq)):
+                    best, best_score, best_seq = title, score, seq
+        return best, best_score
+
+
+class TitleResolver:
+    """
+    The title catalog of a database (`title_aliases`) plus the titles resolved since it was loaded.
+    New aliases stay pending until flush() writes them; discard() drops them, and the next load()
+    picks up whatever was committed.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.aliases: Dict[Tuple[str, str, str], str] = {}
+        self.display_titles: Dict[Tuple[str, str, str], Optional[str]] = {}
+        self.catalog = _Catalog(threshold)
+        self.loaded_id = 0
+        self.discard()
+
+    def load(self, conn: sqlite3.Connection) -> int:
+        """Add the aliases written since the last load; returns how many."""
+        rows = conn.execute(
+            "SELECT alias_id, group_code, group_feature, alias, canonical, title FROM title_aliases WHERE alias_id > ? ORDER BY alias_id",
+            (self.loaded_id,)
+        ).fetchall()
+        for alias_id, code, feature, alias, canonical, title in rows:
+            self.aliases[(code, feature, alias)] = canonical
+            if alias == canonical:
+                if _matchable(alias):
+                    grams = trigrams(alias)
+                    self.catalog.add(_block(code, feature, alias), alias, grams, self.catalog.prefix(grams))
+                self.display_titles[(code, feature, alias)] = title
+            self.loaded_id = alias_id
+        return len(rows)
+
+    def discard(self) -> None:
+        self.pending: Dict[Tuple[str, str, str], str] = {}
+        self.pending_catalog = _Catalog(self.threshold)
+        self.pending_titles: Dict[Tuple[str, str, str], Optional[str]] = {}
+        self.new_aliases: List[Tuple[str, str, str, str, float]] = []
+
+    def display_title(self, code: str, feature: str, canonical: str, title: str) -> str:
+        """
+        The display title of the episode with canonical title `canonical`. A canonical title added
+        since the last load takes `title`, the first one asked for, as its display title.
+        """
+        key = (code, feature, canonical)
+        if key in self.pending_titles:
+            if self.pending_titles[key] is None:
+                self.pending_titles[key] = title
+            return self.pending_titles[key]
+        return self.display_titles.get(key) or title
+
+    def resolve(self, code: str, feature: str, title: str) -> str:
+        """Canonical title of normalized `title` in the (code, feature) block of a grouping key."""
+        key = (code, feature, title)
+        canonical = self.aliases.get(key) or self.pending.get(key)
+        if canonical is not None:
+            return canonical
+        canonical, score = None, 1.0
+        if _matchable(title):
+            block = _block(code, feature, title)
+            grams = trigrams(title)
+            prefix = self.catalog.prefix(grams)
+            canonical, score = self.catalog.best_match(block, grams, prefix)
+            pending_match, pending_score = self.pending_catalog.best_match(block, grams, prefix)
+            if pending_match is not None and pending_score > score:
+                canonical, score = pending_match, pending_score
+            if canonical is None:
+                self.pending_catalog.add(block, title, grams, prefix)
+        if canonical is None:
+            canonical, score = title, 1.0
+            self.pending_titles[key] = None
+        self.pending[key] = canonical
+        self.new_aliases.append((code, feature, title, canonical, score))
+        return canonical
+
+    def flush(self, conn: sqlite3.Connection, import_id: Optional[int]) -> int:
+        """Write the pending aliases as part of `import_id`, in the caller's transaction; returns how many."""
+        created_at = datetime.now().isoformat()
+        conn.executemany(
+            "INSERT OR IGNORE INTO title_aliases (group_code, group_feature, alias, canonical, similarity, title, import_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (alias + (self.pending_titles.get(alias[:3]), import_id, created_at) for alias in self.new_aliases)
+        )
+        count = len(self.new_aliases)
+        self.discard()
+        return count
+
+
+_cached: Tuple[Optional[tuple], Optional[TitleResolver]] = (None, None)
+
+
+def resolver_for(conn: sqlite3.Connection, threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> TitleResolver:
+    """
+    A resolver with the catalog of the database behind `conn`, without pending aliases. The last
+    one is kept per process and topped up with the aliases written since, so a batch loads the
+    catalog once rather than once per file.
+    """
+    global _cached
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    # A rebuild swaps a new file in under the same path
+    key = (path, os.stat(path).st_ino, threshold) if path else None
+    resolver = _cached[1] if key is not None and _cached[0] == key else None
+    if resolver is None or conn.execute("SELECT COALESCE(MAX(alias_id), 0) FROM title_aliases").fetchone()[0] < resolver.loaded_id:
+        resolver = TitleResolver(threshold)
+        _cached = (key, resolver)
+    resolver.discard()
+    resolver.load(conn)
+    return resolver
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Inspect the title catalog that grouping keys are resolved against.")
+    parser.add_argument("--db", default=podcasts_db.DEFAULT_DB_PATH, help=f"Database to work on (default: {podcasts_db.DEFAULT_DB_PATH})")
+    parser.add_argument("--list", type=int, nargs="?", const=DEFAULT_LIST_LIMIT, metavar="N",
+                        help=f"List the latest N titles merged into another one (default: {DEFAULT_LIST_LIMIT})")
+    add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    configure_logging(level_from_args(args))
+    conn = podcasts_db.connect(args.db)
+    try:
+        titles, canonical = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(alias = canonical), 0) FROM title_aliases"
+        ).fetchone()
+        print(f"{titles} title(s) in {canonical} canonical title(s); {titles - canonical} merged into another")
+        if args.list:
+            for code, feature, alias, target, score, import_id in conn.execute("""
+                SELECT group_code, group_feature, alias, canonical, similarity, import_id FROM title_aliases
+                WHERE alias != canonical ORDER BY alias_id DESC LIMIT ?
+            """, (args.list,)):
+                print(f"{score:5.2f}  {code} / {feature}: '{alias}' -> '{target}'  (import {import_id if import_id is not None else '-'})")
+    finally:
+        conn.close()
@@ -0,0 +1,430 @@
+"""
+Streaming .xlsx reader that works directly on the raw worksheet XML.
+
+openpyxl's read-only mode does not expose hyperlinks, so the import used to load every
+workbook in full mode and build the complete cell object graph just to get at the link
+targets of the URL/Downloads column. This reader streams `xl/worksheets/sheetN.xml`
+and its `_rels` relationships straight from the zip with an incremental XML parser and
+yields one (row index, resolved URL, cell values) tuple per row, so memory stays flat
+regardless of sheet size. Only the shared string table, the style → date-format index
+and the link targets of the URL column are kept in memory.
+
+Cell values are converted exactly like openpyxl does with `data_only=False` (numbers,
+booleans, dates for date-formatted cells, formulas as "=..." strings), which keeps the
+rows identical to the openpyxl engine in `import_data.py`.
+"""
+import posixpath
+import re
+import zipfile
+from collections import namedtuple
+from xml.etree.ElementTree import iterparse
+
+from openpyxl.formula.translate import Translator
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, from_ISO8601
+from openpyxl.cell.text import Text
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+STRICT_OFFICE_DOCUMENT_REL = "http://purl.oclc.org/ooxml/officeDocument/relationships/officeDocument"
+
+ROW_TAG = f"{{{SHEET_MAIN_NS}}}row"
+CELL_TAG = f"{{{SHEET_MAIN_NS}}}c"
+VALUE_TAG = f"{{{SHEET_MAIN_NS}}}v"
+FORMULA_TAG = f"{{{SHEET_MAIN_NS}}}f"
+INLINE_STRING_TAG = f"{{{SHEET_MAIN_NS}}}is"
+SHEET_DATA_TAG = f"{{{SHEET_MAIN_NS}}}sheetData"
+HYPERLINK_TAG = f"{{{SHEET_MAIN_NS}}}hyperlink"
+HYPERLINKS_TAG = f"{{{SHEET_MAIN_NS}}}hyperlinks"
+RELATIONSHIP_TAG = f"{{{PKG_REL_NS}}}Relationship"
+REL_ID_ATTR = f"{{{REL_NS}}}id"
+
+URL_HEADERS = ("URL", "Downloads")
+
+CELL_REF_PATTERN = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+
+SheetScan = namedtuple("SheetScan", ["headers", "url_col_idx", "max_row", "max_col", "url_links"])
+
+
+def column_index(letters: str) -> int:
+    """Convert column letters ('A', 'AB') to a 1-based column index."""
+    idx = 0
+    for ch in letters.upper():
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx
+
+
+def split_cell_ref(ref: str):
+    """Split 'B12' into (row, column); returns (None, None) if the reference is malformed."""
+    match = CELL_REF_PATTERN.match(ref or "")
+    if not match:
+        return None, None
+    return int(match.group(2)), column_index(match.group(1))
+
+
+def _cast_number(value: str):
+    """Convert numbers as string to an int or float (same rule as openpyxl)."""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _parse_row_number(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        val = float(value)
+        if val.is_integer():
+            return int(val)
+        raise ValueError(f"{value} is not a valid row number")
+
+
+class XlsxStreamReader:
+    """
+    Reads worksheets of an .xlsx file from a single zip handle.
+
+    The workbook part, its relationships, the shared strings and the date styles are read
+    once when the reader is opened; every sheet is then streamed on demand.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.archive = zipfile.ZipFile(filepath)
+        try:
+            self._workbook_path = self._find_workbook_path()
+            self._workbook_rels = self._read_relationships(
+                self._rels_path_for(self._workbook_path), posixpath.dirname(self._workbook_path))
+            self._sheet_paths, self.epoch = self._read_workbook()
+            self.sheetnames = list(self._sheet_paths)
+            self.shared_strings = self._read_shared_strings()
+            self.date_formats, self.timedelta_formats = self._read_date_styles()
+        except Exception:
+            self.archive.close()
+            raise
+        self._scans = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        self.archive.close()
+
+    # --- Package structure -------------------------------------------------
+
+    def _read_relationships(self, rels_path: str, base_dir: str) -> dict:
+        """Map relationship ids to (type, resolved part path, raw Target attribute) for a part."""
+        rels = {}
+        try:
+            src = self.archive.open(rels_path)
+        except KeyError:
+            return rels
+        with src:
+            for _, node in iterparse(src):
+                if node.tag == RELATIONSHIP_TAG:
+                    target = node.get("Target", "")
+                    mode = node.get("TargetMode")
+                    if mode != "External":
+                        if target.startswith("/"):
+                            target = target.lstrip("/")
+                        else:
+                            target = posixpath.normpath(posixpath.join(base_dir, target))
+                    rels[node.get("Id")] = (node.get("Type"), target, node.get("Target"))
+        return rels
+
+    def _read_link_targets(self, rels_path: str) -> dict:
+        """
+        Map relationship ids to their raw Target attribute only, for the hyperlinks of a sheet.
+        Sheets can hold one relationship per row, so parsed elements are dropped as they are read
+        and equal targets share one string.
+        """
+        targets, strings = {}, {}
+        try:
+            src = self.archive.open(rels_path)
+        except KeyError:
+            return targets
+        with src:
+            root = None
+            for event, node in iterparse(src, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = node
+                    continue
+                if node.tag == RELATIONSHIP_TAG:
+                    target = node.get("Target")
+                    targets[node.get("Id")] = strings.setdefault(target, target) if target is not None else None
+                    root.clear()
+        return targets
+
+    @staticmethod
+    def _rels_path_for(part_path: str) -> str:
+        folder, name = posixpath.split(part_path)
+        return posixpath.join(folder, "_rels", f"{name}.rels")
+
+    def _find_workbook_path(self) -> str:
+        for rel_type, target, _ in self._read_relationships("_rels/.rels", "").values():
+            if rel_type in (OFFICE_DOCUMENT_REL, STRICT_OFFICE_DOCUMENT_REL):
+                return target
+        return "xl/workbook.xml"
+
+    def _read_workbook(self):
+        """Return ({sheet name: worksheet part path}, date epoch) in workbook order."""
+        rels = self._workbook_rels
+        sheet_paths = {}
+        epoch = WINDOWS_EPOCH
+        with self.archive.open(self._workbook_path) as src:
+            for _, node in iterparse(src):
+                tag = node.tag.rsplit("}", 1)[-1]
+                if tag == "workbookPr":
+                    if node.get("date1904") in ("1", "true"):
+                        epoch = MAC_EPOCH
+                elif tag == "sheet":
+                    rel_id = node.get(REL_ID_ATTR)
+                    if rel_id and rel_id in rels:
+                        sheet_paths[node.get("name")] = rels[rel_id][1]
+        return sheet_paths, epoch
+
+    def _read_shared_strings(self) -> list:
+        for rel_type, target, _ in self._workbook_rels.values():
+            if rel_type and rel_type.endswith("/sharedStrings"):
+                if target in self.archive.namelist():
+                    with self.archive.open(target) as src:
+                        return read_string_table(src)
+        return []
+
+    def _read_date_styles(self):
+        """Index the cellXfs styles whose number format is a date or a timedelta."""
+        styles_path = None
+        for rel_type, target, _ in self._workbook_rels.values():
+            if rel_type and rel_type.endswith("/styles"):
+                styles_path = target
+        date_formats, timedelta_formats = set(), set()
+        if not styles_path or styles_path not in self.archive.namelist():
+            return date_formats, timedelta_formats
+
+        custom_formats = {}
+        xf_format_ids = []
+        in_cell_xfs = False
+        with self.archive.open(styles_path) as src:
+            for event, node in iterparse(src, events=("start", "end")):
+                tag = node.tag.rsplit("}", 1)[-1]
+                if tag == "cellXfs":
+                    in_cell_xfs = event == "start"
+                elif event == "end" and tag == "numFmt":
+                    custom_formats[int(node.get("numFmtId"))] = node.get("formatCode")
+                elif event == "start" and tag == "xf" and in_cell_xfs:
+                    xf_format_ids.append(int(node.get("numFmtId", 0)))
+
+        for idx, format_id in enumerate(xf_format_ids):
+            fmt = custom_formats.get(format_id, BUILTIN_FORMATS.get(format_id))
+            if is_date_format(fmt):
+                date_formats.add(idx)
+            if is_timedelta_format(fmt):
+                timedelta_formats.add(idx)
+        return date_formats, timedelta_formats
+
+    # --- Cell values -------------------------------------------------------
+
+    def _cell_value(self, element, coordinate, shared_formulae):
+        data_type = element.get("t", "n")
+        style_id = int(element.get("s", 0) or 0)
+
+        formula = element.find(FORMULA_TAG)
+        if formula is not None:
+            value = "=" + (formula.text or "")
+            if formula.get("t") == "shared":
+                idx = formula.get("si")
+                if idx in shared_formulae:
+                    value = shared_formulae[idx].translate_formula(coordinate)
+                elif value != "=":
+                    shared_formulae[idx] = Translator(value, coordinate)
+            return value
+
+        if data_type == "inlineStr":
+            child = element.find(INLINE_STRING_TAG)
+            return Text.from_tree(child).content if child is not None else None
+
+        value = element.findtext(VALUE_TAG, None) or None
+        if value is None:
+            return None
+        if data_type == "n":
+            value = _cast_number(value)
+            if style_id in self.date_formats:
+                try:
+                    value = from_excel(value, self.epoch, timedelta=style_id in self.timedelta_formats)
+                except (OverflowError, ValueError):
+                    value = "#VALUE!"
+            return value
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        return value  # "str" (cached formula string) and "e" (error codes) stay text
+
+    def _iter_sheet_cells(self, sheet_name: str, hyperlinks: bool = True):
+        """
+        Stream (row, column, element) for every cell, then (None, None, element) for every
+        hyperlink unless `hyperlinks` is False, clearing parsed rows and links as it goes.
+        """
+        if sheet_name not in self._sheet_paths:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        with self.archive.open(self._sheet_paths[sheet_name]) as src:
+            sheet_data = None
+            hyperlinks_node = None
+            row_counter = 0
+            for event, node in iterparse(src, events=("start", "end")):
+                if event == "start":
+                    if node.tag == SHEET_DATA_TAG:
+                        sheet_data = node
+                    elif node.tag == HYPERLINKS_TAG:
+                        hyperlinks_node = node
+                    continue
+                if node.tag == SHEET_DATA_TAG and not hyperlinks:
+                    return
+                if node.tag == ROW_TAG:
+                    row_attr = node.get("r")
+                    row_counter = _parse_row_number(row_attr) if row_attr else row_counter + 1
+                    col_counter = 0
+                    for cell in node:
+                        if cell.tag != CELL_TAG:
+                            continue
+                        row, col = split_cell_ref(cell.get("r"))
+                        if row is None:
+                            col_counter += 1
+                            row, col = row_counter, col_counter
+                        else:
+                            col_counter = col
+                        yield row, col, cell
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                elif node.tag == HYPERLINK_TAG:
+                    yield None, None, node
+                    if hyperlinks_node is not None:
+                        hyperlinks_node.clear()
+
+    # --- Sheets --------------------------------------------------------------
+
+    def scan_sheet(self, sheet_name: str) -> SheetScan:
+        """
+        First streaming pass over a sheet: headers, dimensions and the hyperlink targets of
+        the URL column. Hyperlinks are stored after <sheetData>, so they are only known once
+        the whole part has been read.
+        """
+        if sheet_name in self._scans:
+            return self._scans[sheet_name]
+
+        sheet_path = self._sheet_paths.get(sheet_name)
+        if sheet_path is None:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        link_targets = self._read_link_targets(self._rels_path_for(sheet_path))
+
+        header_values = {}
+        url_col, url_col_known = None, False
+        url_links = {}
+        max_row = max_col = 0
+        shared_formulae = {}
+        for row, col, node in self._iter_sheet_cells(sheet_name):
+            if row is None:  # hyperlink element
+                if not url_col_known:
+                    # Links follow <sheetData>, so the header row is complete by now
+                    url_col, url_col_known = self._url_column(header_values), True
+                rel_id = node.get(REL_ID_ATTR)
+                target = link_targets.get(rel_id) if rel_id else None
+                start, _, end = node.get("ref", "").partition(":")
+                min_r, min_c = split_cell_ref(start)
+                max_r, max_c = split_cell_ref(end) if end else (min_r, min_c)
+                if min_r is None or max_r is None:
+                    continue
+                # Hyperlinked cells exist even without a value, so they extend the sheet like in openpyxl
+                max_row, max_col = max(max_row, max_r), max(max_col, max_c)
+                if url_col is not None and min_c <= url_col <= max_c:
+                    for link_row in range(min_r, max_r + 1):
+                        url_links[link_row] = target
+                continue
+            max_row, max_col = max(max_row, row), max(max_col, col)
+            if row == 1:
+                header_values[col] = self._cell_value(node, node.get("r") or "", shared_formulae)
+        max_row, max_col = max(max_row, 1), max(max_col, 1)
+
+        headers = []
+        for col in range(1, max_col + 1):
+            value = header_values.get(col)
+            headers.append(str(value if value is not None else "").strip())
+
+        url_col_idx = None
+        for idx, header in enumerate(headers):
+            if header in URL_HEADERS:
+                url_col_idx = idx
+                break
+
+        scan = SheetScan(headers, url_col_idx, max_row, max_col, url_links)
+        self._scans[sheet_name] = scan
+        return scan
+
+    @staticmethod
+    def _url_column(header_values: dict):
+        """1-based column of the first URL/Downloads header, or None."""
+        for col in sorted(header_values):
+            value = header_values[col]
+            if str(value if value is not None else "").strip() in URL_HEADERS:
+                return col
+        return None
+
+    def sheet_headers(self, sheet_name: str) -> list:
+        return self.scan_sheet(sheet_name).headers
+
+    def iter_rows(self, sheet_name: str):
+        """
+        Yield (row index, resolved URL, values) for every row below the header.
+
+        The resolved URL is the hyperlink target when the URL cell carries a hyperlink
+        (None for links without an external target), otherwise the stripped cell text,
+        otherwise None. `values` holds the raw cell values for every column.
+        """
+        scan = self.scan_sheet(sheet_name)
+        url_col_idx = scan.url_col_idx
+        width = scan.max_col
+        shared_formulae = {}
+
+        def resolve(row_idx, values):
+            if url_col_idx is None:
+                return None
+            if row_idx in scan.url_links:
+                return scan.url_links[row_idx]
+            url_value = values[url_col_idx]
+            return url_value.strip() if isinstance(url_value, str) else None
+
+        next_row = 2
+        current_row = None
+        values = None
+        for row, col, node in self._iter_sheet_cells(sheet_name, hyperlinks=False):
+            if row is None or row < 2:
+                if row is not None and node.find(FORMULA_TAG) is not None:
+                    self._cell_value(node, node.get("r") or "", shared_formulae)
+                continue
+            if row != current_row:
+                if current_row is not None:
+                    yield current_row, resolve(current_row, values), values
+                    next_row = current_row + 1
+                # Rows without any cells still exist in openpyxl's grid
+                for gap_row in range(next_row, row):
+                    gap_values = [None] * width
+                    yield gap_row, resolve(gap_row, gap_values), gap_values
+                current_row = row
+                values = [None] * width
+            coordinate = node.get("r") or ""
+            values[col - 1] = self._cell_value(node, coordinate, shared_formulae)
+
+        if current_row is not None:
+            yield current_row, resolve(current_row, values), values
+            next_row = current_row + 1
+        for gap_row in range(next_row, scan.max_row + 1):
+            gap_values = [None] * width
+            yield gap_row, resolve(gap_row, gap_values), gap_values